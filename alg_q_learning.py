@@ -1,9 +1,9 @@
 from car2 import Car2
-from track import Track
+from episode import MAX_EPISODE_STEPS
+from track_registry import get_track
 import pygame as pg
 from pygame.locals import *
 import numpy as np
-import math
 import time
 from collections import defaultdict
 import matplotlib.pyplot as plt
@@ -13,6 +13,9 @@ import pickle
 class CarAgent(Car2):
 
     MAX_LENGTH = 200
+    # The saved Q-tables were trained with the original four-probe collision test: keep it to
+    # replay them, or turn it off for the car's full footprint and retrain them
+    PROBE_COLLISION = True
 
     epsilon = 1.0 # Allow the model to do a lot of trial and error on the beggining
     epsilon_decay = 0.00013 # Decay per episode.
@@ -21,9 +24,11 @@ class CarAgent(Car2):
     gamma = 0.8
 
     def __init__(self, car_sprite, pos_x, pos_y, angle, speed, game_map, border_color,
-                 map_width, map_height, top_start_point, bottom_start_point):
+                 map_width, map_height, top_start_point, bottom_start_point, wall_mask=None, distance_field=None,
+                 ray_table=None, cspace=None, lap_progress=None):
         super().__init__(car_sprite, pos_x, pos_y, angle, speed, game_map, border_color,
-                 map_width, map_height, top_start_point, bottom_start_point)
+                 map_width, map_height, top_start_point, bottom_start_point, wall_mask, distance_field,
+                 ray_table, cspace, lap_progress)
 
         self.n_action = 5
         self.radars = []
@@ -62,33 +67,13 @@ class CarAgent(Car2):
             return -10-diff
         if self.is_collision():
             return -10-diff
-        return self.distance-diff
+        return self.get_progress()-diff
         
     def check_radar(self, degree):
-        length = 0
-        x = int(self.center[0] + length * math.cos(math.radians(360 - (self.angle + degree))))
-        y = int(self.center[1] + length * math.sin(math.radians(360 - (self.angle + degree))))
-        
-        while not self.is_collision_points(x, y) and length < CarAgent.MAX_LENGTH:
-            length += 1
-            x = int(self.center[0] + length * math.cos(math.radians(360 - (self.angle + degree))))
-            y = int(self.center[1] + length * math.sin(math.radians(360 - (self.angle + degree))))
+        self.radars.append(self.cast_ray(degree, CarAgent.MAX_LENGTH))
 
-        dist = int(pg.math.Vector2(x, y).distance_to(self.center))
-        self.radars.append([(x, y), dist])
-        
         if degree == 0:
-            length = 0
-            x = int(self.center[0] + length * math.cos(math.radians(360 - (self.angle + degree))))
-            y = int(self.center[1] + length * math.sin(math.radians(360 - (self.angle + degree))))
-            
-            while not self.is_collision_points(x, y) and length < CarAgent.MAX_LENGTH + 100:
-                length += 1
-                x = int(self.center[0] + length * math.cos(math.radians(360 - (self.angle + degree))))
-                y = int(self.center[1] + length * math.sin(math.radians(360 - (self.angle + degree))))
-            
-            dist = int(pg.math.Vector2(x, y).distance_to(self.center))
-            self.radars.append([(x, y), dist])
+            self.radars.append(self.cast_ray(degree, CarAgent.MAX_LENGTH + 100))
 
     def draw(self, screen):
         super().draw(screen)        
@@ -103,18 +88,27 @@ class CarAgent(Car2):
         self.check_radar(90)
 
         
-def run_simulation(map_path, is_training):  
-
-    my_track = Track(map_path)
-    pg.init()
-    flags = pg.RESIZABLE
-    screen = pg.display.set_mode((my_track.map_width, my_track.map_height), flags)
-    my_track.load_game_map()
+def run_simulation(map_path, is_training, spawn='start', headless=False):  
+
+    # Loaded once per process: repeated runs on the same map reuse the track.
+    # Headless runs open no window and load no images: nothing is drawn
+    my_track = get_track(map_path, headless=headless)
+    car_sprite = None if headless else 'cars/car2d.png'
+    screen = None
+    if not headless:
+        pg.init()
+        flags = pg.RESIZABLE
+        screen = pg.display.set_mode((my_track.map_width, my_track.map_height), flags)
 
     start_pos_x, start_pos_y, angle = my_track.start_pos
     speed = 5
     start_pos_y -= CarAgent.CAR_SIZE_Y // 2
     top_start_line, bottom_start_line = my_track.get_start_line_points()
+    cspace = my_track.configuration_space(CarAgent.CAR_SIZE_X, CarAgent.CAR_SIZE_Y)
+
+    # 'start' always starts on the start line; 'uniform' and 'segment' start anywhere on the track
+    spawns = my_track.spawn_index(CarAgent.CAR_SIZE_X, CarAgent.CAR_SIZE_Y) if spawn != 'start' else None
+    rng = np.random.default_rng()
 
     if is_training:
 
@@ -132,22 +126,27 @@ def run_simulation(map_path, is_training):
             if i % 500 == 0:
                 print(i)
             
-            car = CarAgent('cars/car2d.png', start_pos_x, start_pos_y, angle, speed, my_track.game_map, my_track.border_color, my_track.width, my_track.height, top_start_line, bottom_start_line)
+            car_x, car_y, car_angle = start_pos_x, start_pos_y, angle
+            if spawns is not None:
+                center_x, center_y, car_angle = spawns.sample(rng, spawn)
+                car_x, car_y = center_x - CarAgent.CAR_SIZE_X / 2, center_y - CarAgent.CAR_SIZE_Y / 2
+
+            car = CarAgent(car_sprite, car_x, car_y, car_angle, speed, my_track.game_map, my_track.border_color, my_track.width, my_track.height, top_start_line, bottom_start_line, my_track.wall_mask, my_track.distance_field, my_track.ray_table, cspace, my_track.lap_progress)
             car.q = q_table
             car.update()
 
             max_reward = -1        
-            car_start_time = time.time() 
 
-            while car.alive:
-                if time.time() - car_start_time > 30:
+            for _ in range(MAX_EPISODE_STEPS):
+                if not car.alive:
                     break
 
                 CarAgent.epsilon = max(CarAgent.epsilon - CarAgent.epsilon_decay, 0.01)
                 CarAgent.lr = max(CarAgent.lr - CarAgent.lr_decay, 0.01)
     
-                screen.blit(my_track.game_map, (0, 0))
-                car.draw(screen)
+                if not headless:
+                    my_track.draw(screen)
+                    car.draw(screen)
 
                 if car.has_touched_finish() == 1:
                     finish.append(i)
@@ -156,7 +155,7 @@ def run_simulation(map_path, is_training):
                 state = (int(car.position[0]), int(car.position[1]))
 
                 action = car.select_action(state, CarAgent.epsilon)
-                dist = car.distance
+                dist = car.get_progress()
                 
                 car.move(action)
                 car.update()
@@ -172,7 +171,8 @@ def run_simulation(map_path, is_training):
                 max_reward = max(reward, max_reward)
                 car.updateExperience(state, action, reward, new_state)
 
-                pg.display.flip()
+                if not headless:
+                    pg.display.flip()
             
             rewards[i] = max_reward
 
@@ -196,22 +196,19 @@ def run_simulation(map_path, is_training):
         f = open(f'alg_q_learning/saved_q_dictionary_{map_path[7:-4]}.pkl', 'rb')
         loaded_dict = pickle.load(f)
 
-        car = CarAgent('cars/car2d.png', start_pos_x, start_pos_y, angle, speed, my_track.game_map, my_track.border_color, my_track.width, my_track.height, top_start_line, bottom_start_line)
+        car = CarAgent(car_sprite, start_pos_x, start_pos_y, angle, speed, my_track.game_map, my_track.border_color, my_track.width, my_track.height, top_start_line, bottom_start_line, my_track.wall_mask, my_track.distance_field, my_track.ray_table, cspace, my_track.lap_progress)
         car.q = loaded_dict
         car.update()
 
         clock = pg.time.Clock()
 
-        start_race_time = time.time()
-
-        while True:
+        # The race is cut after the same number of steps as a training episode, and its pace is
+        # the distance per step, so neither depends on how fast the machine runs it
+        for _ in range(MAX_EPISODE_STEPS):
 
-            # if time.time() - start_race_time >= 30:
-            #     print(car.distance)
-            #     break
-
-            screen.blit(my_track.game_map, (0, 0))
-            car.draw(screen)
+            if not headless:
+                my_track.draw(screen)
+                car.draw(screen)
 
             state = (int(car.position[0]), int(car.position[1]))
 
@@ -221,15 +218,14 @@ def run_simulation(map_path, is_training):
             car.update()
 
             if not car.alive:
-                distance = car.distance
                 break
 
-            pg.display.flip()
-            clock.tick(60)
+            if not headless:
+                pg.display.flip()
+                clock.tick(60)
 
-        elapsed_race_time = time.time() - start_race_time
-        print( distance, elapsed_race_time)
-        print(distance / elapsed_race_time)
+        print(car.distance, car.time)
+        print(car.distance / max(car.time, 1))
 
 if __name__ == "__main__":         
     run_simulation('tracks/track01_resized.png', False)
\ No newline at end of file
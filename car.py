@@ -1,21 +1,38 @@
 import pygame as pg
 import math
 
+from bit_mask import BitMask
+from car_core import CarCore
+from footprint import Footprint
+from scaled_mask import ScaledMask
+from sprite_atlas import get_atlas
+from start_line import StartLine
+from tiled_track import TiledMask
 from track import Track
+from track_fields import trace_ray
 
 
-class Car:
+class Car(CarCore):
     """
     A Car class for simulating a vehicle in a 2D environment with Pygame.
 
+    The pose, speed, action handling and motion live in the slotted `CarCore`; this class adds the
+    sprite, the track masks and the sensors. It is slotted too, so subclasses only get a `__dict__`
+    for the attributes they add themselves.
+
+    A car created without a sprite (`car_sprite=None`) is headless: it never touches pygame, so it
+    needs no display, and it simulates exactly like a drawn car. Drawn cars share their sprite's
+    `SpriteAtlas`, so the image is loaded once per process and each heading is rotated once.
+
     Attributes:
         START_SPEED (int): Initial speed of the car.
         BORDER_EDGE (int): Border edge distance to limit car movement.
         CAR_SIZE_X (int): Car sprite width in pixels.
         CAR_SIZE_Y (int): Car sprite height in pixels.
-        Rotated_sprite (Surface): The rotated car sprite for rendering.
+        Rotated_sprite (Surface): The rotated car sprite last drawn, shared through the atlas.
         Sensors (list): List of sensors attached to the car (not implemented).
-        Sprite (Surface): The original car sprite loaded from an image file.
+        Sprite (Surface): The original car sprite loaded from an image file, or None for a headless car.
+        Atlas (SpriteAtlas): The shared sprite and its rotations, or None for a headless car.
         Map_width (int): The width of the game map.
         Map_height (int): The height of the game map.
         Position (list): The car's position on the map as [x, y].
@@ -25,23 +42,48 @@ class Car:
         Alive (bool): The status of the car, alive or not.
         Distance (float): The total distance traveled by the car.
         Time (int): The simulation time the car has been active.
-        Corners (list): The coordinates of the car's corners.
+        Corners (list): The corners of the car's rotated footprint: front left, front right, back right, back left.
+        Footprint (Footprint): The car's rotated rectangle, tested against the wall mask when `cspace` does not cover the heading.
         Game_map (Surface): The Pygame surface representing the game map.
         Border_color (Color): The color used to detect borders/collisions.
+        Wall_mask (ndarray, BitMask, ScaledMask or TiledMask): Border mask indexed as [y, x], True on border pixels.
+        Distance_field (ndarray): Distance from each pixel to the nearest border, used to sphere-trace radars.
+        Ray_table (RayTable): Optional precomputed radar lengths per pixel and heading.
+        Cspace (ConfigurationSpace): Optional per-heading obstacle maps for single-lookup collision.
+        Lap_progress (LapProgress): Optional geodesic lap-distance field of the track.
+        Progress (float): The distance driven along the lap, negative when going the wrong way.
+        Start_line (StartLine): The finish line the car's center is tested against, or None.
+        Finish_crossing (int): 1 if the last update crossed the finish line forwards, -1 backwards, else 0.
+        Finish_time (float): The fraction of the last update at which the line was crossed, or None.
+        Impact_time (float): The fraction of the last update at which the car hit a wall, or None.
+        SWEPT_COLLISION (bool): Test the whole move of each update for walls, not only where it ends.
+        PROBE_COLLISION (bool): Use the original four-probe collision test instead of the footprint,
+            at the end pose only; the saved NEAT genomes and Q-tables were trained with it.
+        FINISH_BACKWARDS_STOPS (bool): `has_touched_finish` stops a car that crossed the line backwards.
     """
 
     START_SPEED = 15
     BORDER_EDGE = 5
     CAR_SIZE_X = 60
     CAR_SIZE_Y = 60
+    SWEPT_COLLISION = True
+    PROBE_COLLISION = False
+    FINISH_BACKWARDS_STOPS = True
+
+    __slots__ = ('rotated_sprite', 'sensors', 'sprite', 'atlas', 'map_width', 'map_height', 'start_angle',
+                 'corners', 'footprint', 'game_map', 'border_color', 'wall_mask', 'distance_field', 'ray_table',
+                 'cspace', 'lap_progress', 'progress', 'lap_distance', 'top_start_point', 'bottom_start_point',
+                 'start_line', 'finish_crossing', 'finish_time', 'impact_time')
 
     def __init__(self, car_sprite, pos_x, pos_y, angle, speed, game_map, border_color,
-                 map_width, map_height, top_start_point, bottom_start_point):
+                 map_width, map_height, top_start_point, bottom_start_point, wall_mask=None,
+                 distance_field=None, ray_table=None, cspace=None, lap_progress=None):
         """
         Initializes the Car object with specified attributes and sprite.
 
         Args:
-            car_sprite (str): Path to the car sprite image file.
+            car_sprite (str): Path to the car sprite image file, or None for a headless car that
+                loads no sprite and cannot be drawn.
             pos_x (float): Initial x-coordinate of the car.
             pos_y (float): Initial y-coordinate of the car.
             angle (float): Initial angle of the car.
@@ -50,28 +92,45 @@ class Car:
             border_color (Color): The color for border collision detection.
             map_width (int): Width of the game map.
             map_height (int): Height of the game map.
+            wall_mask (ndarray, BitMask, ScaledMask or TiledMask, optional): Precomputed border mask, usually `Track.wall_mask`.
+                When omitted it is built from `game_map` and `border_color`.
+            distance_field (ndarray, optional): Precomputed `Track.distance_field`. When omitted,
+                radars march pixel by pixel.
+            ray_table (RayTable, optional): Precomputed `Track.ray_table` for single-lookup radars.
+            cspace (ConfigurationSpace, optional): Obstacle maps from `Track.configuration_space`
+                for this car's size; collision is then one lookup at the car's center.
+            lap_progress (LapProgress, optional): The `Track.lap_progress` field; when given,
+                `progress` measures how far the car got along the lap instead of how far it drove.
         """
+        super().__init__(pos_x, pos_y, angle, speed, self.CAR_SIZE_X, self.CAR_SIZE_Y)
         self.rotated_sprite = None
         self.sensors = None
-        self.sprite = pg.image.load(car_sprite).convert()
-        self.sprite = pg.transform.scale(self.sprite, (Car.CAR_SIZE_X, Car.CAR_SIZE_Y))
+        self.sprite = None
+        self.atlas = None
+        if car_sprite is not None:
+            self.atlas = get_atlas(car_sprite, (self.CAR_SIZE_X, self.CAR_SIZE_Y))
+            self.atlas.prerotate(angle)
+            self.sprite = self.atlas.sprite
         self.map_width = map_width
         self.map_height = map_height
-        self.position = [pos_x, pos_y]
-        self.angle = angle
         self.start_angle = angle
-        self.speed = speed
-        self.center = [self.position[0] + Car.CAR_SIZE_X / 2, self.position[1] + Car.CAR_SIZE_Y / 2]
-        self.alive = True
-        self.distance = 0
-        self.time = 0
         self.corners = []
+        self.footprint = Footprint.get(self.CAR_SIZE_X, self.CAR_SIZE_Y)
         self.game_map = game_map
         self.border_color = border_color
-        self.angles = []
-        self.speed_changes = 0
+        self.wall_mask = wall_mask if wall_mask is not None else Track.color_mask(game_map, border_color)
+        self.distance_field = distance_field
+        self.ray_table = ray_table
+        self.cspace = cspace
+        self.lap_progress = lap_progress
+        self.progress = 0
+        self.lap_distance = lap_progress.distance(*self.center) if lap_progress is not None else math.inf
         self.top_start_point = top_start_point
         self.bottom_start_point = bottom_start_point
+        self.start_line = StartLine(top_start_point, bottom_start_point) if top_start_point is not None else None
+        self.finish_crossing = 0
+        self.finish_time = None
+        self.impact_time = None
 
     def draw(self, screen):
         """
@@ -80,7 +139,11 @@ class Car:
         Args:
             screen (Surface): The Pygame surface where the car will be drawn.
         """
-        screen.blit(pg.transform.rotate(self.sprite, self.angle), self.position)
+        if self.atlas is None:
+            # Headless cars have nothing to draw
+            return
+        self.rotated_sprite = self.atlas.rotated(self.angle)
+        screen.blit(self.rotated_sprite, self.position)
 
     def is_out_of_bounds(self, x, y):
         """
@@ -97,31 +160,30 @@ class Car:
 
     def is_collision(self):
         """
-        Determines if the car collides with the border based on the color.
+        Determines if the car's rotated footprint touches the border or leaves the map.
+
+        With configuration-space maps covering the current heading this is a single lookup
+        at the car's center against the wall mask dilated by the car's rotated footprint.
+        Otherwise the footprint's outline is read from the wall mask in one gather. With
+        `PROBE_COLLISION` the original four probes are tested instead.
 
         Returns:
             bool: True if the point collides with the border, False otherwise.
         """
-        # Check if the corners are out of bounds
-        for corner in self.corners:
-            if self.is_out_of_bounds(corner[0], corner[1]):
-                return True
+        center_x, center_y = self.center
+        if self.PROBE_COLLISION:
+            return bool(Footprint.probe_collides_many(self.wall_mask, center_x, center_y, self.angle, self.size_x))
 
-        # Check if the line between the corners intersects with the border
-        for i in range(4):
-            x1, y1 = int(self.corners[i][0]), int(self.corners[i][1])
-            x2, y2 = int(self.corners[(i + 1) % 4][0]), int(self.corners[(i + 1) % 4][1])
+        if self.cspace is not None:
+            collision = self.cspace.collides(center_x, center_y, self.angle)
+            if collision is not None:
+                return collision
 
-            for x in range(min(x1, x2), max(x1, x2)):
-                y = int((y2 - y1) / (x2 - x1) * (x - x1) + y1)
-                if self.is_collision_points(x, y):
-                    return True
-
-        return False
+        return self.footprint.collides(self.wall_mask, center_x, center_y, self.angle)
 
     def is_collision_points(self, x, y):
         """
-        Determines if the given point collides with the border based on the color.
+        Determines if the given point collides with the border by indexing the wall mask.
 
         Args:
             x, y: The (x, y) coordinates of the point to check for collision.
@@ -129,23 +191,106 @@ class Car:
         Returns:
             bool: True if the point collides with the border, False otherwise.
         """
-        return self.is_out_of_bounds(x, y) or self.game_map.get_at((x, y)) == self.border_color
+        return self.is_out_of_bounds(x, y) or self.wall_mask[y, x]
+
+    def cast_ray(self, degree, max_length):
+        """
+        Casts a radar ray from the car's center and finds the first border pixel along it.
+
+        A precomputed ray table answers the read with one lookup when it covers the heading
+        (the length is measured from the pixel under the car's center, so the end point can
+        differ from a live cast by about a pixel). Otherwise, with a distance field the ray is
+        sphere-traced, jumping ahead by the clearance at each point, or else it advances one
+        pixel at a time (in one vectorized gather for a bit-packed, scaled or tiled mask); those stop on the
+        same pixel.
+
+        Args:
+            degree (float): The ray direction relative to the car's angle, in degrees.
+            max_length (int): The longest distance the ray can travel.
+
+        Returns:
+            list: The [(x, y), distance] of the hit point, or of the ray end at max_length.
+        """
+        radians = math.radians(360 - (self.angle + degree))
+        cos, sin = math.cos(radians), math.sin(radians)
+        center_x, center_y = self.center
+
+        length = None
+        if self.ray_table is not None:
+            length = self.ray_table.lookup(int(center_x), int(center_y), self.angle + degree, max_length)
+
+        if length is not None:
+            x = int(center_x + length * cos)
+            y = int(center_y + length * sin)
+        elif self.distance_field is not None:
+            x, y = trace_ray(self.distance_field, center_x, center_y, self.angle + degree, max_length)
+        elif isinstance(self.wall_mask, (BitMask, ScaledMask, TiledMask)):
+            x, y = self.wall_mask.cast_ray(center_x, center_y, self.angle + degree, max_length)
+        else:
+            length = 0
+            x, y = int(center_x), int(center_y)
+            while not self.is_collision_points(x, y) and length < max_length:
+                length += 1
+                x = int(center_x + length * cos)
+                y = int(center_y + length * sin)
+
+        return [(x, y), int(math.hypot(x - center_x, y - center_y))]
 
-    def check_collision(self):
+    def check_collision(self, previous_center=None):
         """
         Checks for collisions between the car and the border. Updates the car's
-        alive status based on collision detection with the corners of the car.
+        alive status based on collision detection with the car's footprint.
 
-        This method iterates through each corner of the car to determine if any
-        corner has collided with the border, marking the car as not alive if a
-        collision is detected.
+        Given the car's center before the last move, the whole move is tested (see
+        `sweep_collision`), so a fast car cannot jump over a thin border; a car that hits a
+        wall is stopped where it first touched it and `impact_time` records when.
+
+        Args:
+            previous_center (list, optional): The car's center before the last move.
         """
         self.alive = True
+        self.impact_time = None
 
-        if self.is_collision():
-            self.alive = False
+        if previous_center is None or not self.SWEPT_COLLISION or self.PROBE_COLLISION:
+            if self.is_collision():
+                self.alive = False
             return
 
+        impact = self.sweep_collision(previous_center)
+        if impact is not None:
+            center_x, center_y = self.center
+            self.x -= (1 - impact) * (center_x - previous_center[0])
+            self.y -= (1 - impact) * (center_y - previous_center[1])
+            self.impact_time = impact
+            self.alive = False
+
+    def sweep_collision(self, previous_center):
+        """
+        Tests the car's move from `previous_center` to its current center, at its current heading, for walls.
+
+        Moves far from every wall are settled by the distance field in two lookups. Otherwise,
+        with configuration-space maps covering the heading the center's path is looked up one
+        pixel at a time, or else the footprint's swept area is read from the wall mask.
+
+        Args:
+            previous_center (list): The car's center before the move.
+
+        Returns:
+            float: The fraction of the move at which the car first touches a wall, or None if the move is clear.
+        """
+        center_x, center_y = self.center
+        if self.distance_field is not None and self.footprint.clear_move(self.distance_field, previous_center[0],
+                                                                         previous_center[1], center_x, center_y):
+            return None
+
+        if self.cspace is not None:
+            impact, covered = self.cspace.sweep(previous_center[0], previous_center[1], center_x, center_y, self.angle)
+            if covered:
+                return impact
+
+        return self.footprint.sweep(self.wall_mask, previous_center[0], previous_center[1], center_x, center_y,
+                                    self.angle)
+
     @staticmethod
     def rotate_center(image, angle):
         """
@@ -172,47 +317,68 @@ class Car:
 
     def update(self):
         """
-         Updates the car's state including rotation, position, collision checks, distance, and time.
+         Updates the car's state including position, collision checks, distance, and time.
 
          Key actions performed:
-            - The sprite is rotated to match the current angle, ensuring correct orientation.
             - Position is updated based on speed and angle, with boundary checks to prevent moving outside the map.
-            - Corners of the car are recalculated for accurate collision detection.
-            - Collisions with map borders are checked. If found, the 'alive' status is set to False.
+            - The move is checked for collisions with map borders. If found, the car stops at the point of impact
+              and the 'alive' status is set to False.
+            - Corners of the car's footprint are recalculated.
             - Distance traveled, and time elapsed are updated to track the car's journey.
             - Speed is checked to ensure the car remains operational. Speed dropping to zero sets 'alive' to False.
         """
-        self.rotated_sprite = self.rotate_center(self.sprite, self.angle)
+        previous_center = self.center
+
+        edge = float(self.BORDER_EDGE)
+        self.drive(edge, edge, self.map_width - self.size_x - edge, self.map_height - self.size_y - edge)
+        # A car that hits a wall is moved back to the point of impact first
+        self.check_collision(previous_center)
+        self.update_progress()
+        self.update_finish(previous_center)
+
+        # Update the corners of the footprint; the car faces along (cos, -sin) of its angle
+        center_x, center_y = self.center
+        radians = math.radians(self.angle)
+        cos, sin = math.cos(radians), math.sin(radians)
+        half_x, half_y = self.size_x / 2, self.size_y / 2
+        self.corners = [[center_x + along * cos + across * sin, center_y - along * sin + across * cos]
+                        for along, across in ((half_x, -half_y), (half_x, half_y), (-half_x, half_y), (-half_x, -half_y))]
 
-        self.position[0] += self.speed * math.cos(math.radians(360 - self.angle))
-        self.position[0] = min(max(float(Car.BORDER_EDGE), self.position[0]),
-                               self.map_width - Car.CAR_SIZE_X - Car.BORDER_EDGE)
-
-        self.position[1] += self.speed * math.sin(math.radians(360 - self.angle))
-        self.position[1] = min(max(float(Car.BORDER_EDGE), self.position[1]),
-                               self.map_height - Car.CAR_SIZE_Y - Car.BORDER_EDGE)
+        self.check_engine()
 
-        self.center = [self.position[0] + Car.CAR_SIZE_X / 2, self.position[1] + Car.CAR_SIZE_Y / 2]
+    def update_progress(self):
+        """
+        Advances `progress` by the change of the car's lap distance, read from the progress field at its center.
+        Crossing the start line is accounted for, and steps from or to an unknown pixel count as no progress.
+        """
+        if self.lap_progress is None:
+            return
 
-        self.distance += self.speed
-        self.time += 1
+        lap_distance = self.lap_progress.distance(*self.center)
+        self.progress += self.lap_progress.advance(self.lap_distance, lap_distance)
+        if math.isfinite(lap_distance):
+            self.lap_distance = lap_distance
 
-        # Update corners based on the current position and angle
-        def compute_corner_cos(length_corner, angle):
-            return self.center[0] + length_corner * math.cos(math.radians(360 - angle))
+    def update_finish(self, previous_center):
+        """
+        Tests whether the car's center crossed the finish line during the last move, as a signed segment crossing.
 
-        def compute_corner_sin(length_corner, angle):
-            return self.center[1] + length_corner * math.cos(math.radians(360 - angle))
+        Args:
+            previous_center (list): The car's center before the move.
+        """
+        if self.start_line is None:
+            return
 
-        length = Car.CAR_SIZE_X / 2
+        self.finish_crossing, self.finish_time = self.start_line.crossing(previous_center, self.center)
 
-        self.corners = [[compute_corner_cos(length, self.angle), compute_corner_sin(length, self.angle)],
-                        [compute_corner_cos(-length, self.angle), compute_corner_sin(-length, self.angle)],
-                        [compute_corner_cos(length, self.angle - 90), compute_corner_sin(length, self.angle - 90)],
-                        [compute_corner_cos(-length, self.angle - 90), compute_corner_sin(-length, self.angle - 90)]]
+    def get_progress(self):
+        """
+        Returns how far the car has come along the track.
 
-        self.check_collision()
-        self.check_engine()
+        Returns:
+            float: The geodesic lap progress when the car has a progress field, otherwise the distance driven.
+        """
+        return self.progress if self.lap_progress is not None else self.distance
 
     def check_engine(self):
         """
@@ -264,55 +430,17 @@ class Car:
         return self.alive
 
     def move(self, move_number):
-        if move_number == 1:
-            self.change_speed(-3) # Slow down
-        elif move_number == 2:
-            self.change_speed(3) # Speed up
-        elif move_number == 3:
-            self.change_angle(20) # Turn left
-            self.change_speed(-1)
-        elif move_number == 4:
-            self.change_angle(-20) # Turn right
-            self.change_speed(-1)
-        else:
-            return 0 # Do nothing
-
-    def change_angle(self, angle):
-        self.angle += angle
-        self.angles.append(angle)
-
-    def change_speed(self, speed):
-        if self.speed + speed < 0:
-            self.speed = 0
-        elif self.speed + speed > 30:
-            self.speed = 30
-        else:
-            self.speed += speed
-
-        if speed != 0:
-            self.speed_changes += 1
-
-    def car_touches_line(self):
-        # Make a rectangle around the car
-        car_rect = pg.Rect(self.position[0], self.position[1], Car.CAR_SIZE_X, Car.CAR_SIZE_Y)
-
-        # Check if the car rectangle intersects with the start line
-        return car_rect.colliderect(pg.Rect(self.top_start_point[0], self.top_start_point[1], 10, 10)) or \
-            car_rect.colliderect(pg.Rect(self.bottom_start_point[0], self.bottom_start_point[1], 10, 10))
-
-    def is_on_left_side_of_line(self):
-        if abs(abs(self.angle % 360) - abs(self.start_angle % 360)) > 45:
-            # print(self.angle, self.start_angle)
-            # print("Finish gresit")
-            return 0
-        return self.corners[0][0] < self.top_start_point[0] or self.corners[1][0] < self.top_start_point[0]
+        # 1 slows down, 2 speeds up, 3 and 4 turn left and right (see `car_core.DRIVE_ACTIONS`)
+        self.apply_action(move_number)
 
     def has_touched_finish(self):
-        if self.car_touches_line():
-            if self.is_on_left_side_of_line():
-                return 1
-            else:
-                self.is_alive = 0
-                return -1
-
-        return 0
+        """
+        Reports whether the last update crossed the finish line, in either direction.
+        Crossing it backwards also stops the car when `FINISH_BACKWARDS_STOPS` is set.
+
+        Returns:
+            int: 1 if the car's center crossed the line in the race direction, -1 if against it, 0 otherwise.
+        """
+        if self.finish_crossing == -1 and self.FINISH_BACKWARDS_STOPS:
+            self.alive = False
+        return self.finish_crossing
@@ -0,0 +1,261 @@
+import numpy as np
+
+from bit_mask import BitMask
+from car import Car
+from car_core import DRIVE_ACTIONS
+from footprint import Footprint
+
+
+class CarBatch:
+    """N cars of one size, simulated together as parallel NumPy arrays.
+
+    Every per-car attribute of `Car` (position, angle, speed, alive flag, distance, time,
+    ...) is one contiguous array with a row per car, and `move`, `update` and `cast_rays`
+    advance the whole population with a fixed number of vectorized operations, so a step
+    costs NumPy time per car instead of Python time. The rules are those of `Car.move` and
+    `Car.update`: a car in the batch drives, collides and stops exactly like a `Car` (or,
+    with `Car2`'s sizes, a `Car2`) given the same masks and actions.
+
+    Only alive cars are moved and updated; dead cars keep their last state.
+
+    Attributes:
+        count (int): The number of cars.
+        size_x (int): The car length along its heading, in pixels.
+        size_y (int): The car width across its heading, in pixels.
+        border_edge (float): The margin kept between a car and the map edge.
+        map_width (int): The width of the game map.
+        map_height (int): The height of the game map.
+        position (ndarray): (N, 2) float64 top-left corners.
+        center (ndarray): (N, 2) float64 centers.
+        corners (ndarray): (N, 4, 2) float64 footprint corners, as `Car.corners`.
+        footprint (Footprint): The cars' rotated rectangle, for headings `cspace` does not cover.
+        angle (ndarray): (N,) float64 headings in degrees.
+        speed (ndarray): (N,) float64 speeds.
+        alive (ndarray): (N,) bool alive flags.
+        distance (ndarray): (N,) float64 distances driven.
+        time (ndarray): (N,) int64 updates survived.
+        speed_changes (ndarray): (N,) int64 counts of speed-changing moves.
+        progress (ndarray): (N,) float64 lap progress, when `lap_progress` is given.
+        lap_distance (ndarray): (N,) float64 last known lap distances.
+        finish_crossing (ndarray): (N,) int8 finish-line crossings of the last update (1, -1 or 0).
+        finish_time (ndarray): (N,) float64 fractions of the last update at which the line was crossed, or NaN.
+        impact_time (ndarray): (N,) float64 fractions of the last update at which the car hit a wall, or NaN.
+        wall_mask (ndarray, BitMask, ScaledMask or TiledMask): Border mask indexed as [y, x].
+        start_line (StartLine): The finish line, or None.
+        ray_table (RayTable): Optional precomputed radar lengths.
+        cspace (ConfigurationSpace): Optional obstacle maps for this car size.
+        lap_progress (LapProgress): Optional geodesic lap-distance field.
+        action_map (ActionMap): The actions of `move`, `Car`'s by default.
+        action_changes (ndarray): (A, 2) float64 angle and speed change of each action number.
+        SWEPT_COLLISION (bool): Test whole moves for walls, as `Car.SWEPT_COLLISION`.
+        PROBE_COLLISION (bool): Use the original four-probe collision test, as `Car.PROBE_COLLISION`.
+    """
+
+    SWEPT_COLLISION = Car.SWEPT_COLLISION
+    PROBE_COLLISION = Car.PROBE_COLLISION
+
+    def __init__(self, count, pos_x, pos_y, angle, speed, map_width, map_height, wall_mask,
+                 size_x=Car.CAR_SIZE_X, size_y=Car.CAR_SIZE_Y, border_edge=Car.BORDER_EDGE, start_line=None,
+                 ray_table=None, cspace=None, lap_progress=None, action_map=DRIVE_ACTIONS):
+        """Places `count` cars; the pose and speed arguments are scalars or per-car arrays."""
+        self.count = count
+        self.size_x = size_x
+        self.size_y = size_y
+        self.border_edge = border_edge
+        self.map_width = map_width
+        self.map_height = map_height
+        self.wall_mask = wall_mask
+        self.start_line = start_line
+        self.ray_table = ray_table
+        self.cspace = cspace
+        self.lap_progress = lap_progress
+        self.action_map = action_map
+        self.action_changes = np.array([action_map.changes.get(action, (0, 0)) for action in range(len(action_map))],
+                                       dtype=np.float64).reshape(-1, 2)
+
+        self.position = np.stack([np.broadcast_to(np.asarray(pos_x, dtype=np.float64), count),
+                                  np.broadcast_to(np.asarray(pos_y, dtype=np.float64), count)], axis=1)
+        self.center = self.position + (size_x / 2, size_y / 2)
+        self.corners = np.zeros((count, 4, 2), dtype=np.float64)
+        self.footprint = Footprint.get(size_x, size_y)
+        self.angle = np.array(np.broadcast_to(np.asarray(angle, dtype=np.float64), count))
+        self.speed = np.array(np.broadcast_to(np.asarray(speed, dtype=np.float64), count))
+        self.alive = np.ones(count, dtype=bool)
+        self.distance = np.zeros(count, dtype=np.float64)
+        self.time = np.zeros(count, dtype=np.int64)
+        self.speed_changes = np.zeros(count, dtype=np.int64)
+        self.progress = np.zeros(count, dtype=np.float64)
+        self.lap_distance = (lap_progress.distances(self.center[:, 0], self.center[:, 1]).astype(np.float64)
+                             if lap_progress is not None else np.full(count, np.inf))
+        self.finish_crossing = np.zeros(count, dtype=np.int8)
+        self.finish_time = np.full(count, np.nan)
+        self.impact_time = np.full(count, np.nan)
+
+    @staticmethod
+    def from_track(track, count, pos_x, pos_y, angle, speed, size_x=Car.CAR_SIZE_X, size_y=Car.CAR_SIZE_Y,
+                   border_edge=Car.BORDER_EDGE, cspace=None):
+        """Places `count` cars on a loaded `track.Track`, with its masks, radar table and progress field."""
+        return CarBatch(count, pos_x, pos_y, angle, speed, track.width, track.height, track.wall_mask, size_x, size_y,
+                        border_edge, track.start_line, track.ray_table, cspace, track.lap_progress)
+
+    def move(self, actions):
+        """Applies one action per car, as `CarCore.apply_action` does with `action_map`.
+
+        Args:
+            actions (ndarray): (N,) integer actions; dead cars and unmapped actions do nothing.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        mapped = self.alive & (actions >= 0) & (actions < len(self.action_changes))
+        angle_change, speed_change = np.where(mapped[:, np.newaxis], self.action_changes[np.where(mapped, actions, 0)], 0).T
+
+        self.angle += angle_change
+        speed = self.speed + speed_change
+        if self.action_map.min_speed is not None:
+            speed = np.maximum(speed, self.action_map.min_speed)
+        if self.action_map.max_speed is not None:
+            speed = np.minimum(speed, self.action_map.max_speed)
+        self.speed = np.where(speed_change != 0, speed, self.speed)
+        self.speed_changes += speed_change != 0
+
+    def update(self):
+        """Moves every alive car one step and updates its progress, finish crossing, corners and alive flag."""
+        live = np.flatnonzero(self.alive)
+        if len(live) == 0:
+            return
+
+        angle, speed = self.angle[live], self.speed[live]
+        radians = np.radians(360 - angle)
+        previous_center = self.center[live]
+
+        position = self.position[live] + speed[:, np.newaxis] * np.stack([np.cos(radians), np.sin(radians)], axis=1)
+        position[:, 0] = np.clip(position[:, 0], self.border_edge, self.map_width - self.size_x - self.border_edge)
+        position[:, 1] = np.clip(position[:, 1], self.border_edge, self.map_height - self.size_y - self.border_edge)
+        center = position + (self.size_x / 2, self.size_y / 2)
+
+        swept = self.SWEPT_COLLISION and not self.PROBE_COLLISION
+        if swept:
+            # Cars that hit a wall stop at the point of impact, as in `Car.check_collision`
+            impact = self.sweep_collisions(live, previous_center, center)
+            hit = ~np.isnan(impact)
+            back = (1 - impact[hit])[:, np.newaxis] * (center[hit] - previous_center[hit])
+            position[hit] -= back
+            center[hit] = position[hit] + (self.size_x / 2, self.size_y / 2)
+            self.impact_time[live] = impact
+        self.position[live], self.center[live] = position, center
+
+        self.distance[live] += speed
+        self.time[live] += 1
+
+        if self.lap_progress is not None:
+            lap_distance = self.lap_progress.distances(center[:, 0], center[:, 1]).astype(np.float64)
+            self.progress[live] += self.lap_progress.advances(self.lap_distance[live], lap_distance)
+            self.lap_distance[live] = np.where(np.isfinite(lap_distance), lap_distance, self.lap_distance[live])
+
+        if self.start_line is not None:
+            self.finish_crossing[live], self.finish_time[live] = self.start_line.crossings(previous_center, center)
+
+        self.corners[live] = self.footprint.corners(center[:, 0], center[:, 1], angle)
+
+        alive = ~hit if swept else ~self.collisions(live)
+        stalled = self.speed[live] <= 0
+        self.speed[live[stalled]] = 0
+        self.alive[live] = alive & ~stalled
+
+    def collisions(self, cars):
+        """Tests the given cars for a collision, as `Car.is_collision` does.
+
+        Cars whose heading is covered by the configuration-space maps are one lookup each; the
+        others read their footprints from the wall mask in one gather. With `PROBE_COLLISION`
+        the original four probes are tested instead.
+
+        Args:
+            cars (ndarray): Indices of the cars to test.
+
+        Returns:
+            ndarray: Boolean array, True where the car collides.
+        """
+        if self.PROBE_COLLISION:
+            return Footprint.probe_collides_many(self.wall_mask, self.center[cars, 0], self.center[cars, 1],
+                                                 self.angle[cars], self.size_x)
+
+        collisions = np.zeros(len(cars), dtype=bool)
+        unresolved = np.ones(len(cars), dtype=bool)
+        if self.cspace is not None:
+            collisions, covered = self.cspace.collides_many(self.center[cars, 0], self.center[cars, 1], self.angle[cars])
+            unresolved = ~covered
+
+        if unresolved.any():
+            others = cars[unresolved]
+            collisions[unresolved] = self.footprint.collides_many(self.wall_mask, self.center[others, 0],
+                                                                  self.center[others, 1], self.angle[others])
+        return collisions
+
+    def sweep_collisions(self, cars, previous_center, center):
+        """Tests the moves of the given cars for walls along the way, as `Car.sweep_collision` does.
+
+        Args:
+            cars (ndarray): Indices of the cars to test.
+            previous_center (ndarray): (M, 2) centers before the move.
+            center (ndarray): (M, 2) centers after the move.
+
+        Returns:
+            ndarray: (M,) float64 times of impact in (0, 1], NaN where the move is clear.
+        """
+        angle = self.angle[cars]
+        impact = np.full(len(cars), np.nan)
+        unresolved = np.ones(len(cars), dtype=bool)
+        if self.cspace is not None:
+            impact, covered = self.cspace.sweeps(previous_center[:, 0], previous_center[:, 1], center[:, 0],
+                                                 center[:, 1], angle)
+            unresolved = ~covered
+
+        if unresolved.any():
+            impact[unresolved] = self.footprint.sweeps(self.wall_mask, previous_center[unresolved, 0],
+                                                       previous_center[unresolved, 1], center[unresolved, 0],
+                                                       center[unresolved, 1], angle[unresolved])
+        return impact
+
+    def cast_rays(self, degrees, max_length):
+        """Casts radar rays from every car's center, like `Car.cast_ray`.
+
+        Lengths come from the ray table where it covers the heading; the other rays march
+        over the wall mask pixel by pixel, all at once, and stop on the same pixel.
+
+        Args:
+            degrees (sequence): The ray directions relative to the cars' headings, in degrees.
+            max_length (int): The longest distance a ray can travel.
+
+        Returns:
+            tuple: The (N, D, 2) int64 stop pixels and the (N, D) int64 distances to them.
+        """
+        degrees = np.asarray(degrees, dtype=np.float64)
+        x0 = np.broadcast_to(self.center[:, 0, np.newaxis], (self.count, len(degrees)))
+        y0 = np.broadcast_to(self.center[:, 1, np.newaxis], (self.count, len(degrees)))
+        angles = self.angle[:, np.newaxis] + degrees
+        radians = np.radians(360 - angles)
+
+        xs, ys = np.zeros(angles.shape, dtype=np.int64), np.zeros(angles.shape, dtype=np.int64)
+        lengths = np.full(angles.shape, -1, dtype=np.int64)
+        if self.ray_table is not None:
+            lengths = self.ray_table.lookup_many(x0.astype(np.int64), y0.astype(np.int64), angles, max_length)
+        looked_up = lengths >= 0
+        xs[looked_up] = (x0[looked_up] + lengths[looked_up] * np.cos(radians[looked_up])).astype(np.int64)
+        ys[looked_up] = (y0[looked_up] + lengths[looked_up] * np.sin(radians[looked_up])).astype(np.int64)
+
+        cast = ~looked_up
+        if cast.any():
+            # Any [y, x]-indexable mask with a `shape` can be marched by `BitMask.cast_rays`.
+            cast_rays = getattr(self.wall_mask, 'cast_rays', None) or (lambda *args: BitMask.cast_rays(self.wall_mask, *args))
+            xs[cast], ys[cast] = cast_rays(x0[cast], y0[cast], angles[cast], max_length)
+
+        points = np.stack([xs, ys], axis=-1)
+        distances = np.hypot(xs - x0, ys - y0).astype(np.int64)
+        return points, distances
+
+    def get_progress(self):
+        """Returns how far each car has come: the lap progress with a progress field, otherwise the distance driven."""
+        return self.progress if self.lap_progress is not None else self.distance
+
+    def has_touched_finish(self):
+        """Returns each car's finish-line crossing in the last update: 1 forwards, -1 backwards, 0 none."""
+        return self.finish_crossing
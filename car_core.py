@@ -0,0 +1,148 @@
+import math
+
+from telemetry import Telemetry
+
+
+class ActionMap:
+    """A discrete action set: how each action changes a car's heading and speed.
+
+    Attributes:
+        changes (dict): Maps an action to its (angle change, speed change) in degrees and
+            pixels per step; actions missing from the map do nothing.
+        min_speed (float): The lowest speed a change can reach, or None for no limit.
+        max_speed (float): The highest speed a change can reach, or None for no limit.
+    """
+
+    __slots__ = ('changes', 'min_speed', 'max_speed')
+
+    def __init__(self, changes, min_speed=None, max_speed=None):
+        self.changes = changes
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+
+    def __len__(self):
+        """The number of action numbers, from 0 up to the largest mapped action."""
+        return max(self.changes, default=-1) + 1
+
+    def __repr__(self):
+        return f'ActionMap({self.changes}, min_speed={self.min_speed}, max_speed={self.max_speed})'
+
+
+# `Car.move`: 1 slows down, 2 speeds up, 3 and 4 turn left and right and cost one unit of
+# speed; the speed stays within [0, 30].
+DRIVE_ACTIONS = ActionMap({1: (0, -3), 2: (0, 3), 3: (20, -1), 4: (-20, -1)}, min_speed=0, max_speed=30)
+# `F1_Env`: 1 speeds up, 2 slows down, 3 and 4 turn without slowing; the speed is not limited.
+ENV_ACTIONS = ActionMap({1: (0, 3), 2: (0, -3), 3: (20, 0), 4: (-20, 0)})
+
+
+class CarCore:
+    """The state every car is driven by: pose, speed and step counters, as plain floats.
+
+    Instances are slotted, so a car carries no `__dict__` and attribute reads and writes
+    are fixed-offset loads. The sprite-based cars (`car.Car` and `car2.Car2`) and the
+    gym env's car are built on this core and only differ by their sizes and `ACTIONS`.
+
+    A car at heading `angle` (degrees) moves along (cos(360 - angle), sin(360 - angle)) in
+    screen coordinates, i.e. 0 is +x and 90 is up.
+
+    Attributes:
+        ACTIONS (ActionMap): The action set of `apply_action`.
+        x (float): The x-coordinate of the car's top-left corner.
+        y (float): The y-coordinate of the car's top-left corner.
+        angle (float): The heading in degrees.
+        speed (float): The speed in pixels per step.
+        size_x (float): The car's width in pixels.
+        size_y (float): The car's height in pixels.
+        alive (bool): The status of the car, alive or not.
+        distance (float): The total distance traveled.
+        time (int): The number of steps driven.
+        speed_changes (int): The number of actions that changed the speed.
+        telemetry (Telemetry): The car's steering and speed recording, or None unless enabled.
+    """
+
+    ACTIONS = DRIVE_ACTIONS
+
+    __slots__ = ('x', 'y', 'angle', 'speed', 'size_x', 'size_y', 'alive', 'distance', 'time', 'speed_changes',
+                 'telemetry')
+
+    def __init__(self, x, y, angle, speed, size_x, size_y):
+        self.x = float(x)
+        self.y = float(y)
+        self.angle = angle
+        self.speed = speed
+        self.size_x = size_x
+        self.size_y = size_y
+        self.alive = True
+        self.distance = 0
+        self.time = 0
+        self.speed_changes = 0
+        self.telemetry = None
+
+    @property
+    def position(self):
+        """list: The [x, y] of the car's top-left corner."""
+        return [self.x, self.y]
+
+    @property
+    def center(self):
+        """list: The [x, y] of the car's center."""
+        return [self.x + self.size_x / 2, self.y + self.size_y / 2]
+
+    def apply_action(self, action):
+        """Changes the heading and speed as `ACTIONS` maps the action.
+
+        Returns:
+            bool: False if the action does nothing.
+        """
+        change = self.ACTIONS.changes.get(action)
+        if change is None:
+            return False
+
+        angle_change, speed_change = change
+        if angle_change:
+            self.change_angle(angle_change)
+        if speed_change:
+            self.change_speed(speed_change)
+        return True
+
+    def enable_telemetry(self, capacity=Telemetry.CAPACITY):
+        """Starts recording steering and speed, keeping the latest `capacity` entries of each."""
+        self.telemetry = Telemetry(capacity)
+
+    def get_telemetry(self):
+        """Returns the recording as `Telemetry.read` does, or None if telemetry is not enabled."""
+        return self.telemetry.read() if self.telemetry is not None else None
+
+    def change_angle(self, angle):
+        self.angle += angle
+        if self.telemetry is not None:
+            self.telemetry.record_steering(angle)
+
+    def change_speed(self, speed):
+        new_speed = self.speed + speed
+        if self.ACTIONS.min_speed is not None and new_speed < self.ACTIONS.min_speed:
+            new_speed = self.ACTIONS.min_speed
+        elif self.ACTIONS.max_speed is not None and new_speed > self.ACTIONS.max_speed:
+            new_speed = self.ACTIONS.max_speed
+        self.speed = new_speed
+
+        if speed != 0:
+            self.speed_changes += 1
+
+    def velocity(self):
+        """Returns the (dx, dy) the car moves by in one step."""
+        radians = math.radians(360 - self.angle)
+        return self.speed * math.cos(radians), self.speed * math.sin(radians)
+
+    def drive(self, min_x, min_y, max_x, max_y):
+        """Moves the car one step along its heading, keeping its top-left corner within the given bounds.
+
+        Adds the speed to `distance` and counts the step in `time`.
+        """
+        dx, dy = self.velocity()
+        self.x = min(max(min_x, self.x + dx), max_x)
+        self.y = min(max(min_y, self.y + dy), max_y)
+        self.distance += self.speed
+        self.time += 1
+        if self.telemetry is not None:
+            self.telemetry.record_update(self.speed)
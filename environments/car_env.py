@@ -1,6 +1,5 @@
 import os
 import random
-import time
 
 import numpy as np
 import pygame
@@ -11,6 +10,21 @@ from gymnasium import spaces
 import cv2
 import numpy as np
 from gymnasium.spaces import Dict, Box
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from bit_mask import BitMask
+from car_core import ENV_ACTIONS, CarCore
+from episode import MAX_EPISODE_STEPS
+from lap_progress import LapProgress
+from scaled_mask import ScaledMask
+from spawn_index import SpawnIndex
+from sprite_atlas import get_atlas
+from tiled_track import TiledMask
+from track_compiler import TrackBundle, compile_tiled_track, compile_track
+from track_registry import TrackRegistry
+from track_fields import (DIRECTIONAL_DISTANCES_VERSION, NO_WALL, WALL_INTEGRAL_VERSION, count_in_boxes,
+                          directional_distances, wall_integral)
 
 
 class TrackUtils:
@@ -99,91 +113,151 @@ class TrackUtils:
         cv2.waitKey(0)
 
 
-class Car:
+class Car(CarCore):
+    # The env keeps the car's position itself; the core holds its heading, speed and actions
     CAR_WIDTH = 60
     CAR_HEIGHT = 60
+    ACTIONS = ENV_ACTIONS
 
-    def __init__(self, car_path, speed=5, angle=5):
-        self.angle = angle
-        self.speed = speed
+    __slots__ = ('car_path', 'car_size')
+
+    def __init__(self, car_path, speed=5, angle=5, headless=False):
+        super().__init__(0, 0, angle, speed, Car.CAR_WIDTH, Car.CAR_HEIGHT)
         # Directly use the resized image path after ensuring it's created
         self.car_path = f"../cars/car2d_{Car.CAR_WIDTH}_{Car.CAR_HEIGHT}.png"
-        # Ensure the resized image is created if needed
-        TrackUtils.resize_and_save_if_needed(car_path, Car.CAR_WIDTH, Car.CAR_HEIGHT, self.car_path)
+        # Ensure the resized image is created if needed; a headless car is never drawn and skips it
+        if not headless:
+            TrackUtils.resize_and_save_if_needed(car_path, Car.CAR_WIDTH, Car.CAR_HEIGHT, self.car_path)
         # Update car_size with the actual dimensions
         self.car_size = (Car.CAR_WIDTH, Car.CAR_HEIGHT)
 
-    def apply_action(self, action):
-        if action == 0:
-            return
-        elif action == 1:
-            self.add_speed(3)
-        elif action == 2:
-            self.add_speed(-3)
-        elif action == 3:
-            self.add_angle(20)
-        elif action == 4:
-            self.add_angle(-20)
-
-    def add_speed(self, speed):
-        self.speed += speed
-
-    def add_angle(self, angle):
-        self.angle += angle
-
     def calculate_movement(self):
-        # Convert angle from degrees to radians for calculation
-        angle_rad = np.radians(self.angle)
-
-        # Calculate the change in position
-        dx = self.speed * np.cos(angle_rad)
-        dy = -self.speed * np.sin(angle_rad)  # Negative because screen y-coordinates increase downwards
-
-        return dx, dy
+        # The (dx, dy) of one step; screen y-coordinates increase downwards
+        return self.velocity()
 
 
 class Track:
     TRACK_WIDTH = 1920
     TRACK_HEIGHT = 1080
 
-    def __init__(self, track_path):
+    def __init__(self, track_path, bit_packed=False, tiled=False, resolution=1):
         self.track_path = track_path
-        resized_track_image_path = f"../tracks/track01_{Track.TRACK_WIDTH}_{Track.TRACK_HEIGHT}.png"
-        resized_track_image = TrackUtils.resize_and_save_if_needed(track_path, Track.TRACK_WIDTH, Track.TRACK_HEIGHT,
-                                                                   resized_track_image_path)
-        if resized_track_image is not None:
-            self.track_path = resized_track_image_path
-
-            self.track_image = cv2.cvtColor(resized_track_image, cv2.COLOR_BGR2GRAY)
-            self.track_size = (Track.TRACK_WIDTH, Track.TRACK_HEIGHT)
+        self.spawn_indices = {}
+        self.surface = None
+
+        if tiled:
+            # Large maps at native size: walls are memory-mapped tiles and only the tiles around
+            # the car are read, so collision and sensors go through the tile cache.
+            self.bundle = compile_tiled_track(track_path, with_image=False)
+            self.track_size = self.bundle.size
+            self.start_rect_coords = self.bundle.start_rect
+            self.lap_progress = None
+            self.wall_mask = TiledMask.from_bundle(self.bundle)
+            self.wall_integral = None
+            self.edge_distances = None
+            return
+
+        # The compiled bundle holds the resized wall mask and start rectangle, memory-mapped
+        # so that building an env costs a header read instead of a decode/resize/contour pass.
+        # Generated tracks (see track_generator) are passed in as bundles and used as they are.
+        if isinstance(track_path, TrackBundle):
+            self.bundle = track_path
         else:
-            print(f"Track file not found: {track_path}")
-            self.track_image = None
-            self.track_size = (0, 0)
-        print(self.track_path)
+            self.bundle = compile_track(track_path, (Track.TRACK_WIDTH, Track.TRACK_HEIGHT))
+        self.track_size = self.bundle.size
+        self.start_rect_coords = self.bundle.start_rect
+        # Geodesic distance from the start line: lap progress at any pixel is one lookup.
+        self.lap_progress = LapProgress.load(self.bundle)
+
+        factor = ScaledMask.factor_for(resolution)
+        if factor > 1:
+            # Max-pooled walls, factor ** 2 times smaller: collision boxes and sensors read the
+            # coarse cells (see ScaledMask for the bound on how far readings drift).
+            self.wall_mask = ScaledMask(self.bundle.layer(f'wall_cells_{factor}',
+                                                          lambda bundle: ScaledMask.downsample(bundle.wall_mask, factor),
+                                                          ScaledMask.LAYER_VERSION),
+                                        factor, (self.track_size[1], self.track_size[0]))
+            self.wall_integral = None
+            self.edge_distances = None
+        elif bit_packed:
+            # One bit per pixel (~260 KB at 1080p): collision and sensors query the packed bits
+            # directly instead of the 8 MB table and 16 MB distance maps below.
+            self.wall_mask = BitMask(self.bundle.layer('wall_bits', lambda bundle: np.packbits(bundle.wall_mask, axis=1),
+                                                       BitMask.LAYER_VERSION), self.track_size[0])
+            self.wall_integral = None
+            self.edge_distances = None
+        else:
+            self.wall_mask = self.bundle.wall_mask
+            # Summed-area table of the walls: a box collision test is four lookups.
+            self.wall_integral = self.bundle.layer('wall_integral', lambda bundle: wall_integral(bundle.wall_mask),
+                                                   WALL_INTEGRAL_VERSION)
+            # Left/right/up/down distance to the nearest wall for every pixel: a sensor read is one lookup.
+            self.edge_distances = self.bundle.layer('edge_distances',
+                                                    lambda bundle: directional_distances(bundle.wall_mask),
+                                                    DIRECTIONAL_DISTANCES_VERSION)
+
+    def get_spawn_index(self, car_size):
+        # Every box position without a wall, sorted by lap progress; built once per car size and cached
+        car_size = (int(car_size[0]), int(car_size[1]))
+        if car_size not in self.spawn_indices:
+            if self.lap_progress is None:
+                raise ValueError("The track has no start line to measure spawn progress from.")
+            self.spawn_indices[car_size] = SpawnIndex.for_box(self.bundle, self.lap_progress, car_size)
+        return self.spawn_indices[car_size]
+
+    def get_surface(self):
+        # The track image at the compiled size, for rendering; loaded on first use and shared by every env on the track
+        if self.surface is None:
+            if isinstance(self.track_path, TrackBundle):
+                # Surfaces are indexed [x, y] and RGB; the bundle image is [y, x] and BGR
+                self.surface = pygame.surfarray.make_surface(self.bundle.image()[:, :, ::-1].transpose(1, 0, 2))
+            else:
+                surface = pygame.image.load(self.track_path)
+                if surface.get_size() != tuple(self.track_size):
+                    surface = pygame.transform.scale(surface, self.track_size)
+                self.surface = surface
+        return self.surface
 
     def calculate_distances_to_edges(self, _agent_location, car_size):
         center_x, center_y = _agent_location + car_size[0] // 2
 
-        def find_distance_to_edge(start_x, start_y, delta_x, delta_y):
-            distance = 0
-            x, y = start_x, start_y
-            while 0 <= x < self.track_image.shape[1] and 0 <= y < self.track_image.shape[0]:
-                if self.track_image[y, x] == 255:  # White pixel found
-                    return distance
-                x += delta_x
-                y += delta_y
-                distance += 1
-            return np.inf
+        width, height = self.track_size
+        if not (0 <= center_x < width and 0 <= center_y < height):
+            return np.full(4, np.inf, dtype=np.float32)
+
+        if self.edge_distances is None:
+            return self.wall_mask.distances_to_edges(center_x, center_y)
+
+        # Distances in all four directions (left, right, up, down) from the precomputed maps
+        distances = self.edge_distances[center_y, center_x].astype(np.float32)
+        distances[distances == NO_WALL] = np.inf
+
+        return distances
 
-        # Calculate distances in all four directions
-        distances = np.array([
-            find_distance_to_edge(center_x, center_y, -1, 0),  # Left
-            find_distance_to_edge(center_x, center_y, 1, 0),  # Right
-            find_distance_to_edge(center_x, center_y, 0, -1),  # Up
-            find_distance_to_edge(center_x, center_y, 0, 1)  # Down
-        ], dtype=np.float32)
+    def calculate_distances_to_edges_many(self, agent_locations, car_size):
+        """Batched `calculate_distances_to_edges` for an (N, 2) array of car positions.
 
+        With the precomputed maps this is one gather; the packed, scaled and tiled masks
+        are read car by car.
+
+        Returns:
+            ndarray: (N, 4) float32 left, right, up and down distances, inf where there is no wall.
+        """
+        centers = np.asarray(agent_locations, dtype=np.int64) + car_size[0] // 2
+        center_x, center_y = centers[:, 0], centers[:, 1]
+
+        width, height = self.track_size
+        inside = (center_x >= 0) & (center_x < width) & (center_y >= 0) & (center_y < height)
+        distances = np.full((len(centers), 4), np.inf, dtype=np.float32)
+
+        if self.edge_distances is None:
+            for index in np.flatnonzero(inside):
+                distances[index] = self.wall_mask.distances_to_edges(center_x[index], center_y[index])
+            return distances
+
+        inside_distances = self.edge_distances[center_y[inside], center_x[inside]].astype(np.float32)
+        inside_distances[inside_distances == NO_WALL] = np.inf
+        distances[inside] = inside_distances
         return distances
 
     def check_collision(self, _agent_location, car_size):
@@ -193,43 +267,113 @@ class Track:
         x2 = int(x1 + car_size[0])
         y2 = int(y1 + car_size[1])
 
-        # Ensure the bounding box is within the track boundaries to avoid indexing errors
-        x1, x2 = max(0, x1), min(self.track_image.shape[1], x2)
-        y1, y2 = max(0, y1), min(self.track_image.shape[0], y2)
+        # Clip the bounding box to the track so the table lookups stay in range
+        width, height = self.track_size
+        x1, x2 = min(max(0, x1), width), min(max(0, x2), width)
+        y1, y2 = min(max(0, y1), height), min(max(0, y2), height)
 
-        # Extract the area of the track image where the car is located
-        car_area = self.track_image[y1:y2, x1:x2]
+        if self.wall_integral is None:
+            return self.wall_mask.any_in_box(x1, y1, x2, y2)
 
-        # Check if there are any white pixels in this area
-        collision = np.any(car_area == 255)
+        # Count the white pixels in the box from the summed-area table
+        table = self.wall_integral
+        collision = table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1] > 0
 
         return collision
 
+    def sweep_collision(self, start_location, end_location, car_size):
+        """Tests the car's box moving in a straight line from `start_location` to `end_location` for walls.
+
+        The box is tested at every pixel of travel in one batched `check_collisions` call, so a
+        fast car cannot jump over a thin border.
+
+        Returns:
+            float: The fraction of the move at which the box first touches a wall, or None if the move is clear.
+        """
+        start_location = np.asarray(start_location, dtype=np.float64)
+        delta = np.asarray(end_location, dtype=np.float64) - start_location
+        steps = max(int(np.ceil(np.abs(delta).max())), 1)
+        times = np.arange(1, steps + 1) / steps
+        locations = np.round(start_location + times[:, np.newaxis] * delta).astype(np.int64)
+
+        collisions = self.check_collisions(locations, car_size)
+        if not collisions.any():
+            return None
+        return float(times[np.argmax(collisions)])
+
+    def sweep_collisions(self, start_locations, end_locations, car_size):
+        """Batched `sweep_collision` for (N, 2) arrays of start and end positions.
+
+        Every box is tested at each pixel of the longest move, in one `check_collisions` call;
+        shorter moves repeat their end position.
+
+        Returns:
+            ndarray: (N,) float64 fractions of the moves at which the boxes first touch a wall, NaN where clear.
+        """
+        start_locations = np.asarray(start_locations, dtype=np.float64).reshape(-1, 2)
+        deltas = np.asarray(end_locations, dtype=np.float64).reshape(-1, 2) - start_locations
+        steps = np.maximum(np.ceil(np.abs(deltas).max(axis=1, initial=0)), 1)
+        times = np.minimum(np.arange(1, int(steps.max(initial=1)) + 1) / steps[:, np.newaxis], 1)
+        locations = np.round(start_locations[:, np.newaxis] + times[..., np.newaxis] * deltas[:, np.newaxis])
+
+        collisions = self.check_collisions(locations.reshape(-1, 2).astype(np.int64), car_size).reshape(times.shape)
+        hit = collisions.any(axis=1)
+        impact = np.full(len(start_locations), np.nan)
+        impact[hit] = times[hit, np.argmax(collisions[hit], axis=1)]
+        return impact
+
+    def check_collisions(self, agent_locations, car_size):
+        """Batched `check_collision` for an (N, 2) array of car positions.
+
+        Returns:
+            ndarray: Boolean array of shape (N,), True where the car's box contains a wall pixel.
+        """
+        agent_locations = np.asarray(agent_locations)
+        x1 = agent_locations[:, 0].astype(np.int64)
+        y1 = agent_locations[:, 1].astype(np.int64)
+        if self.wall_integral is None:
+            return self.wall_mask.any_in_boxes(x1, y1, int(car_size[0]), int(car_size[1]))
+        return count_in_boxes(self.wall_integral, x1, y1, x1 + int(car_size[0]), y1 + int(car_size[1])) > 0
+
 
 class F1_Env(gym.Env):
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 4}
 
-    def __init__(self, track_path="../tracks/track02.png", car_path="../cars/car2d.png", render_mode=None):
-        self.start_time = None
+    # Loaded tracks are shared by every env in the process: a new env, or one switched to a
+    # track used before, skips loading it again
+    TRACKS = TrackRegistry(load=Track)
+
+    # Reward terms of `compute_reward`, shared with `F1VectorEnv`
+    ALIVE_BONUS = 10
+    SPEED_FACTOR = 5
+    DISTANCE_FACTOR = 1
+    PROGRESS_FACTOR = 2
+    WRONG_DIRECTION_PENALTY = -100
+    STATIONARY_PENALTY = -50
+
+    def __init__(self, track_path="../tracks/track02.png", car_path="../cars/car2d.png", render_mode=None,
+                 bit_packed=False, tiled=False, resolution=1, max_episode_steps=MAX_EPISODE_STEPS):
+        self.max_episode_steps = max_episode_steps
         self._agent_location = None
+        self._previous_location = None
+        self.impact_time = None
 
-        self.car = Car(car_path)
-        self.track = Track(track_path)
+        # Without a render mode nothing is drawn: the car image is never prepared and no
+        # Surface is created, so the env runs without a display
+        self.car = Car(car_path, headless=render_mode is None)
+        self.track = F1_Env.TRACKS.get(track_path, bit_packed=bit_packed, tiled=tiled, resolution=resolution)
 
         self.total_distance = 0
         self.total_speed_accumulated = 0
         self.step_counter = 0
+        self.lap_distance = np.inf
+        self.progress = 0
+        self.progress_delta = 0
 
         self.window_track_size = (Track.TRACK_WIDTH, Track.TRACK_HEIGHT)  # Update this line
-        self.start_rect_coords = TrackUtils.get_start_rect_coords(track_path)
+        self.start_rect_coords = self.track.start_rect_coords
 
-        self.observation_space = Dict({
-            "position": Box(low=np.array([0, 0]), high=np.array(self.track.track_size), dtype=np.float32),
-            "angle": Box(low=np.array([-360]), high=np.array([360]), dtype=np.float32),
-            "speed": Box(low=np.array([0]), high=np.array([np.inf]), dtype=np.float32),
-            "distances_to_edges": Box(low=np.array([0, 0, 0, 0]), high=np.array([np.inf, np.inf, np.inf, np.inf]),
-                                      dtype=np.float32),
-        })
+        self.observation_space = F1_Env.make_observation_space(self.track)
 
         self.action_space = spaces.Discrete(5)  # Reflect correct number of actions
 
@@ -239,9 +383,18 @@ class F1_Env(gym.Env):
         if self.render_mode == "human":
             self._init_render()
 
+    @staticmethod
+    def make_observation_space(track):
+        return Dict({
+            "position": Box(low=np.array([0, 0]), high=np.array(track.track_size), dtype=np.float32),
+            "angle": Box(low=np.array([-360]), high=np.array([360]), dtype=np.float32),
+            "speed": Box(low=np.array([0]), high=np.array([np.inf]), dtype=np.float32),
+            "distances_to_edges": Box(low=np.array([0, 0, 0, 0]), high=np.array([np.inf, np.inf, np.inf, np.inf]),
+                                      dtype=np.float32),
+        })
+
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
-        self.start_time = time.time()
 
         self.car.speed = 0
         self.car.angle = 0  # Starting angle pointing to the right
@@ -253,6 +406,29 @@ class F1_Env(gym.Env):
         # Seed the random number generator for reproducibility
         rng = np.random.default_rng(seed)
 
+        # Spawn anywhere on the track ("uniform"), within one lap segment ("segment", optionally
+        # options["segment"]) or inside the start rectangle ("start", the default)
+        options = options or {}
+        spawn = options.get("spawn", "start")
+        if spawn == "start":
+            self._agent_location = self.sample_start_rect_location(rng)
+        else:
+            car_w = self.car.car_size[0]
+            center_x, center_y, angle = self.track.get_spawn_index(self.car.car_size).sample(
+                rng, spawn, options.get("segment"))
+            self.car.angle = angle  # Race direction at the spawn point
+            self._agent_location = np.array([center_x - car_w // 2, center_y - car_w // 2], dtype=np.int64)
+
+        self._previous_location = None
+        self.impact_time = None
+        self.lap_distance = self.get_lap_distance()
+        self.progress = 0
+        self.progress_delta = 0
+        info = {}
+        # Return the initial observation
+        return self._get_obs(), info
+
+    def sample_start_rect_location(self, rng):
         # Validate presence of start_rect_coords and car_size
         assert self.start_rect_coords is not None, "Starting rectangle coordinates are not defined."
         rect_x, rect_y, rect_w, rect_h = self.start_rect_coords
@@ -270,10 +446,7 @@ class F1_Env(gym.Env):
         start_x = rng.integers(rect_x, max_start_x + 1)  # +1 because the high value is exclusive
         start_y = rng.integers(rect_y, max_start_y + 1)
 
-        self._agent_location = np.array([start_x, start_y], dtype=np.int64)
-        info = {}
-        # Return the initial observation
-        return self._get_obs(), info
+        return np.array([start_x, start_y], dtype=np.int64)
 
     def step(self, action):
         self.car.apply_action(action)
@@ -282,10 +455,7 @@ class F1_Env(gym.Env):
         self._agent_location = self.move_agent()
 
         # Check if there's a collision
-        if time.time() - self.start_time > 30:
-            terminated = True
-        else:
-            terminated = self.check_illegal()
+        terminated = self.check_illegal()
 
         # Get the observation for the current state
         observation = self._get_obs()
@@ -295,18 +465,23 @@ class F1_Env(gym.Env):
         self.total_distance += distance_this_step
         self.total_speed_accumulated += self.car.speed
         self.step_counter += 1
+        self.update_progress()
+
+        # Running out of steps cuts the episode short without ending it: the state is not terminal
+        truncated = not terminated and self.step_counter >= self.max_episode_steps
 
         # Compute the reward based on observation and collision
         reward = self.compute_reward(observation, terminated)
 
         # Additional info can be returned if needed
-        info = {}
+        info = {"progress": self.progress}
 
-        return observation, reward, terminated, False, info
+        return observation, reward, terminated, truncated, info
 
     def move_agent(self):
         # Use the calculate_movement method from the Car class
         dx, dy = self.car.calculate_movement()
+        self._previous_location = self._agent_location
 
         # Update the agent's position, ensuring it does not go out of bounds
         new_x = np.clip(self._agent_location[0] + dx, 0, self.track.track_size[0] - 1)
@@ -319,7 +494,35 @@ class F1_Env(gym.Env):
         return self.check_collision() and self.is_car_left_of_start()
 
     def check_collision(self):
-        return self.track.check_collision(self._agent_location, self.car.car_size)
+        # The whole move since the last step is tested; a car that hit a wall is put back where it first touched it
+        self.impact_time = None
+        if self._previous_location is None:
+            return self.track.check_collision(self._agent_location, self.car.car_size)
+
+        impact = self.track.sweep_collision(self._previous_location, self._agent_location, self.car.car_size)
+        if impact is None:
+            return False
+        delta = self._agent_location - self._previous_location
+        self._agent_location = np.round(self._previous_location + impact * delta).astype(np.int64)
+        self.impact_time = impact
+        return True
+
+    def get_lap_distance(self):
+        if self.track.lap_progress is None:
+            return np.inf
+        center_x, center_y = self._agent_location + self.car.car_size[0] // 2
+        return self.track.lap_progress.distance(center_x, center_y)
+
+    def update_progress(self):
+        # Progress along the track since the last step, from the geodesic distance at the car's center
+        if self.track.lap_progress is None:
+            self.progress_delta = 0
+            return
+        lap_distance = self.get_lap_distance()
+        self.progress_delta = self.track.lap_progress.advance(self.lap_distance, lap_distance)
+        self.progress += self.progress_delta
+        if np.isfinite(lap_distance):
+            self.lap_distance = lap_distance
 
     def _get_obs(self):
         distances_to_edges = self.track.calculate_distances_to_edges(self._agent_location, self.car.car_size)
@@ -335,11 +538,12 @@ class F1_Env(gym.Env):
 
     def compute_reward(self, observation, collision):
         # Constants for reward calculation
-        alive_bonus = 10
-        speed_factor = 5
-        distance_factor = 1
-        wrong_direction_penalty = -100
-        stationary_penalty = -50
+        alive_bonus = F1_Env.ALIVE_BONUS
+        speed_factor = F1_Env.SPEED_FACTOR
+        distance_factor = F1_Env.DISTANCE_FACTOR
+        progress_factor = F1_Env.PROGRESS_FACTOR
+        wrong_direction_penalty = F1_Env.WRONG_DIRECTION_PENALTY
+        stationary_penalty = F1_Env.STATIONARY_PENALTY
 
         # Check if the agent is alive (not collided)
         alive_reward = alive_bonus if not collision else -alive_bonus
@@ -356,14 +560,20 @@ class F1_Env(gym.Env):
         # Reward for distance to edges (encourages staying away from edges)
         distance_reward = np.mean(observation["distances_to_edges"]) * distance_factor
 
-        # Check if the car is on the wrong side of the start point
-        if not self.is_car_left_of_start():
-            direction_penalty = wrong_direction_penalty
+        # Reward for progress along the track (driving in circles earns nothing)
+        progress_reward = self.progress_delta * progress_factor
+
+        # Check if the car is driving the wrong way around the track, or on the wrong side of
+        # the start point when the track has no progress field
+        if self.track.lap_progress is not None:
+            wrong_direction = self.progress_delta < 0
         else:
-            direction_penalty = 0  # No penalty if the car is on the correct side
+            wrong_direction = not self.is_car_left_of_start()
+        direction_penalty = wrong_direction_penalty if wrong_direction else 0
 
         # Total reward calculation
-        total_reward = alive_reward + speed_reward + distance_reward + direction_penalty + speed_penalty
+        total_reward = alive_reward + speed_reward + distance_reward + progress_reward + direction_penalty + \
+            speed_penalty
         return total_reward
 
     def _init_render(self):
@@ -377,19 +587,18 @@ class F1_Env(gym.Env):
         pygame.display.set_caption("F1 Racing Game")
         print(f"Window initialized with size: {self.window_track_size}")
 
-        # Load and scale the track image
+        # Load the image of the env's own track, scaled to the compiled track size
         try:
-            track_image_path = f"track01_{Track.TRACK_WIDTH}_{Track.TRACK_HEIGHT}.png"  # Ensure using the resized path
-            self.track_image_pygame = pygame.image.load(track_image_path).convert()
-            print(f"Loaded track image from {track_image_path}")
+            self.track_image_pygame = self.track.get_surface().convert()
+            print(f"Loaded track image from {self.track.track_path}")
         except Exception as e:
             print(f"Failed to load track image: {e}")
             return
 
-        # Load the car image
+        # Load the car image, shared with every env in the process along with its rotations
         try:
             # Ensure using the resized image path for the car
-            self.car_image_pygame = pygame.image.load(self.car.car_path).convert_alpha()
+            self.car_atlas = get_atlas(self.car.car_path, self.car.car_size, alpha=True)
             print(f"Loaded car image from {self.car.car_path}")
         except Exception as e:
             print(f"Failed to load car image: {e}")
@@ -419,8 +628,7 @@ class F1_Env(gym.Env):
         print(f"Car position: {car_pos}, Car angle: {self.car.angle}")
 
         try:
-            car_rotated = pygame.transform.rotate(self.car_image_pygame,
-                                                  -self.car.angle)  # Negative for correct rotation direction
+            car_rotated = self.car_atlas.rotated(-self.car.angle)  # Negative for correct rotation direction
             car_rect = car_rotated.get_rect(center=car_pos)
         except Exception as e:
             print(f"Error rotating or positioning car image: {e}")
@@ -449,3 +657,232 @@ class F1_Env(gym.Env):
         else:
             print("Starting point not defined.")
             return False
+
+
+class F1VectorEnv(VectorEnv):
+    """`num_envs` copies of `F1_Env` stepped together, with one shared track and the cars as arrays.
+
+    Each sub-environment follows the rules of `F1_Env` exactly: the same actions, swept box
+    collisions, observations, rewards and `max_episode_steps` truncation. Instead of N envs
+    with N cars, the car states (position, heading, speed and episode totals) are arrays
+    with a row per sub-environment, and `step` advances all of them with a fixed number of
+    NumPy calls. The track comes from `F1_Env.TRACKS`, so it is loaded once and shared
+    read-only with every other env on it.
+
+    Sub-environments that finish an episode are reset by the next `step`, which ignores their
+    action and returns their first observation with a zero reward (gymnasium's next-step
+    autoreset). `reset` accepts `options["reset_mask"]` to reset only some of them, and the
+    "spawn" and "segment" options of `F1_Env.reset`, which autoresets keep using.
+
+    Rendering is not supported: the cars are never drawn. Neither are the packed, tiled and
+    scaled wall masks (`bit_packed`, `tiled` and `resolution` below 1), which `Track` reads car
+    by car; they raise a ValueError instead of stepping the cars one at a time.
+
+    Attributes:
+        track (Track): The shared track.
+        car_size (tuple): The (width, height) of the cars' boxes.
+        max_episode_steps (int): The steps after which an episode is truncated.
+        agent_location (ndarray): (N, 2) int64 top-left corners of the cars' boxes.
+        angle (ndarray): (N,) float64 headings in degrees.
+        speed (ndarray): (N,) float64 speeds.
+        total_distance (ndarray): (N,) float64 distances driven this episode.
+        total_speed_accumulated (ndarray): (N,) float64 sums of the speeds this episode.
+        step_counter (ndarray): (N,) int64 steps taken this episode.
+        lap_distance (ndarray): (N,) float64 last known lap distances.
+        progress (ndarray): (N,) float64 lap progress this episode.
+        progress_delta (ndarray): (N,) float64 progress of the last step.
+        impact_time (ndarray): (N,) float64 fractions of the last move at which the car hit a wall, or NaN.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, num_envs, track_path="../tracks/track02.png", bit_packed=False, tiled=False, resolution=1,
+                 max_episode_steps=MAX_EPISODE_STEPS):
+        if bit_packed or tiled or resolution != 1:
+            raise ValueError("F1VectorEnv needs the full-resolution wall tables: bit_packed, tiled and "
+                             f"resolution below 1 are not supported, got {bit_packed=}, {tiled=}, {resolution=}")
+        self.num_envs = num_envs
+        self.track = F1_Env.TRACKS.get(track_path, bit_packed=bit_packed, tiled=tiled, resolution=resolution)
+        self.car_size = (Car.CAR_WIDTH, Car.CAR_HEIGHT)
+        self.max_episode_steps = max_episode_steps
+        self.start_rect_coords = self.track.start_rect_coords
+        self.render_mode = None
+
+        self.action_changes = np.array([ENV_ACTIONS.changes.get(action, (0, 0)) for action in range(len(ENV_ACTIONS))],
+                                       dtype=np.float64)
+        self.single_observation_space = F1_Env.make_observation_space(self.track)
+        self.single_action_space = spaces.Discrete(5)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        self.agent_location = np.zeros((num_envs, 2), dtype=np.int64)
+        self.angle = np.zeros(num_envs, dtype=np.float64)
+        self.speed = np.zeros(num_envs, dtype=np.float64)
+        self.total_distance = np.zeros(num_envs, dtype=np.float64)
+        self.total_speed_accumulated = np.zeros(num_envs, dtype=np.float64)
+        self.step_counter = np.zeros(num_envs, dtype=np.int64)
+        self.lap_distance = np.full(num_envs, np.inf)
+        self.progress = np.zeros(num_envs, dtype=np.float64)
+        self.progress_delta = np.zeros(num_envs, dtype=np.float64)
+        self.impact_time = np.full(num_envs, np.nan)
+        self.spawn = "start"
+        self.segment = None
+        # Sub-environments whose episode ended on the last step, reset by the next one
+        self.autoreset = np.zeros(num_envs, dtype=bool)
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+
+        options = options or {}
+        self.spawn = options.get("spawn", "start")
+        self.segment = options.get("segment")
+        reset_mask = np.asarray(options.get("reset_mask", np.ones(self.num_envs, dtype=bool)), dtype=bool)
+        self.reset_envs(reset_mask)
+        return self._get_obs(), {}
+
+    def reset_envs(self, mask):
+        """Starts a new episode in the sub-environments selected by the (N,) boolean `mask`."""
+        indices = np.flatnonzero(mask)
+        rng = self.np_random
+        self.angle[indices] = 0  # Starting angle pointing to the right
+        self.speed[indices] = 0
+
+        if self.spawn == "start":
+            self.agent_location[indices] = self.sample_start_rect_locations(rng, len(indices))
+        else:
+            car_w = self.car_size[0]
+            center_x, center_y, angle = self.track.get_spawn_index(self.car_size).samples(
+                rng, len(indices), self.spawn, self.segment)
+            self.angle[indices] = angle  # Race direction at the spawn points
+            self.agent_location[indices] = np.stack([center_x - car_w // 2, center_y - car_w // 2], axis=1)
+
+        self.total_distance[indices] = 0
+        self.total_speed_accumulated[indices] = 0
+        self.step_counter[indices] = 0
+        self.lap_distance[indices] = self.get_lap_distances(self.agent_location[indices])
+        self.progress[indices] = 0
+        self.progress_delta[indices] = 0
+        self.impact_time[indices] = np.nan
+        self.autoreset[indices] = False
+
+    def sample_start_rect_locations(self, rng, count):
+        # Uniform positions inside the start rectangle, as `F1_Env.sample_start_rect_location`
+        assert self.start_rect_coords is not None, "Starting rectangle coordinates are not defined."
+        rect_x, rect_y, rect_w, rect_h = self.start_rect_coords
+        car_w, car_h = self.car_size
+
+        if rect_w <= car_w or rect_h <= car_h:
+            raise ValueError("The starting rectangle is too small for the car.")
+
+        start_x = rng.integers(rect_x, rect_x + rect_w - car_w + 1, size=count)
+        start_y = rng.integers(rect_y, rect_y + rect_h - car_h + 1, size=count)
+        return np.stack([start_x, start_y], axis=1)
+
+    def step(self, actions):
+        active = ~self.autoreset
+        resetting = self.autoreset.copy()
+
+        # Apply each action, as `CarCore.apply_action` does with `ENV_ACTIONS`
+        actions = np.asarray(actions, dtype=np.int64)
+        mapped = active & (actions >= 0) & (actions < len(self.action_changes))
+        angle_change, speed_change = np.where(mapped[:, np.newaxis],
+                                              self.action_changes[np.where(mapped, actions, 0)], 0).T
+        self.angle += angle_change
+        self.speed += speed_change
+
+        # Move the cars, keeping them on the track
+        radians = np.radians(360 - self.angle)
+        dx, dy = self.speed * np.cos(radians), self.speed * np.sin(radians)
+        previous_location = self.agent_location.copy()
+        width, height = self.track.track_size
+        moved = np.stack([np.clip(self.agent_location[:, 0] + dx, 0, width - 1),
+                          np.clip(self.agent_location[:, 1] + dy, 0, height - 1)], axis=1).astype(np.int64)
+        self.agent_location[active] = moved[active]
+
+        terminated = self.check_illegal(previous_location, active)
+
+        self.total_distance[active] += np.sqrt(dx ** 2 + dy ** 2)[active]
+        self.total_speed_accumulated[active] += self.speed[active]
+        self.step_counter[active] += 1
+        self.update_progress(active)
+
+        # Running out of steps cuts the episode short without ending it: the state is not terminal
+        truncated = active & ~terminated & (self.step_counter >= self.max_episode_steps)
+
+        # The episode totals are those of the finished episodes until their reset on the next step
+        info = {
+            "progress": self.progress.copy(),
+            "total_distance": self.total_distance.copy(),
+            "total_speed_accumulated": self.total_speed_accumulated.copy(),
+            "step_counter": self.step_counter.copy(),
+        }
+
+        if resetting.any():
+            self.reset_envs(resetting)
+        observation = self._get_obs()
+        reward = np.where(active, self.compute_rewards(observation, terminated), 0.0)
+
+        self.autoreset = terminated | truncated
+        return observation, reward, terminated, truncated, info
+
+    def check_illegal(self, previous_location, active):
+        # A car that hit a wall is put back where it first touched it; it only ends its episode left of the start
+        impact = np.full(self.num_envs, np.nan)
+        impact[active] = self.track.sweep_collisions(previous_location[active], self.agent_location[active],
+                                                     self.car_size)
+        hit = ~np.isnan(impact)
+        delta = self.agent_location[hit] - previous_location[hit]
+        self.agent_location[hit] = np.round(previous_location[hit] + impact[hit, np.newaxis] * delta).astype(np.int64)
+        self.impact_time = impact
+        return hit & self.is_car_left_of_start()
+
+    def get_lap_distances(self, agent_locations):
+        if self.track.lap_progress is None:
+            return np.full(len(agent_locations), np.inf)
+        centers = agent_locations + self.car_size[0] // 2
+        return self.track.lap_progress.distances(centers[:, 0], centers[:, 1]).astype(np.float64)
+
+    def update_progress(self, active):
+        # Progress along the track since the last step, as `F1_Env.update_progress`
+        if self.track.lap_progress is None:
+            self.progress_delta[:] = 0
+            return
+        lap_distance = self.get_lap_distances(self.agent_location)
+        self.progress_delta = np.where(active, self.track.lap_progress.advances(self.lap_distance, lap_distance), 0.0)
+        self.progress += self.progress_delta
+        known = active & np.isfinite(lap_distance)
+        self.lap_distance[known] = lap_distance[known]
+
+    def _get_obs(self):
+        return {
+            "position": self.agent_location.astype(np.float32),
+            "angle": self.angle.astype(np.float32)[:, np.newaxis],
+            "speed": self.speed.astype(np.float32)[:, np.newaxis],
+            "distances_to_edges": self.track.calculate_distances_to_edges_many(self.agent_location, self.car_size),
+        }
+
+    def compute_rewards(self, observation, collision):
+        # The terms of `F1_Env.compute_reward`, for every sub-environment at once
+        alive_reward = np.where(collision, -F1_Env.ALIVE_BONUS, F1_Env.ALIVE_BONUS)
+
+        speed = observation["speed"][:, 0]
+        stationary = speed <= 0
+        speed_reward = np.where(stationary, 0, speed * F1_Env.SPEED_FACTOR)
+        speed_penalty = np.where(stationary, F1_Env.STATIONARY_PENALTY, 0)
+
+        distance_reward = np.mean(observation["distances_to_edges"], axis=1) * F1_Env.DISTANCE_FACTOR
+        progress_reward = self.progress_delta * F1_Env.PROGRESS_FACTOR
+
+        if self.track.lap_progress is not None:
+            wrong_direction = self.progress_delta < 0
+        else:
+            wrong_direction = ~self.is_car_left_of_start()
+        direction_penalty = np.where(wrong_direction, F1_Env.WRONG_DIRECTION_PENALTY, 0)
+
+        return alive_reward + speed_reward + distance_reward + progress_reward + direction_penalty + speed_penalty
+
+    def is_car_left_of_start(self):
+        # Whether each car's left edge is left of the start rectangle's right edge
+        if self.start_rect_coords is None:
+            return np.zeros(self.num_envs, dtype=bool)
+        return self.agent_location[:, 0] < self.start_rect_coords[0] + self.start_rect_coords[2]
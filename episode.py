@@ -0,0 +1,3 @@
+# Every run is cut after this many steps, however fast the machine runs it: one minute at the
+# 60 frames per second races are drawn at. `F1_Env`, the Q-learning runs and the NEAT runs share it.
+MAX_EPISODE_STEPS = 60 * 60
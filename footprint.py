@@ -0,0 +1,288 @@
+import math
+import threading
+
+import numpy as np
+
+
+class Footprint:
+    """The rotated rectangle a car covers, tested against a wall mask in one gather.
+
+    The footprint is a fixed set of sample offsets in the car's own frame: its outline, one
+    sample per pixel of each side, or with `fill` every pixel inside it as well. A collision
+    test rotates the offsets to the car's heading, moves them to its center and reads the wall
+    mask at all of them at once; many cars are tested in a single (cars, samples) gather.
+
+    Like `ConfigurationSpace`, the car faces along (cos(angle), -sin(angle)) in screen
+    coordinates, with `size_x` along the heading and `size_y` across it, and a footprint that
+    leaves the map collides. The outline is enough for walls thicker than a pixel, which a car
+    cannot cross without touching; `fill` also catches walls lying wholly under the car.
+
+    `sweeps` tests the whole move of a car instead of its end pose, so a fast car cannot jump
+    over a thin wall. The area a rectangle sweeps while translating is bounded by its outlines
+    at both ends and by the paths of its corners, so a clear move costs the end-pose test plus
+    one sample per pixel of each corner path; the start pose was tested by the previous move.
+    With a wall distance field, `clear_move` settles most moves far from the walls in two
+    lookups before any sample is read.
+
+    Attributes:
+        size_x (float): The footprint length along the heading, in pixels.
+        size_y (float): The footprint width across the heading, in pixels.
+        fill (bool): Whether the interior is sampled, not only the outline.
+        along (ndarray): The float64 sample offsets along the heading.
+        across (ndarray): The float64 sample offsets across the heading.
+        corner_along (ndarray): The offsets of the corners along the heading.
+        corner_across (ndarray): The offsets of the corners across the heading.
+        radius (float): The distance from the center to the corners.
+    """
+
+    # Pixel rounding of the centers and of the samples, in pixels
+    CLEARANCE_MARGIN = 3
+    FOOTPRINTS = {}
+    LOCK = threading.Lock()
+
+    def __init__(self, size_x, size_y, fill=False):
+        self.size_x = size_x
+        self.size_y = size_y
+        self.fill = fill
+        self.along, self.across = Footprint.offsets(size_x, size_y, fill)
+        # Front left, front right, back right, back left
+        self.corner_along = np.array([1, 1, -1, -1]) * size_x / 2
+        self.corner_across = np.array([-1, 1, 1, -1]) * size_y / 2
+        self.radius = math.hypot(size_x, size_y) / 2
+
+    @staticmethod
+    def get(size_x, size_y, fill=False):
+        """Returns the shared footprint of a car size, building it on first use."""
+        key = (size_x, size_y, fill)
+        with Footprint.LOCK:
+            footprint = Footprint.FOOTPRINTS.get(key)
+            if footprint is None:
+                footprint = Footprint.FOOTPRINTS[key] = Footprint(size_x, size_y, fill)
+        return footprint
+
+    @staticmethod
+    def offsets(size_x, size_y, fill=False):
+        """Places the samples of a `size_x` x `size_y` rectangle centered on the origin.
+
+        Returns:
+            tuple: The offsets along and across the heading, float64 arrays at most a pixel apart.
+        """
+        along = np.linspace(-size_x / 2, size_x / 2, int(math.ceil(size_x)) + 1)
+        across = np.linspace(-size_y / 2, size_y / 2, int(math.ceil(size_y)) + 1)
+        if fill:
+            along, across = np.meshgrid(along, across)
+            return along.ravel(), across.ravel()
+
+        # Each corner is sampled once, by the sides running along the heading.
+        inner = across[1:-1]
+        return (np.concatenate([along, along, np.full(len(inner), along[0]), np.full(len(inner), along[-1])]),
+                np.concatenate([np.full(len(along), across[0]), np.full(len(along), across[-1]), inner, inner]))
+
+    def corners(self, center_x, center_y, angles):
+        """Returns the corners of cars' footprints: front left, front right, back right, back left.
+
+        Returns:
+            ndarray: The (..., 4, 2) float64 corner coordinates.
+        """
+        radians = np.radians(np.asarray(angles, dtype=np.float64))[..., np.newaxis]
+        cos, sin = np.cos(radians), np.sin(radians)
+        along, across = self.corner_along, self.corner_across
+        xs = np.asarray(center_x, dtype=np.float64)[..., np.newaxis] + along * cos + across * sin
+        ys = np.asarray(center_y, dtype=np.float64)[..., np.newaxis] - along * sin + across * cos
+        return np.stack([xs, ys], axis=-1)
+
+    @staticmethod
+    def hits(wall_mask, xs, ys):
+        """Reads the wall mask at integer pixels; pixels off the map count as walls.
+
+        Returns:
+            ndarray: Boolean array shaped like `xs`.
+        """
+        height, width = wall_mask.shape
+        outside = (xs < 0) | (xs >= width) | (ys < 0) | (ys >= height)
+        # Off-map samples are clipped for the gather and count as hits anyway.
+        return wall_mask[np.clip(ys, 0, height - 1), np.clip(xs, 0, width - 1)] | outside
+
+    def points(self, center_x, center_y, angles):
+        """Returns the sample pixels of cars centered on (center_x, center_y) with the given headings.
+
+        Args:
+            center_x, center_y, angles: Scalars or (N,) arrays; headings in degrees.
+
+        Returns:
+            tuple: The (..., samples) int64 x and y pixel arrays.
+        """
+        radians = np.radians(np.asarray(angles, dtype=np.float64))[..., np.newaxis]
+        cos, sin = np.cos(radians), np.sin(radians)
+        xs = np.asarray(center_x, dtype=np.float64)[..., np.newaxis] + self.along * cos + self.across * sin
+        ys = np.asarray(center_y, dtype=np.float64)[..., np.newaxis] - self.along * sin + self.across * cos
+        return np.floor(xs).astype(np.int64), np.floor(ys).astype(np.int64)
+
+    def collides_many(self, wall_mask, center_x, center_y, angles):
+        """Checks whether the footprints of many cars touch a wall or leave the map.
+
+        Args:
+            wall_mask (ndarray, BitMask, ScaledMask or TiledMask): Border mask indexed as [y, x].
+            center_x, center_y (ndarray): (N,) car centers.
+            angles (ndarray): (N,) headings in degrees.
+
+        Returns:
+            ndarray: Boolean array of shape (N,), True where a car collides.
+        """
+        xs, ys = self.points(center_x, center_y, angles)
+        return Footprint.hits(wall_mask, xs, ys).any(axis=-1)
+
+    def collides(self, wall_mask, center_x, center_y, angle):
+        """Single-car `collides_many`.
+
+        Returns:
+            bool: True if the car's footprint touches a wall or leaves the map.
+        """
+        radians = math.radians(angle)
+        cos, sin = math.cos(radians), math.sin(radians)
+        xs = np.floor(center_x + self.along * cos + self.across * sin).astype(np.int64)
+        ys = np.floor(center_y - self.along * sin + self.across * cos).astype(np.int64)
+        height, width = wall_mask.shape
+        if xs.min() < 0 or ys.min() < 0 or xs.max() >= width or ys.max() >= height:
+            return True
+        return bool(wall_mask[ys, xs].any())
+
+    @staticmethod
+    def probe_points(center_x, center_y, angles, size_x):
+        """Returns the four probe points of the collision test the footprint replaced.
+
+        The probes lie half a car length from the center, along the heading and the heading
+        minus 90 degrees, with both coordinates shifted by the same cosine. They do not trace
+        the car's outline; they are kept to reproduce the states the saved models were trained on.
+
+        Returns:
+            ndarray: The (..., 4, 2) float64 probe coordinates.
+        """
+        headings = np.asarray(angles, dtype=np.float64)[..., np.newaxis] - np.array([0, 0, 90, 90])
+        shift = np.array([1, -1, 1, -1]) * size_x / 2 * np.cos(np.radians(360 - headings))
+        return np.stack([np.asarray(center_x, dtype=np.float64)[..., np.newaxis] + shift,
+                         np.asarray(center_y, dtype=np.float64)[..., np.newaxis] + shift], axis=-1)
+
+    @staticmethod
+    def probe_collides_many(wall_mask, center_x, center_y, angles, size_x):
+        """The collision test the footprint replaced, for many cars (see `Car.PROBE_COLLISION`).
+
+        A car collides if a probe point leaves the map, or if a wall lies on the lines between
+        consecutive probes, sampled once per integer x as the original loop did.
+
+        Returns:
+            ndarray: Boolean array shaped like `center_x`, True where a car collides.
+        """
+        probes = Footprint.probe_points(center_x, center_y, angles, size_x)
+        height, width = wall_mask.shape
+        outside = ((probes[..., 0] < 0) | (probes[..., 0] >= width) |
+                   (probes[..., 1] < 0) | (probes[..., 1] >= height)).any(axis=-1)
+
+        # int() of the original truncates toward zero, as the cast does
+        x1, y1 = probes[..., 0].astype(np.int64), probes[..., 1].astype(np.int64)
+        x2, y2 = np.roll(x1, -1, axis=-1), np.roll(y1, -1, axis=-1)
+        steps = np.arange(int(math.ceil(size_x)) + 2)
+        xs = np.minimum(x1, x2)[..., np.newaxis] + steps
+        sampled = steps < np.abs(x2 - x1)[..., np.newaxis]
+        # Vertical lines have no samples; their infinite slopes are masked out
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ys = ((y2 - y1) / (x2 - x1))[..., np.newaxis] * (xs - x1[..., np.newaxis]) + y1[..., np.newaxis]
+        ys = np.where(sampled, ys, 0).astype(np.int64)
+        hits = Footprint.hits(wall_mask, xs, ys) & sampled
+        return outside | hits.any(axis=(-2, -1))
+
+    def sweeps(self, wall_mask, start_x, start_y, end_x, end_y, angles):
+        """Checks the moves of many cars, translating at a fixed heading, for walls along the way.
+
+        Args:
+            wall_mask (ndarray, BitMask, ScaledMask or TiledMask): Border mask indexed as [y, x].
+            start_x, start_y (ndarray): (N,) car centers before the move.
+            end_x, end_y (ndarray): (N,) car centers after the move.
+            angles (ndarray): (N,) headings in degrees.
+
+        Returns:
+            ndarray: (N,) float64 times of impact: the fraction of the move at which the car
+            first touches a wall, in (0, 1], or NaN if the move is clear. Moves are sampled one
+            pixel apart, so a time is exact to a pixel of travel.
+        """
+        start_x, start_y, end_x, end_y, angles = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in (start_x, start_y, end_x, end_y, angles)))
+        dx, dy = end_x - start_x, end_y - start_y
+        steps = np.maximum(np.ceil(np.maximum(np.abs(dx), np.abs(dy))), 1)
+        times = np.minimum(np.arange(1, int(steps.max(initial=1)) + 1) / steps[:, np.newaxis], 1)
+
+        corners = self.corners(start_x, start_y, angles)
+        trace_x = corners[:, :, 0, np.newaxis] + times[:, np.newaxis, :] * dx[:, np.newaxis, np.newaxis]
+        trace_y = corners[:, :, 1, np.newaxis] + times[:, np.newaxis, :] * dy[:, np.newaxis, np.newaxis]
+        end_xs, end_ys = self.points(end_x, end_y, angles)
+        end_hit = Footprint.hits(wall_mask, end_xs, end_ys).any(axis=1)
+        # (N, times): whether any corner path is on a wall at each time
+        trace_hit = Footprint.hits(wall_mask, np.floor(trace_x).astype(np.int64),
+                                   np.floor(trace_y).astype(np.int64)).any(axis=1)
+        hit = end_hit | trace_hit.any(axis=1)
+
+        impact = np.full(len(dx), np.nan)
+        if hit.any():
+            # Only blocked moves are resolved pose by pose, to find where the car first touches.
+            # The first time a corner path or a pose touches a wall is the time of impact.
+            times, trace_hit = times[hit], trace_hit[hit]
+            poses = self.collides_many(wall_mask, start_x[hit, np.newaxis] + times * dx[hit, np.newaxis],
+                                       start_y[hit, np.newaxis] + times * dy[hit, np.newaxis],
+                                       np.broadcast_to(angles[hit, np.newaxis], times.shape))
+            # Otherwise only the end pose's outline touched, at the end of the move
+            touching = poses | trace_hit
+            first = np.argmax(touching, axis=1)
+            impact[hit] = np.where(touching.any(axis=1), times[np.arange(len(first)), first], 1.0)
+        return impact
+
+    def sweep(self, wall_mask, start_x, start_y, end_x, end_y, angle):
+        """Single-car `sweeps`: the end-pose outline and the corner paths in one gather.
+
+        Returns:
+            float: The time of impact in (0, 1], or None if the move is clear.
+        """
+        dx, dy = end_x - start_x, end_y - start_y
+        steps = max(math.ceil(max(abs(dx), abs(dy))), 1)
+        times = np.arange(1, steps + 1) / steps
+        radians = math.radians(angle)
+        cos, sin = math.cos(radians), math.sin(radians)
+
+        # The end pose's outline, then each start corner's path
+        corner_x = start_x + self.corner_along * cos + self.corner_across * sin
+        corner_y = start_y - self.corner_along * sin + self.corner_across * cos
+        xs = np.floor(np.concatenate([end_x + self.along * cos + self.across * sin,
+                                      (corner_x[:, np.newaxis] + times * dx).ravel()])).astype(np.int64)
+        ys = np.floor(np.concatenate([end_y - self.along * sin + self.across * cos,
+                                      (corner_y[:, np.newaxis] + times * dy).ravel()])).astype(np.int64)
+        height, width = wall_mask.shape
+        inside = xs.min() >= 0 and ys.min() >= 0 and xs.max() < width and ys.max() < height
+        if inside and not wall_mask[ys, xs].any():
+            return None
+
+        # The first time a corner path or a pose touches a wall, or else the end pose, as in `sweeps`
+        corner_count = len(self.corner_along)
+        trace_hit = Footprint.hits(wall_mask, xs[-corner_count * steps:], ys[-corner_count * steps:])
+        touching = trace_hit.reshape(corner_count, steps).any(axis=0)
+        touching |= self.collides_many(wall_mask, start_x + times * dx, start_y + times * dy, np.full(steps, angle))
+        return float(times[np.argmax(touching)]) if touching.any() else 1.0
+
+    def clear_move(self, distance_field, start_x, start_y, end_x, end_y):
+        """Checks from the wall distance field alone that a move cannot touch a wall.
+
+        The field changes by at most one pixel per pixel, so no point of a move of length L
+        between centers d0 and d1 from the walls comes closer to them than (d0 + d1 - L) / 2.
+        Beyond the footprint's radius, neither `sweep` nor a configuration-space sweep can
+        find a wall, so the move is clear; False only means the move has to be tested.
+
+        Args:
+            distance_field (ndarray): The wall distance field, e.g. `Track.distance_field`.
+
+        Returns:
+            bool: True if the move is certainly clear.
+        """
+        x0, y0, x1, y1 = int(start_x), int(start_y), int(end_x), int(end_y)
+        height, width = distance_field.shape
+        if not (0 <= x0 < width and 0 <= y0 < height and 0 <= x1 < width and 0 <= y1 < height):
+            return False
+        clearance = (float(distance_field[y0, x0]) + float(distance_field[y1, x1]) - math.hypot(x1 - x0, y1 - y0)) / 2
+        return clearance > self.radius + Footprint.CLEARANCE_MARGIN
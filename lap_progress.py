@@ -0,0 +1,120 @@
+import numpy as np
+
+from start_line import StartLine
+from track_fields import GEODESIC_DISTANCE_VERSION, geodesic_distance_field
+
+
+class LapProgress:
+    """Lap progress of any track pixel, from a precomputed geodesic distance field.
+
+    The field holds the driving distance from the start line to every pixel through free
+    space, in the race direction (see `track_fields.geodesic_distance_field`), so how far
+    a car has come along the lap is one lookup at its center. Unlike summing the speed,
+    driving in circles or backwards earns nothing.
+
+    Attributes:
+        field (ndarray): float32 array indexed as [y, x]; inf on walls and unreachable pixels.
+        lap_length (float): The largest distance in the field, the length of one lap.
+    """
+
+    LAYER = 'geodesic_distance'
+
+    def __init__(self, field):
+        self.field = field
+        reachable = field[np.isfinite(field)]
+        self.lap_length = float(reachable.max()) if len(reachable) else 0.0
+
+    @staticmethod
+    def load(bundle):
+        """Returns the progress field of a compiled track, building and caching it on first use.
+
+        Returns:
+            LapProgress: The field, or None if the track has no start line.
+        """
+        first_point, second_point = bundle.start_line
+        if first_point is None:
+            return None
+
+        normal = StartLine(first_point, second_point).normal
+        return LapProgress(bundle.layer(LapProgress.LAYER, lambda b: geodesic_distance_field(
+            b.wall_mask, b.start_line_mask, normal), GEODESIC_DISTANCE_VERSION))
+
+    def distance(self, x, y):
+        """Returns the distance along the lap at pixel (x, y), or inf off the map, on walls and unreachable pixels."""
+        x, y = int(x), int(y)
+        height, width = self.field.shape
+        if not (0 <= x < width and 0 <= y < height):
+            return np.inf
+        return float(self.field[y, x])
+
+    def distances(self, xs, ys):
+        """Vectorized `distance` for arrays of pixels."""
+        xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        height, width = self.field.shape
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        distances = np.full(xs.shape, np.inf, dtype=np.float32)
+        distances[inside] = self.field[ys[inside], xs[inside]]
+        return distances
+
+    def fraction(self, x, y):
+        """Returns the completed fraction of the lap at pixel (x, y), in [0, 1], or None if unknown."""
+        distance = self.distance(x, y)
+        if not np.isfinite(distance) or self.lap_length == 0:
+            return None
+        return distance / self.lap_length
+
+    def advance(self, previous_distance, distance):
+        """Returns the progress made between two lap distances, accounting for crossing the line.
+
+        A jump of more than half a lap means the car crossed the start line, forwards when
+        the distance drops and backwards when it grows. Unknown distances (inf) count as no
+        progress.
+
+        Args:
+            previous_distance (float): The lap distance before the step.
+            distance (float): The lap distance after the step.
+
+        Returns:
+            float: The signed progress in pixels; negative when driving the wrong way.
+        """
+        if not (np.isfinite(previous_distance) and np.isfinite(distance)):
+            return 0.0
+
+        delta = distance - previous_distance
+        if delta < -self.lap_length / 2:
+            delta += self.lap_length
+        elif delta > self.lap_length / 2:
+            delta -= self.lap_length
+        return float(delta)
+
+    def advances(self, previous_distances, distances):
+        """Vectorized `advance` for arrays of lap distances."""
+        previous_distances, distances = np.asarray(previous_distances), np.asarray(distances)
+        known = np.isfinite(previous_distances) & np.isfinite(distances)
+        delta = np.where(known, distances - previous_distances, 0.0)
+        delta = np.where(delta < -self.lap_length / 2, delta + self.lap_length, delta)
+        delta = np.where(delta > self.lap_length / 2, delta - self.lap_length, delta)
+        return delta
+
+    def race_headings(self, spacing=4):
+        """Returns the race direction at every pixel, from the slope of the field.
+
+        The slope is a central difference over `spacing` pixels on each side, which smooths
+        the chamfer steps of the field; differences across the start line are unwrapped.
+
+        Returns:
+            ndarray: float32 headings in degrees, in the cars' convention (the car moves
+            along (cos, -sin)), NaN where the field is unknown around the pixel.
+        """
+        field = np.where(np.isfinite(self.field), self.field, np.nan)
+        padded = np.pad(field, spacing, constant_values=np.nan)
+        height, width = field.shape
+
+        def slope(after, before):
+            delta = after - before
+            delta = np.where(delta < -self.lap_length / 2, delta + self.lap_length, delta)
+            return np.where(delta > self.lap_length / 2, delta - self.lap_length, delta)
+
+        slope_x = slope(padded[spacing:spacing + height, 2 * spacing:], padded[spacing:spacing + height, :width])
+        slope_y = slope(padded[2 * spacing:, spacing:spacing + width], padded[:height, spacing:spacing + width])
+        return np.degrees(np.arctan2(-slope_y, slope_x)).astype(np.float32)
@@ -33,15 +33,17 @@ class QLearningAgent:
 def train_agent(env, agent, episodes=5000):
     rewards = []
     for episode in range(episodes):
-        state = env.reset()
+        state, _ = env.reset()
         state = tuple(map(int, state['position']))  # Simplify state representation
         total_reward = 0
         done = False
         while not done:
             action = agent.select_action(state)
-            next_state, reward, done, _ = env.step(action)
+            next_state, reward, terminated, truncated, _ = env.step(action)
             next_state = tuple(map(int, next_state['position']))
-            agent.update_q_table(state, action, reward, next_state, done)
+            # A truncated episode still bootstraps from the next state; only a terminal one does not
+            agent.update_q_table(state, action, reward, next_state, terminated)
+            done = terminated or truncated
             state = next_state
             total_reward += reward
             if done:
@@ -0,0 +1,202 @@
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from track_fields import WALL_DISTANCE_VERSION, wall_distance_field
+
+
+def _trace_direction(distance_field, angle, max_length):
+    """Sphere-traces one ray from every free pixel at once.
+
+    This is `track_fields.trace_ray` run over arrays: every origin advances by its current
+    clearance minus the truncation margin until it reaches a wall, the map edge or
+    `max_length`, and the march length where it stopped is recorded.
+
+    Returns:
+        ndarray: A uint16 array of shape (height, width) with the ray length for each origin.
+    """
+    height, width = distance_field.shape
+    radians = math.radians(360 - angle)
+    dx, dy = math.cos(radians), math.sin(radians)
+
+    lengths = np.zeros((height, width), dtype=np.uint16)
+    origin_y, origin_x = np.nonzero(distance_field > 0)
+    length = np.zeros(len(origin_x), dtype=np.int64)
+    x, y = origin_x.astype(np.int64), origin_y.astype(np.int64)
+
+    while len(length):
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        clearance = np.zeros(len(length), dtype=np.int64)
+        clearance[inside] = distance_field[y[inside], x[inside]]
+
+        done = (clearance == 0) | (length >= max_length)
+        lengths[origin_y[done], origin_x[done]] = length[done]
+
+        going = ~done
+        origin_x, origin_y, length, clearance = origin_x[going], origin_y[going], length[going], clearance[going]
+        length = np.minimum(length + np.maximum(1, clearance - 2), max_length)
+        x = (origin_x + length * dx).astype(np.int64)
+        y = (origin_y + length * dy).astype(np.int64)
+
+    return lengths
+
+
+def _build_direction(args):
+    """Pool worker: traces one direction and writes it into the shared table file."""
+    distance_path, table_path, index, angle, max_length = args
+    distance_field = np.load(distance_path, mmap_mode='r')
+    table = np.load(table_path, mmap_mode='r+')
+    table[index] = _trace_direction(distance_field, angle, max_length)
+    table.flush()
+
+
+class RayTable:
+    """Precomputed radar ray lengths for every pixel of a track and every covered heading.
+
+    Car headings only change in 20 degree steps from the start angle, and radars sit at
+    30 degree offsets, so every ray a car casts points at `base_angle + k * angle_step`
+    with `angle_step` = 10. The table holds, for each of those directions and each integer
+    origin pixel, the length at which the radar march stops. A sensor read is one gather;
+    directions outside the table return None so the caller can cast live instead.
+
+    The table is generated offline (see `RayTable.build` or run this module) into a `.npy`
+    file next to the compiled track and memory-mapped read-only at runtime.
+
+    Attributes:
+        table (ndarray): uint16 array of shape (directions, height, width).
+        base_angle (float): The heading of direction 0, in [0, angle_step).
+        angle_step (int): The angle between consecutive directions, in degrees.
+        max_length (int): The longest ray stored; longer rays are capped at it.
+    """
+
+    ANGLE_STEP = 10
+    MAX_LENGTH = 300
+    # Bump when `_trace_direction` changes, so stale tables are not loaded
+    LAYER_VERSION = 1
+    ANGLE_TOLERANCE = 1e-6
+
+    def __init__(self, table, base_angle, angle_step=ANGLE_STEP, max_length=MAX_LENGTH):
+        self.table = table
+        self.base_angle = base_angle % angle_step
+        self.angle_step = angle_step
+        self.max_length = max_length
+
+    @staticmethod
+    def path(bundle, base_angle, angle_step=ANGLE_STEP, max_length=MAX_LENGTH):
+        """Returns the table file for a compiled track, next to the bundle file.
+
+        Like `TrackBundle.layer_path`, the name carries the versions of the table builder and
+        of the distance field it traces, so a table from an older builder is never loaded.
+        """
+        stem = os.path.splitext(bundle.path)[0]
+        return (f'{stem}.rays_{base_angle % angle_step:.4f}_{angle_step}_{max_length}'
+                f'.v{RayTable.LAYER_VERSION}.{WALL_DISTANCE_VERSION}.npy')
+
+    @staticmethod
+    def load(bundle, base_angle, angle_step=ANGLE_STEP, max_length=MAX_LENGTH):
+        """Memory-maps the table of a compiled track.
+
+        Returns:
+            RayTable: The table, or None if it has not been generated.
+        """
+        if bundle.path is None:
+            return None
+
+        path = RayTable.path(bundle, base_angle, angle_step, max_length)
+        if not os.path.exists(path):
+            return None
+
+        return RayTable(np.load(path, mmap_mode='r'), base_angle, angle_step, max_length)
+
+    @staticmethod
+    def build(bundle, base_angle, angle_step=ANGLE_STEP, max_length=MAX_LENGTH, processes=None):
+        """Generates the table of a compiled track, one direction per worker process.
+
+        Args:
+            bundle (TrackBundle): The compiled track, backed by a file.
+            base_angle (float): Any covered heading, usually the track's start angle.
+            angle_step (int): The angle between table directions; must divide 360.
+            max_length (int): The longest ray to store.
+            processes (int, optional): Worker processes. Defaults to the CPU count.
+
+        Returns:
+            RayTable: The generated table, memory-mapped.
+        """
+        bundle.layer('wall_distance', lambda b: wall_distance_field(b.wall_mask), WALL_DISTANCE_VERSION)
+        distance_path = bundle.layer_path('wall_distance', WALL_DISTANCE_VERSION)
+        base_angle = base_angle % angle_step
+        width, height = bundle.size
+        directions = 360 // angle_step
+
+        path = RayTable.path(bundle, base_angle, angle_step, max_length)
+        tmp_path = f'{path[:-len(".npy")]}.{os.getpid()}.tmp.npy'
+        np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint16, shape=(directions, height, width)).flush()
+
+        jobs = [(distance_path, tmp_path, index, base_angle + index * angle_step, max_length)
+                for index in range(directions)]
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(_build_direction, jobs)
+        os.replace(tmp_path, path)
+
+        return RayTable.load(bundle, base_angle, angle_step, max_length)
+
+    def direction_index(self, angle):
+        """Returns the table direction of a heading, or None if the table does not cover it."""
+        steps = (angle - self.base_angle) / self.angle_step
+        index = round(steps)
+        if abs(steps - index) > RayTable.ANGLE_TOLERANCE:
+            return None
+        return index % len(self.table)
+
+    def lookup(self, x, y, angle, max_length):
+        """Returns the radar ray length from pixel (x, y) along a heading.
+
+        Args:
+            x, y (int): The ray origin.
+            angle (float): The ray heading in degrees, in the cars' convention.
+            max_length (int): The longest ray length; must not exceed the table's.
+
+        Returns:
+            int: The march length at which the ray stops, or None if the heading or the
+            origin is not covered and the ray has to be cast live.
+        """
+        index = self.direction_index(angle)
+        height, width = self.table.shape[1:]
+        if index is None or max_length > self.max_length or not (0 <= x < width and 0 <= y < height):
+            return None
+
+        return min(int(self.table[index, y, x]), max_length)
+
+    def lookup_many(self, xs, ys, angles, max_length):
+        """Vectorized `lookup` for arrays of origins and headings.
+
+        Returns:
+            ndarray: The ray lengths, with -1 where the heading or origin is not covered.
+        """
+        xs, ys, angles = np.broadcast_arrays(np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64),
+                                             np.asarray(angles, dtype=np.float64))
+        steps = (angles - self.base_angle) / self.angle_step
+        indices = np.round(steps)
+        height, width = self.table.shape[1:]
+
+        covered = (np.abs(steps - indices) <= RayTable.ANGLE_TOLERANCE) & (xs >= 0) & (xs < width) & \
+                  (ys >= 0) & (ys < height) & (max_length <= self.max_length)
+        indices = indices.astype(np.int64) % len(self.table)
+
+        lengths = np.full(xs.shape, -1, dtype=np.int64)
+        lengths[covered] = np.minimum(self.table[indices[covered], ys[covered], xs[covered]], max_length)
+        return lengths
+
+
+if __name__ == "__main__":
+    import sys
+
+    from track_compiler import compile_track
+
+    for track_file in sys.argv[1:]:
+        track_bundle = compile_track(track_file)
+        start_angle = track_bundle.start_pos[2]
+        RayTable.build(track_bundle, start_angle)
+        print(f"{track_file} -> {RayTable.path(track_bundle, start_angle)}")
@@ -0,0 +1,121 @@
+import numpy as np
+
+from bit_mask import BitMask
+
+
+class ScaledMask:
+    """A wall mask stored at a fraction of the map resolution, queried in map pixels.
+
+    The map is split into `factor` x `factor` cells, and a cell is a wall when any of its
+    pixels is (max pooling), so the mask takes `factor ** 2` times less memory and memory
+    traffic. Cars keep their positions in map pixels; every query divides by `factor`, so
+    collision, radar and distance readings all see the same coarse walls.
+
+    Drift from full resolution: the coarse walls cover the full-resolution walls and lie
+    within `factor - 1` pixels (Chebyshev) of them. Hence collisions are never missed and
+    fire at most `factor - 1` pixels early along each axis. Radar rays and the axis-aligned
+    distances to edges never read longer than at full resolution; for a straight wall hit
+    at incidence angle theta they read at most `(factor - 1) * sqrt(2) / sin(theta)` pixels
+    short, which is `factor - 1` for a head-on hit on an axis-aligned wall. Readings that
+    graze a wall, or pass a corner within `factor - 1` pixels, can stop much earlier.
+
+    A ScaledMask is indexed like the dense mask, `mask[y, x]` with ints or integer arrays,
+    so it drops into every place that takes a `wall_mask`.
+
+    Attributes:
+        coarse (ndarray): Boolean array indexed as [y // factor, x // factor].
+        factor (int): The number of map pixels per cell side.
+        shape (tuple): The (height, width) of the map in pixels.
+        LAYER_VERSION (int): The version of `downsample`, for the layer stored with compiled tracks.
+    """
+
+    LAYER_VERSION = 1
+
+    def __init__(self, coarse, factor, shape):
+        self.coarse = coarse
+        self.factor = factor
+        self.shape = tuple(shape)
+
+    @staticmethod
+    def factor_for(resolution):
+        """Converts a resolution such as 1, 1/2 or 1/4 to the integer cell size it stands for."""
+        factor = int(round(1 / resolution))
+        if factor < 1 or abs(factor * resolution - 1) > 1e-6:
+            raise ValueError(f"The resolution must be 1 / n for a whole n, got {resolution}")
+        return factor
+
+    @staticmethod
+    def downsample(wall_mask, factor):
+        """Max-pools a boolean mask over `factor` x `factor` cells, padding the last row and column of cells."""
+        height, width = wall_mask.shape
+        rows, columns = -(-height // factor), -(-width // factor)
+        padded = np.zeros((rows * factor, columns * factor), dtype=bool)
+        padded[:height, :width] = wall_mask
+        return padded.reshape(rows, factor, columns, factor).any(axis=(1, 3))
+
+    @staticmethod
+    def from_dense(wall_mask, factor):
+        """Downsamples a boolean mask indexed as [y, x]."""
+        return ScaledMask(ScaledMask.downsample(wall_mask, factor), factor, wall_mask.shape)
+
+    @property
+    def nbytes(self):
+        """int: The memory taken by the coarse cells."""
+        return self.coarse.nbytes
+
+    def __getitem__(self, key):
+        y, x = key
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            return bool(self.coarse[y // self.factor, x // self.factor])
+        return self.coarse[np.asarray(y) // self.factor, np.asarray(x) // self.factor]
+
+    def any_in_box(self, x1, y1, x2, y2):
+        """Checks whether any wall cell overlaps the box [x1, x2) x [y1, y2), clipped to the map."""
+        height, width = self.shape
+        x1, x2 = min(max(0, x1), width), min(max(0, x2), width)
+        y1, y2 = min(max(0, y1), height), min(max(0, y2), height)
+        if x1 >= x2 or y1 >= y2:
+            return False
+
+        factor = self.factor
+        return bool(self.coarse[y1 // factor:-(-y2 // factor), x1 // factor:-(-x2 // factor)].any())
+
+    def any_in_boxes(self, x1, y1, box_width, box_height):
+        """Batched `any_in_box` for equally sized boxes.
+
+        Returns:
+            ndarray: Boolean array, True where the box overlaps a wall cell.
+        """
+        return np.array([self.any_in_box(int(x), int(y), int(x) + box_width, int(y) + box_height)
+                         for x, y in zip(np.ravel(x1), np.ravel(y1))], dtype=bool)
+
+    def distances_to_edges(self, x, y):
+        """Returns the pixel steps from (x, y) to the nearest wall cell left, right, up and down.
+
+        Only row y // factor and column x // factor of the cells are read. Directions
+        without a wall before the map edge are reported as inf, as `F1_Env` sensors do.
+
+        Returns:
+            ndarray: A float32 array of the left, right, up and down distances.
+        """
+        factor = self.factor
+        cell_x, cell_y = x // factor, y // factor
+        row, column = self.coarse[cell_y], self.coarse[:, cell_x]
+
+        distances = np.full(4, np.inf, dtype=np.float32)
+        for index, (line, start, step) in enumerate(((row[cell_x::-1], x, -1), (row[cell_x:], x, 1),
+                                                     (column[cell_y::-1], y, -1), (column[cell_y:], y, 1))):
+            first = int(line.argmax())
+            if line[first]:
+                cell = (start // factor) + step * first
+                # The nearest pixel of the wall cell, counted from the query pixel.
+                edge = cell * factor + (factor - 1 if step < 0 else 0)
+                distances[index] = max(0, (edge - start) * step)
+        return distances
+
+    # The radar march only needs `shape` and [y, x] indexing, which a ScaledMask provides.
+    cast_rays = BitMask.cast_rays
+    cast_ray = BitMask.cast_ray
+
+    def __repr__(self):
+        return f'ScaledMask(shape={self.shape}, factor={self.factor}, nbytes={self.nbytes})'
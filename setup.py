@@ -1,8 +1,12 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name='f1_env',
     version='0.0.1',
     install_requires=['gymnasium', 'numpy', 'pygame', 'opencv-python'],  # Add any other dependencies F1_Env needs
-    packages=find_packages(),
+    packages=['environments'],
+    # The track, car and field modules F1_Env imports live at the top level of the repository
+    py_modules=['bit_mask', 'car', 'car2', 'car_batch', 'car_core', 'cspace', 'episode', 'footprint', 'lap_progress',
+                'ray_table', 'scaled_mask', 'spawn_index', 'sprite_atlas', 'start_line', 'telemetry',
+                'tiled_track', 'track', 'track_compiler', 'track_fields', 'track_generator', 'track_registry'],
 )
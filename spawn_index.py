@@ -0,0 +1,179 @@
+import numpy as np
+
+from track_fields import GEODESIC_DISTANCE_VERSION, wall_integral
+
+
+class SpawnIndex:
+    """Every collision-free starting pose of a track, sorted by progress along the lap.
+
+    A pose is the (x, y) reference point of a car, the race heading there (snapped to the
+    headings the car can actually take) and the lap distance of the point. Because poses
+    are sorted by lap distance, a uniform pose or a uniform pose of one lap segment is a
+    single random index, so resets can start anywhere on the track at no cost.
+
+    The index is built once per track and car size and cached as a compiled-track layer.
+
+    Attributes:
+        poses (ndarray): float32 array of shape (N, 4) holding x, y, heading and lap distance.
+        lap_length (float): The lap length the segments divide.
+        segment_starts (ndarray): The first pose of each segment, plus N at the end.
+        LAYER_VERSION (int): The version of the pose layers stored with compiled tracks.
+    """
+
+    SEGMENTS = 10
+    MODES = ('uniform', 'segment')
+    LAYER_VERSION = 1
+
+    def __init__(self, poses, lap_length, segments=SEGMENTS):
+        self.poses = poses
+        self.lap_length = lap_length
+        bounds = lap_length * np.arange(segments + 1) / segments
+        self.segment_starts = np.searchsorted(poses[:, 3], bounds[:-1])
+        self.segment_starts = np.append(self.segment_starts, len(poses))
+
+    @property
+    def segments(self):
+        """int: The number of lap segments."""
+        return len(self.segment_starts) - 1
+
+    @staticmethod
+    def snap_headings(headings, base_angle, angle_step):
+        """Rounds headings to the grid `base_angle + k * angle_step` the cars turn on."""
+        return base_angle + np.round((headings - base_angle) / angle_step) * angle_step
+
+    @staticmethod
+    def build(valid, lap_progress, headings):
+        """Collects the valid poses of a track.
+
+        Args:
+            valid (ndarray): Boolean array indexed as [y, x], or (headings, y, x) with one
+                layer per heading index, True where a car can start.
+            lap_progress (LapProgress): The track's progress field.
+            headings (ndarray): The start heading of every pixel; for per-heading validity,
+                the integer heading index of every pixel (-1 where unknown).
+
+        Returns:
+            ndarray: The float32 (N, 4) pose array, sorted by lap distance.
+        """
+        field = lap_progress.field
+        known = np.isfinite(field) & (headings >= 0 if valid.ndim == 3 else np.isfinite(headings))
+        ys, xs = np.nonzero(known)
+        if valid.ndim == 3:
+            keep = valid[headings[ys, xs], ys, xs]
+        else:
+            keep = valid[ys, xs]
+        ys, xs = ys[keep], xs[keep]
+
+        poses = np.stack([xs, ys, headings[ys, xs], field[ys, xs]], axis=1).astype(np.float32)
+        return np.ascontiguousarray(poses[np.argsort(poses[:, 3], kind='stable')])
+
+    @staticmethod
+    def for_box(bundle, lap_progress, car_size, base_angle=0, angle_step=20):
+        """Returns the index for axis-aligned box cars, as `F1_Env` simulates them.
+
+        A pose is valid when the car's box holds no wall pixel; the heading does not matter
+        to the box test and is only the race heading snapped to the turning grid. The
+        reference point is the box center `top_left + car_size[0] // 2`, like the sensors use.
+        """
+        width, height = int(car_size[0]), int(car_size[1])
+        name = f'spawn_box_{width}x{height}_{base_angle % angle_step:.4f}_{angle_step}'
+
+        def build(b):
+            table = wall_integral(b.wall_mask)
+            walls = table[height:, width:] - table[:-height, width:] - table[height:, :-width] + table[:-height, :-width]
+            offset = width // 2
+            valid = np.zeros(b.wall_mask.shape, dtype=bool)
+            valid[offset:offset + walls.shape[0], offset:offset + walls.shape[1]] = walls == 0
+            headings = SpawnIndex.snap_headings(lap_progress.race_headings(), base_angle, angle_step)
+            return SpawnIndex.build(valid, lap_progress, headings)
+
+        version = (SpawnIndex.LAYER_VERSION, GEODESIC_DISTANCE_VERSION)
+        return SpawnIndex(bundle.layer(name, build, version), lap_progress.lap_length)
+
+    @staticmethod
+    def for_cspace(bundle, lap_progress, cspace, size_x, size_y):
+        """Returns the index for rotated cars, validated against their configuration space.
+
+        The reference point is the car center, and a pose is valid when the obstacle map of
+        its snapped race heading is clear there.
+        """
+        factor = cspace.factor
+        name = f'spawn_{size_x}x{size_y}_{cspace.base_angle:.4f}_{cspace.angle_step}' + \
+            (f'_r{factor}' if factor > 1 else '')
+
+        def build(b):
+            headings = lap_progress.race_headings()
+            known = np.isfinite(headings)
+            indices = np.full(headings.shape, -1, dtype=np.int64)
+            steps = np.round((headings[known] - cspace.base_angle) / cspace.angle_step).astype(np.int64)
+            indices[known] = steps % len(cspace.maps)
+
+            valid = np.stack([~cspace_map.to_dense() for cspace_map in cspace.maps])
+            if factor > 1:
+                height, width = headings.shape
+                valid = valid.repeat(factor, axis=1).repeat(factor, axis=2)[:, :height, :width]
+            poses = SpawnIndex.build(valid, lap_progress, indices)
+            poses[:, 2] = cspace.base_angle + poses[:, 2] * cspace.angle_step
+            return poses
+
+        version = (SpawnIndex.LAYER_VERSION, GEODESIC_DISTANCE_VERSION, cspace.LAYER_VERSION)
+        return SpawnIndex(bundle.layer(name, build, version), lap_progress.lap_length)
+
+    def sample(self, rng, mode='uniform', segment=None):
+        """Draws a starting pose.
+
+        Args:
+            rng (Generator): The NumPy random generator to draw with.
+            mode (str): 'uniform' for any valid pose, 'segment' for a pose within one lap segment.
+            segment (int, optional): The segment for 'segment' mode; drawn at random when omitted.
+
+        Returns:
+            tuple: The (x, y, heading) of the pose.
+        """
+        if mode not in SpawnIndex.MODES:
+            raise ValueError(f"Unknown spawn mode {mode!r}, expected one of {SpawnIndex.MODES}")
+        if not len(self.poses):
+            raise ValueError("The track has no valid spawn pose for this car size.")
+
+        if mode == 'uniform':
+            index = rng.integers(len(self.poses))
+        else:
+            if segment is None:
+                non_empty = np.flatnonzero(np.diff(self.segment_starts))
+                segment = non_empty[rng.integers(len(non_empty))]
+            first, last = self.segment_starts[segment], self.segment_starts[segment + 1]
+            if first == last:
+                raise ValueError(f"Lap segment {segment} has no valid spawn pose.")
+            index = rng.integers(first, last)
+
+        x, y, heading, _ = self.poses[index]
+        return int(x), int(y), float(heading)
+
+    def samples(self, rng, count, mode='uniform', segment=None):
+        """Vectorized `sample`: draws `count` starting poses at once.
+
+        Returns:
+            tuple: The (count,) int64 x and y arrays and float64 heading array of the poses.
+        """
+        if mode not in SpawnIndex.MODES:
+            raise ValueError(f"Unknown spawn mode {mode!r}, expected one of {SpawnIndex.MODES}")
+        if not len(self.poses):
+            raise ValueError("The track has no valid spawn pose for this car size.")
+
+        if mode == 'uniform':
+            indices = rng.integers(len(self.poses), size=count)
+        else:
+            if segment is None:
+                non_empty = np.flatnonzero(np.diff(self.segment_starts))
+                segments = non_empty[rng.integers(len(non_empty), size=count)]
+            else:
+                if self.segment_starts[segment] == self.segment_starts[segment + 1]:
+                    raise ValueError(f"Lap segment {segment} has no valid spawn pose.")
+                segments = np.full(count, segment)
+            indices = rng.integers(self.segment_starts[segments], self.segment_starts[segments + 1])
+
+        poses = self.poses[indices]
+        return poses[:, 0].astype(np.int64), poses[:, 1].astype(np.int64), poses[:, 2].astype(np.float64)
+
+    def __len__(self):
+        return len(self.poses)
@@ -0,0 +1,79 @@
+import threading
+
+import pygame as pg
+
+
+class SpriteAtlas:
+    """A car sprite, loaded once per process, with its rotations kept as they are first drawn.
+
+    Cars only turn in 20 degree steps from their start angle, so a run draws a handful of
+    distinct headings. Each heading is rotated once and every car drawn at it afterwards is a
+    single blit. Headings are rounded to `ANGLE_STEP` degrees, which keeps the atlas bounded
+    when cars start at arbitrary angles (e.g. spawned anywhere on the track).
+
+    Atlases are shared: `get` returns the same atlas for the same image, size and pixel format.
+    Loading needs a display mode, like `Surface.convert`.
+
+    Attributes:
+        sprite (Surface): The sprite scaled to `size`, unrotated.
+        size (tuple): The (width, height) the sprite is scaled to.
+        rotations (dict): The rotated sprites by heading in whole `ANGLE_STEP`s, in [0, 360).
+    """
+
+    ANGLE_STEP = 1
+    ATLASES = {}
+    LOCK = threading.Lock()
+
+    def __init__(self, sprite, size):
+        self.sprite = sprite
+        self.size = size
+        self.rotations = {}
+
+    @staticmethod
+    def load(sprite_path, size, alpha=False):
+        """Loads and scales a sprite image into a new atlas.
+
+        Args:
+            sprite_path (str): The sprite image file.
+            size (tuple): The (width, height) to scale the sprite to.
+            alpha (bool): Keep the image's per-pixel alpha (`convert_alpha`) instead of `convert`.
+        """
+        image = pg.image.load(sprite_path)
+        image = image.convert_alpha() if alpha else image.convert()
+        return SpriteAtlas(pg.transform.scale(image, size), size)
+
+    @staticmethod
+    def get(sprite_path, size, alpha=False):
+        """Returns the process-wide atlas of a sprite, loading it on first use."""
+        key = (sprite_path, tuple(size), alpha)
+        with SpriteAtlas.LOCK:
+            atlas = SpriteAtlas.ATLASES.get(key)
+            if atlas is None:
+                atlas = SpriteAtlas.ATLASES[key] = SpriteAtlas.load(sprite_path, tuple(size), alpha)
+        return atlas
+
+    @staticmethod
+    def heading(angle):
+        """Returns the atlas key of an angle: the heading in whole `ANGLE_STEP`s, in [0, 360)."""
+        return round(angle / SpriteAtlas.ANGLE_STEP) * SpriteAtlas.ANGLE_STEP % 360
+
+    def rotated(self, angle):
+        """Returns the sprite rotated counterclockwise by `angle` degrees, as `pg.transform.rotate` does.
+
+        The rotated Surface is shared: blit it, do not draw on it.
+        """
+        heading = SpriteAtlas.heading(angle)
+        rotated = self.rotations.get(heading)
+        if rotated is None:
+            rotated = self.rotations[heading] = pg.transform.rotate(self.sprite, heading)
+        return rotated
+
+    def prerotate(self, start_angle, step=20):
+        """Rotates the sprite for every heading reachable from `start_angle` in `step` degree turns."""
+        for turn in range(0, 360, step):
+            self.rotated(start_angle + turn)
+
+
+def get_atlas(sprite_path, size, alpha=False):
+    """Shortcut for `SpriteAtlas.get`."""
+    return SpriteAtlas.get(sprite_path, size, alpha)
@@ -0,0 +1,138 @@
+import math
+
+import numpy as np
+
+
+class StartLine:
+    """The start/finish line of a track, described by the two endpoints the game uses.
+
+    The endpoints follow the historical `Track.find_pixel` scan: the first point is the
+    topmost pixel of the leftmost start-line column, the second the leftmost pixel of
+    the bottom start-line row.
+
+    Attributes:
+        first_point (tuple): The (x, y) of the first endpoint.
+        second_point (tuple): The (x, y) of the second endpoint.
+    """
+
+    def __init__(self, first_point, second_point):
+        self.first_point = (int(first_point[0]), int(first_point[1]))
+        self.second_point = (int(second_point[0]), int(second_point[1]))
+
+    @staticmethod
+    def from_mask(start_line_mask):
+        """Finds the start-line endpoints in a boolean mask.
+
+        Columns and rows containing start-line pixels are found with one reduction each,
+        so the cost is a single pass over the mask instead of a per-pixel Python scan.
+
+        Args:
+            start_line_mask (ndarray): Boolean array indexed as [y, x].
+
+        Returns:
+            StartLine: The start line, or None if the mask has no start-line pixel.
+        """
+        columns = start_line_mask.any(axis=0)
+        if not columns.any():
+            return None
+        rows = start_line_mask.any(axis=1)
+
+        left_x = int(columns.argmax())
+        bottom_y = len(rows) - 1 - int(rows[::-1].argmax())
+
+        return StartLine((left_x, int(start_line_mask[:, left_x].argmax())),
+                         (int(start_line_mask[bottom_y].argmax()), bottom_y))
+
+    @property
+    def points(self):
+        """tuple: Both endpoints, in the order `Track.get_start_line_points` returns them."""
+        return self.first_point, self.second_point
+
+    @property
+    def angle(self):
+        """float: The starting heading in degrees, perpendicular to the line."""
+        return math.atan2(self.second_point[0] - self.first_point[0],
+                          self.second_point[1] - self.first_point[1]) * 180 / math.pi
+
+    @property
+    def midpoint(self):
+        """tuple: The integer (x, y) midpoint of the line."""
+        return ((self.first_point[0] + self.second_point[0]) // 2,
+                (self.first_point[1] + self.second_point[1]) // 2)
+
+    @property
+    def segment(self):
+        """ndarray: The line as a (2, 2) float array of endpoints."""
+        return np.array([self.first_point, self.second_point], dtype=np.float64)
+
+    @property
+    def normal(self):
+        """ndarray: The unit normal pointing in the race direction, i.e. along the starting heading.
+
+        A car with heading `angle` moves along (cos(angle), -sin(angle)) in screen coordinates,
+        which is the line direction rotated by a quarter turn.
+        """
+        angle = math.radians(self.angle)
+        return np.array([math.cos(angle), -math.sin(angle)])
+
+    @property
+    def start_pos(self):
+        """tuple: The (x, y, angle) starting pose at the midpoint of the line."""
+        return self.midpoint[0], self.midpoint[1], self.angle
+
+    def crossing(self, previous, current):
+        """Tests whether a move from `previous` to `current` crosses the line segment.
+
+        The move crosses when its ends lie on different sides of the line and the crossing
+        point lies on the segment. A point exactly on the line counts as ahead of it, so a
+        move that ends on the line and the next one that leaves it count as one crossing.
+
+        Args:
+            previous (tuple): The (x, y) before the move.
+            current (tuple): The (x, y) after the move.
+
+        Returns:
+            tuple: The direction, 1 along `normal` (forwards), -1 against it or 0 without a
+            crossing, and the fraction of the move at which the line is crossed, or None.
+        """
+        angle = math.radians(self.angle)
+        normal_x, normal_y = math.cos(angle), -math.sin(angle)
+        line_x, line_y = self.second_point[0] - self.first_point[0], self.second_point[1] - self.first_point[1]
+        length = line_x * line_x + line_y * line_y
+        before = (previous[0] - self.first_point[0]) * normal_x + (previous[1] - self.first_point[1]) * normal_y
+        after = (current[0] - self.first_point[0]) * normal_x + (current[1] - self.first_point[1]) * normal_y
+        if length == 0 or (before < 0) == (after < 0):
+            return 0, None
+
+        time = before / (before - after)
+        along = ((previous[0] + time * (current[0] - previous[0]) - self.first_point[0]) * line_x
+                 + (previous[1] + time * (current[1] - previous[1]) - self.first_point[1]) * line_y)
+        if not 0 <= along <= length:
+            return 0, None
+        return (1 if before < 0 else -1), time
+
+    def crossings(self, previous, current):
+        """Vectorized `crossing` for a population of moves.
+
+        Args:
+            previous (ndarray): The (N, 2) positions before the move.
+            current (ndarray): The (N, 2) positions after the move.
+
+        Returns:
+            tuple: An int8 array of directions (1, -1 or 0) and a float array of crossing
+            fractions, NaN where the line is not crossed.
+        """
+        previous, current = np.asarray(previous, dtype=np.float64), np.asarray(current, dtype=np.float64)
+        first, line = self.segment[0], self.segment[1] - self.segment[0]
+        length = line @ line
+        before = (previous - first) @ self.normal
+        after = (current - first) @ self.normal
+
+        crossed = (before < 0) != (after < 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            time = np.where(crossed, before / (before - after), np.nan)
+        along = (previous + time[:, np.newaxis] * (current - previous) - first) @ line
+        crossed &= (along >= 0) & (along <= length) & (length > 0)
+
+        directions = np.where(crossed, np.where(before < 0, 1, -1), 0).astype(np.int8)
+        return directions, np.where(crossed, time, np.nan)
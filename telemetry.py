@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class RingBuffer:
+    """The last `capacity` values of a stream, in a buffer allocated once.
+
+    Every value is written twice, at `head` and `head + capacity`, so the stored values are
+    always one contiguous slice of the buffer, oldest first, and `view` never copies.
+
+    Attributes:
+        data (ndarray): The (2 * capacity,) backing array.
+        capacity (int): The number of values kept.
+        head (int): The slot the next value goes to, in [0, capacity).
+        count (int): The number of values stored, at most `capacity`.
+    """
+
+    __slots__ = ('data', 'capacity', 'head', 'count')
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.data = np.zeros(2 * capacity, dtype=dtype)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        head = self.head
+        self.data[head] = value
+        self.data[head + self.capacity] = value
+        self.head = head + 1 if head + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def view(self):
+        """Returns the stored values, oldest first, as a read-only view of the buffer.
+
+        The view shares the buffer: later appends change the values it shows.
+        """
+        start = self.head + self.capacity - self.count
+        values = self.data[start:start + self.count]
+        values.flags.writeable = False
+        return values
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+
+class Telemetry:
+    """Opt-in per-car recording, bounded whatever the length of the run.
+
+    The latest steering inputs and speeds are kept in ring buffers of `capacity` entries;
+    the whole run is summarized by streaming aggregates (update count, mean and top speed).
+    Nothing is allocated after construction, so a car can record over any number of
+    updates. Enable it with `CarCore.enable_telemetry` and read it with `get_telemetry`.
+
+    Attributes:
+        steering (RingBuffer): The latest steering inputs, in degrees.
+        speeds (RingBuffer): The speed after each of the latest updates.
+        steering_inputs (int): The number of steering inputs over the run.
+        updates (int): The number of updates over the run.
+        speed_total (float): The sum of the speeds after each update.
+        top_speed (float): The highest speed after an update.
+    """
+
+    CAPACITY = 256
+
+    __slots__ = ('steering', 'speeds', 'steering_inputs', 'updates', 'speed_total', 'top_speed')
+
+    def __init__(self, capacity=CAPACITY):
+        self.steering = RingBuffer(capacity)
+        self.speeds = RingBuffer(capacity)
+        self.steering_inputs = 0
+        self.updates = 0
+        self.speed_total = 0.0
+        self.top_speed = 0.0
+
+    def record_steering(self, angle):
+        self.steering.append(angle)
+        self.steering_inputs += 1
+
+    def record_update(self, speed):
+        self.speeds.append(speed)
+        self.updates += 1
+        self.speed_total += speed
+        if speed > self.top_speed:
+            self.top_speed = speed
+
+    @property
+    def mean_speed(self):
+        """float: The mean speed over every update, 0 before the first one."""
+        return self.speed_total / self.updates if self.updates else 0.0
+
+    def read(self):
+        """Returns the recording without copying it.
+
+        Returns:
+            dict: Read-only views of the latest `steering` inputs and `speeds`, oldest first,
+            and the `steering_inputs`, `updates`, `mean_speed` and `top_speed` aggregates. The
+            views share the ring buffers, so later records change them; copy them to keep them.
+        """
+        return {
+            'steering': self.steering.view(),
+            'speeds': self.speeds.view(),
+            'steering_inputs': self.steering_inputs,
+            'updates': self.updates,
+            'mean_speed': self.mean_speed,
+            'top_speed': self.top_speed,
+        }
+
+    def clear(self):
+        self.steering.clear()
+        self.speeds.clear()
+        self.steering_inputs = 0
+        self.updates = 0
+        self.speed_total = 0.0
+        self.top_speed = 0.0
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+import pytest
+
+from track_generator import TrackGenerator
+
+
+def make_generator():
+    """A small circuit generator, so tests build their tracks in milliseconds."""
+    return TrackGenerator(480, 270, road_width=(40, 60), margin=20, start_length=40)
+
+
+@pytest.fixture(scope='session')
+def small_bundle():
+    """An in-memory 480x270 generated track with a start line."""
+    return make_generator().generate(3)
+
+
+@pytest.fixture(scope='session')
+def wide_bundle():
+    """An in-memory 960x540 generated track with a road wide enough for 60 pixel cars."""
+    return TrackGenerator(960, 540, road_width=(110, 140), margin=30, start_length=80).generate(1)
+
+
+@pytest.fixture
+def track_png(tmp_path):
+    """The small track exported as a PNG, so it can be compiled into `tmp_path`."""
+    path = str(tmp_path / 'small.png')
+    TrackGenerator.export_png(make_generator().generate(3), path)
+    return path
+
+
+@pytest.fixture(scope='session')
+def free_points(small_bundle):
+    """300 random (x, y) pixels of the small track that are not walls."""
+    rng = np.random.default_rng(0)
+    ys, xs = np.nonzero(~small_bundle.wall_mask)
+    picks = rng.choice(len(xs), 300, replace=False)
+    return xs[picks], ys[picks]
+
+
+@pytest.fixture(scope='session')
+def small_track(small_bundle):
+    """The small track loaded headless by `track.Track`."""
+    from track import Track
+
+    track = Track(small_bundle, map_width=480, map_height=270, headless=True)
+    track.load_game_map()
+    return track
+
+
+def make_car(car_class, track, center_x, center_y, angle, speed, cspace=None):
+    """A headless car of `car_class` centered on (center_x, center_y), with the track's masks and fields."""
+    top_start_line, bottom_start_line = track.get_start_line_points()
+    return car_class(None, center_x - car_class.CAR_SIZE_X / 2, center_y - car_class.CAR_SIZE_Y / 2, angle, speed,
+                     track.game_map, track.border_color, track.width, track.height, top_start_line,
+                     bottom_start_line, track.wall_mask, track.distance_field, track.ray_table, cspace,
+                     track.lap_progress)
+
+
+def march(wall_mask, x0, y0, angle, max_length):
+    """The per-pixel radar march `trace_ray` replaces: off-map pixels count as walls."""
+    height, width = wall_mask.shape
+    radians = math.radians(360 - angle)
+    cos, sin = math.cos(radians), math.sin(radians)
+    length = 0
+    x, y = int(x0), int(y0)
+    while 0 <= x < width and 0 <= y < height and not wall_mask[y, x] and length < max_length:
+        length += 1
+        x = int(x0 + length * cos)
+        y = int(y0 + length * sin)
+    return x, y
+
+
+def walked_distances(wall_mask, x, y):
+    """The four step walks `Track.calculate_distances_to_edges` replaces, inf when a walk leaves the map."""
+    height, width = wall_mask.shape
+    distances = []
+    for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        steps, walk_x, walk_y = 0, x, y
+        while 0 <= walk_x < width and 0 <= walk_y < height and not wall_mask[walk_y, walk_x]:
+            steps += 1
+            walk_x, walk_y = walk_x + dx, walk_y + dy
+        distances.append(steps if 0 <= walk_x < width and 0 <= walk_y < height else np.inf)
+    return np.array(distances, dtype=np.float32)
+
+
+def probe_collision(wall_mask, center_x, center_y, angle, size_x):
+    """The original `Car.is_collision`: four probe points and the lines between them."""
+    height, width = wall_mask.shape
+    length = size_x / 2
+
+    def probe(offset, heading):
+        shift = offset * math.cos(math.radians(360 - heading))
+        return [center_x + shift, center_y + shift]
+
+    probes = [probe(length, angle), probe(-length, angle), probe(length, angle - 90), probe(-length, angle - 90)]
+    for x, y in probes:
+        if x < 0 or x >= width or y < 0 or y >= height:
+            return True
+    for i in range(4):
+        x1, y1 = int(probes[i][0]), int(probes[i][1])
+        x2, y2 = int(probes[(i + 1) % 4][0]), int(probes[(i + 1) % 4][1])
+        for x in range(min(x1, x2), max(x1, x2)):
+            y = int((y2 - y1) / (x2 - x1) * (x - x1) + y1)
+            if wall_mask[y, x]:
+                return True
+    return False
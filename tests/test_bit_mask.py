@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from bit_mask import BitMask
+from conftest import march, walked_distances
+
+
+@pytest.fixture(params=['track', 'noise'])
+def wall_mask(request, small_bundle):
+    """The small track, and random walls on a width that is not a multiple of 8."""
+    if request.param == 'track':
+        return small_bundle.wall_mask
+    return np.random.default_rng(5).random((97, 203)) < 0.02
+
+
+def test_indexing_and_unpacking_match_the_dense_mask(wall_mask):
+    bits = BitMask.from_dense(wall_mask)
+    rng = np.random.default_rng(6)
+    ys, xs = rng.integers(0, wall_mask.shape[0], 500), rng.integers(0, wall_mask.shape[1], 500)
+
+    np.testing.assert_array_equal(bits.to_dense(), wall_mask)
+    np.testing.assert_array_equal(bits[ys, xs], wall_mask[ys, xs])
+    assert [bits[int(y), int(x)] for x, y in zip(xs, ys)] == wall_mask[ys, xs].tolist()
+
+
+def test_box_queries_match_the_clipped_slice(wall_mask):
+    bits = BitMask.from_dense(wall_mask)
+    height, width = wall_mask.shape
+    rng = np.random.default_rng(7)
+    x1, y1 = rng.integers(-30, width + 5, 500), rng.integers(-30, height + 5, 500)
+    expected = [bool(wall_mask[max(0, y):max(0, y + 21), max(0, x):max(0, x + 13)].any()) for x, y in zip(x1, y1)]
+
+    assert [bits.any_in_box(x, y, x + 13, y + 21) for x, y in zip(x1, y1)] == expected
+    assert bits.any_in_boxes(x1, y1, 13, 21).tolist() == expected
+
+
+def test_rays_and_edge_distances_match_the_dense_walks(wall_mask):
+    bits = BitMask.from_dense(wall_mask)
+    rng = np.random.default_rng(8)
+    ys, xs = np.nonzero(~wall_mask)
+    picks = rng.choice(len(xs), 200, replace=False)
+    xs, ys = xs[picks], ys[picks]
+    angles = rng.uniform(0, 360, len(xs))
+
+    stops = bits.cast_rays(xs + 0.5, ys + 0.5, angles, 150)
+    for index, (x, y, angle) in enumerate(zip(xs, ys, angles)):
+        expected = march(wall_mask, x + 0.5, y + 0.5, angle, 150)
+        assert bits.cast_ray(x + 0.5, y + 0.5, angle, 150) == expected
+        assert (stops[0][index], stops[1][index]) == expected
+        np.testing.assert_array_equal(bits.distances_to_edges(x, y), walked_distances(wall_mask, x, y))
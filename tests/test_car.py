@@ -0,0 +1,45 @@
+import math
+
+import pytest
+
+from car import Car
+from car2 import Car2
+from conftest import make_car, probe_collision
+
+
+@pytest.mark.parametrize('car_class, stops', [(Car, True), (Car2, False)])
+def test_backwards_finish_crossing(small_track, car_class, stops):
+    car = make_car(car_class, small_track, *small_track.start_pos[:2], small_track.start_pos[2], 0)
+    car.finish_crossing = -1
+    assert car.has_touched_finish() == -1
+    assert car.alive is not stops
+
+
+@pytest.mark.parametrize('car_class', [Car, Car2])
+def test_forwards_finish_crossing_never_stops(small_track, car_class):
+    car = make_car(car_class, small_track, *small_track.start_pos[:2], small_track.start_pos[2], 0)
+    car.finish_crossing = 1
+    assert car.has_touched_finish() == 1
+    assert car.alive
+
+
+def test_car2_reverses_over_the_line_and_keeps_driving(small_track):
+    # Start a few pixels past the line and drive back over it.
+    x, y, angle = small_track.start_pos
+    radians = math.radians(360 - angle)
+    car = make_car(Car2, small_track, x + 8 * math.cos(radians), y + 8 * math.sin(radians), angle + 180, 5)
+
+    crossings = []
+    for _ in range(4):
+        car.update()
+        crossings.append(car.has_touched_finish())
+    assert -1 in crossings
+    assert car.alive
+
+
+@pytest.mark.parametrize('car_class', [Car, Car2])
+def test_probe_collision_flag_restores_the_original_test(small_track, free_points, monkeypatch, car_class):
+    monkeypatch.setattr(Car, 'PROBE_COLLISION', True)
+    for x, y in zip(*free_points):
+        car = make_car(car_class, small_track, x, y, 30, 5)
+        assert car.is_collision() == probe_collision(small_track.wall_mask, x, y, 30, car_class.CAR_SIZE_X)
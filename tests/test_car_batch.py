@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from car import Car
+from car2 import Car2
+from car_batch import CarBatch
+from conftest import make_car
+from track import Track
+
+
+@pytest.fixture(scope='module')
+def wide_track(wide_bundle):
+    """The wide track loaded headless, for `Car`'s 60 pixel footprint."""
+    track = Track(wide_bundle, map_width=960, map_height=540, headless=True)
+    track.load_game_map()
+    return track
+
+
+def car_states(cars):
+    return np.array([[car.position[0], car.position[1], car.angle, car.speed, car.alive, car.distance, car.time,
+                      car.progress, car.finish_crossing, car.speed_changes] for car in cars])
+
+
+def batch_states(batch):
+    return np.stack([batch.position[:, 0], batch.position[:, 1], batch.angle, batch.speed, batch.alive,
+                     batch.distance, batch.time, batch.progress, batch.finish_crossing, batch.speed_changes], axis=1)
+
+
+@pytest.mark.parametrize('car_class, track_name', [(Car, 'wide_track'), (Car2, 'small_track')])
+@pytest.mark.parametrize('use_cspace', [False, True])
+def test_batch_drives_like_the_cars(request, car_class, track_name, use_cspace):
+    track = request.getfixturevalue(track_name)
+    count = 16
+    size_x, size_y = car_class.CAR_SIZE_X, car_class.CAR_SIZE_Y
+    cspace = track.configuration_space(size_x, size_y) if use_cspace else None
+    x, y, angle = track.start_pos
+    cars = [make_car(car_class, track, x, y, angle, 5, cspace) for _ in range(count)]
+    batch = CarBatch.from_track(track, count, x - size_x / 2, y - size_y / 2, angle, 5, size_x, size_y,
+                                car_class.BORDER_EDGE, cspace)
+
+    rng = np.random.default_rng(18)
+    for _ in range(120):
+        actions = np.where(rng.random(count) < 0.7, 0, rng.integers(0, 5, count))
+        for car, action in zip(cars, actions):
+            car.move(int(action))
+            if car.is_alive():
+                car.update()
+        batch.move(actions)
+        batch.update()
+
+        states = car_states(cars)
+        np.testing.assert_array_equal(states[:, 4], batch.alive)
+        np.testing.assert_allclose(states[batch.alive], batch_states(batch)[batch.alive])
+
+        _, distances = batch.cast_rays([-90, 0, 90], 200)
+        lengths = np.array([[car.cast_ray(degree, 200)[1] for degree in (-90, 0, 90)] for car in cars])
+        np.testing.assert_array_equal(lengths[batch.alive], distances[batch.alive])
+
+    assert batch.time.max() > 20
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from conftest import walked_distances
+from environments.car_env import F1_Env, F1VectorEnv, Track
+from episode import MAX_EPISODE_STEPS
+
+
+def clipped_box_hits(wall_mask, x, y, car_size):
+    """The slice test `Track.check_collision` replaces: the box clipped to the map, any wall inside."""
+    height, width = wall_mask.shape
+    x1, x2 = max(0, x), min(width, x + car_size[0])
+    y1, y2 = max(0, y), min(height, y + car_size[1])
+    return bool(wall_mask[y1:y2, x1:x2].any())
+
+
+@pytest.fixture(scope='module')
+def env_track(small_bundle):
+    return Track(small_bundle)
+
+
+@pytest.fixture(scope='module')
+def locations(small_bundle):
+    """Car positions over the whole map, including boxes that stick out of it."""
+    rng = np.random.default_rng(4)
+    height, width = small_bundle.wall_mask.shape
+    return np.stack([rng.integers(-60, width, 400), rng.integers(-60, height, 400)], axis=1)
+
+
+def test_check_collision_matches_the_clipped_slice(env_track, small_bundle, locations):
+    car_size = (60, 60)
+    expected = [clipped_box_hits(small_bundle.wall_mask, x, y, car_size) for x, y in locations]
+
+    assert [bool(env_track.check_collision(location, car_size)) for location in locations] == expected
+    assert env_track.check_collisions(locations, car_size).tolist() == expected
+
+
+def test_distances_to_edges_match_the_step_walks(env_track, small_bundle, locations):
+    car_size = (60, 60)
+    centers = locations + car_size[0] // 2
+    height, width = small_bundle.wall_mask.shape
+    expected = [walked_distances(small_bundle.wall_mask, x, y) if 0 <= x < width and 0 <= y < height
+                else np.full(4, np.inf, dtype=np.float32) for x, y in centers]
+
+    for location, distances in zip(locations, expected):
+        np.testing.assert_array_equal(env_track.calculate_distances_to_edges(location, car_size), distances)
+    np.testing.assert_array_equal(env_track.calculate_distances_to_edges_many(locations, car_size), expected)
+
+
+def test_wall_hits_put_the_car_back_at_the_impact(wide_bundle):
+    env = F1_Env(wide_bundle)
+    rng = np.random.default_rng(5)
+    hits = 0
+    for seed in range(20):
+        env.reset(seed=seed)
+        for _ in range(200):
+            _, _, terminated, truncated, _ = env.step(int(rng.integers(5)))
+            hit = env.impact_time is not None
+            if hit:
+                # The car is left where it first touched the wall
+                assert env.track.check_collision(env._agent_location, env.car.car_size)
+                hits += 1
+            # As before the sweep, only a hit left of the start ends the episode
+            assert terminated == (hit and env.is_car_left_of_start())
+            if terminated or truncated:
+                break
+    assert hits > 0
+
+
+def test_episodes_are_truncated_after_the_step_limit(wide_bundle):
+    assert F1_Env(wide_bundle).max_episode_steps == MAX_EPISODE_STEPS
+    env = F1_Env(wide_bundle, max_episode_steps=5)
+    env.reset(seed=0)
+
+    # A stopped car never hits a wall, so only the step limit ends its episode
+    endings = [env.step(0)[2:4] for _ in range(5)]
+    assert endings == [(False, False)] * 4 + [(False, True)]
+
+
+def start_like(env, vector_env, index):
+    """Starts `env`'s episode from sub-environment `index`'s first pose."""
+    env.reset(seed=0)
+    env._agent_location = vector_env.agent_location[index].copy()
+    env.car.angle = float(vector_env.angle[index])
+    env.lap_distance = env.get_lap_distance()
+
+
+@pytest.mark.parametrize('spawn', ['start', 'uniform'])
+def test_vector_env_matches_single_envs(wide_bundle, spawn):
+    count = 8
+    vector_env = F1VectorEnv(count, wide_bundle, max_episode_steps=40)
+    envs = [F1_Env(wide_bundle, max_episode_steps=40) for _ in range(count)]
+    vector_env.reset(seed=3, options={"spawn": spawn})
+    for index, env in enumerate(envs):
+        start_like(env, vector_env, index)
+
+    rng = np.random.default_rng(0)
+    endings = 0
+    for _ in range(150):
+        actions = rng.choice([0, 1, 1, 2, 3, 4], size=count)
+        resetting = vector_env.autoreset.copy()
+        observation, reward, terminated, truncated, info = vector_env.step(actions)
+        for index, env in enumerate(envs):
+            if resetting[index]:
+                # Autoreset: the action is ignored and the new episode starts with no reward
+                assert (reward[index], terminated[index], truncated[index]) == (0, False, False)
+                start_like(env, vector_env, index)
+                continue
+
+            single_observation, single_reward, single_terminated, single_truncated, _ = env.step(int(actions[index]))
+            for key, value in single_observation.items():
+                np.testing.assert_array_equal(value, observation[key][index])
+            assert single_reward == pytest.approx(reward[index], rel=1e-5)
+            assert (single_terminated, single_truncated) == (terminated[index], truncated[index])
+            assert env.step_counter == info["step_counter"][index]
+            assert env.total_distance == pytest.approx(info["total_distance"][index])
+            assert env.progress == pytest.approx(info["progress"][index])
+            endings += bool(terminated[index] or truncated[index])
+    assert endings > count
+
+
+@pytest.mark.parametrize('options', [{'bit_packed': True}, {'tiled': True}, {'resolution': 0.5}])
+def test_vector_env_rejects_masks_read_car_by_car(wide_bundle, options):
+    with pytest.raises(ValueError):
+        F1VectorEnv(2, wide_bundle, **options)
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from cspace import ConfigurationSpace
+from footprint import Footprint
+
+
+@pytest.mark.parametrize('size_x, size_y, base_angle', [(15, 15, 0), (30, 20, 7.5), (60, 60, 10)])
+def test_clear_map_pixels_are_clear_for_the_footprint(small_bundle, size_x, size_y, base_angle):
+    wall_mask = small_bundle.wall_mask
+    cspace = ConfigurationSpace(ConfigurationSpace.build(wall_mask, size_x, size_y, base_angle),
+                                wall_mask.shape[1], base_angle)
+    rng = np.random.default_rng(14)
+    xs, ys = rng.integers(0, wall_mask.shape[1], 3000), rng.integers(0, wall_mask.shape[0], 3000)
+    angles = base_angle + cspace.angle_step * rng.integers(0, len(cspace.maps), 3000)
+
+    collisions, covered = cspace.collides_many(xs, ys, angles)
+    assert covered.all()
+    footprint = Footprint.get(size_x, size_y).collides_many(wall_mask, xs, ys, angles)
+    assert not (footprint & ~collisions).any()
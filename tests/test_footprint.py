@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from conftest import probe_collision
+from footprint import Footprint
+
+
+@pytest.mark.parametrize('size_x', [60, 15])
+def test_probe_collisions_match_the_original_loop(small_bundle, size_x):
+    wall_mask = small_bundle.wall_mask
+    height, width = wall_mask.shape
+    rng = np.random.default_rng(9)
+    center_x, center_y = rng.uniform(-10, width + 10, 600), rng.uniform(-10, height + 10, 600)
+    angles = rng.choice([0.0, 90.0, 180.0, 45.0], 600) + 20 * rng.integers(-18, 18, 600)
+
+    expected = [probe_collision(wall_mask, x, y, angle, size_x) for x, y, angle in zip(center_x, center_y, angles)]
+    assert 0 < sum(expected) < len(expected)
+    assert Footprint.probe_collides_many(wall_mask, center_x, center_y, angles, size_x).tolist() == expected
+    assert [bool(Footprint.probe_collides_many(wall_mask, x, y, angle, size_x))
+            for x, y, angle in zip(center_x, center_y, angles)] == expected
+
+
+def test_sweep_matches_sweeps(small_bundle):
+    wall_mask = small_bundle.wall_mask
+    height, width = wall_mask.shape
+    rng = np.random.default_rng(4)
+    start_x, start_y = rng.uniform(20, width - 20, 400), rng.uniform(20, height - 20, 400)
+    angles = rng.uniform(0, 360, 400)
+    end_x, end_y = start_x + rng.uniform(-25, 25, 400), start_y + rng.uniform(-25, 25, 400)
+    footprint = Footprint.get(15, 15)
+
+    impacts = footprint.sweeps(wall_mask, start_x, start_y, end_x, end_y, angles)
+    assert 0 < np.isnan(impacts).sum() < len(impacts)
+    singles = [footprint.sweep(wall_mask, *move) for move in zip(start_x, start_y, end_x, end_y, angles)]
+    assert [np.nan if impact is None else impact for impact in singles] == pytest.approx(impacts, nan_ok=True)
+
+
+def test_a_thin_wall_stops_the_corner_paths(monkeypatch):
+    wall_mask = np.zeros((100, 200), dtype=bool)
+    wall_mask[:, 100] = True
+    footprint = Footprint.get(15, 15)
+
+    # The front corners reach the wall 12.5 pixels into the 50 pixel move
+    assert footprint.sweep(wall_mask, 80, 50, 130, 50, 0) == pytest.approx(0.26)
+    assert footprint.sweeps(wall_mask, [80], [50], [130], [50], [0]).tolist() == pytest.approx([0.26])
+
+    # With poses that never touch, the corner paths alone give the time of impact
+    monkeypatch.setattr(Footprint, 'collides_many',
+                        lambda self, wall_mask, center_x, center_y, angles: np.zeros(np.shape(center_x), bool))
+    assert footprint.sweep(wall_mask, 80, 50, 130, 50, 0) == pytest.approx(0.26)
+    assert footprint.sweeps(wall_mask, [80], [50], [130], [50], [0]).tolist() == pytest.approx([0.26])
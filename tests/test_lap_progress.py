@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from conftest import make_generator
+from lap_progress import LapProgress
+from start_line import StartLine
+from track_fields import geodesic_distance_field
+from track_generator import TrackGenerator
+
+
+@pytest.fixture(scope='module')
+def lap_progress(small_bundle):
+    return LapProgress.load(small_bundle)
+
+
+@pytest.fixture(scope='module')
+def centerline():
+    """The centerline `small_bundle` was drawn from, in race order."""
+    rng = np.random.default_rng(3)
+    for _ in range(TrackGenerator.MAX_ATTEMPTS):
+        samples = make_generator().centerline(rng)
+        if TrackGenerator.is_clear(samples):
+            return samples
+    return samples
+
+
+def test_the_field_grows_away_from_the_line_in_the_race_direction_only():
+    wall_mask = np.zeros((5, 12), dtype=bool)
+    wall_mask[[0, -1]] = True
+    start_line_mask = np.zeros_like(wall_mask)
+    start_line_mask[1:4, 3] = True
+
+    field = geodesic_distance_field(wall_mask, start_line_mask, np.array([1.0, 0.0]))
+    assert field[1:4, 3:].tolist() == [list(range(9))] * 3
+    # Behind the line the corridor does not loop back, so it is never reached
+    assert np.isinf(field[1:4, :3]).all()
+    assert np.isinf(field[wall_mask]).all()
+
+
+def test_a_lap_along_the_centerline_adds_up_to_the_lap_length(lap_progress, centerline):
+    distances = lap_progress.distances(centerline[:, 0], centerline[:, 1])
+    assert np.isfinite(distances).all()
+
+    closed = np.append(distances, distances[0])
+    advances = lap_progress.advances(closed[:-1], closed[1:])
+    assert advances.sum() == pytest.approx(lap_progress.lap_length)
+    # Samples are 4 pixels apart; chamfer steps may only give back a few pixels
+    assert advances.min() > -4
+    assert [lap_progress.advance(before, after) for before, after in zip(closed[:-1], closed[1:])] == \
+        pytest.approx(advances)
+
+
+def test_advances_wrap_at_half_a_lap():
+    lap_progress = LapProgress(np.array([[0, 25, 50, 75, 100]], dtype=np.float32))
+    previous = np.array([10, 30, 95, 5, 10, np.inf])
+    current = np.array([30, 10, 5, 95, np.inf, 10])
+    # Forwards, backwards, forwards over the line, backwards over the line, unknown twice
+    expected = [20, -20, 10, -10, 0, 0]
+
+    assert lap_progress.lap_length == 100
+    assert lap_progress.advances(previous, current).tolist() == expected
+    assert [lap_progress.advance(before, after) for before, after in zip(previous, current)] == expected
+
+
+def test_pixels_behind_the_start_line_end_the_lap(small_bundle, lap_progress):
+    first_point, second_point = small_bundle.start_line
+    normal = np.array(StartLine(first_point, second_point).normal)
+    middle = (np.array(first_point) + np.array(second_point)) / 2
+
+    for offset in (1, 3):
+        assert lap_progress.distance(*(middle - offset * normal)) > 0.95 * lap_progress.lap_length
+        assert lap_progress.distance(*(middle + offset * normal)) < 0.05 * lap_progress.lap_length
+
+
+def test_race_headings_point_up_the_field(lap_progress):
+    headings = lap_progress.race_headings()
+    ys, xs = np.nonzero(np.isfinite(lap_progress.field) & np.isfinite(headings))
+    radians = np.radians(headings[ys, xs])
+    ahead = lap_progress.distances(np.round(xs + 4 * np.cos(radians)), np.round(ys - 4 * np.sin(radians)))
+
+    known = np.isfinite(ahead)
+    advances = lap_progress.advances(lap_progress.field[ys, xs][known], ahead[known])
+    assert advances.min() >= 0
+    assert (advances > 0).mean() > 0.9
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+
+from conftest import march
+from ray_table import RayTable
+from track_compiler import compile_track
+
+
+def test_lookups_stop_on_the_marched_pixel(track_png):
+    bundle = compile_track(track_png)
+    table = RayTable.build(bundle, 5, max_length=120, processes=2)
+
+    rng = np.random.default_rng(3)
+    ys, xs = np.nonzero(~bundle.wall_mask)
+    picks = rng.choice(len(xs), 200, replace=False)
+    xs, ys = xs[picks], ys[picks]
+    angles = 5 + 10 * rng.integers(-36, 72, len(xs))
+
+    for x, y, angle in zip(xs, ys, angles):
+        for max_length in (30, 120):
+            length = table.lookup(x, y, angle, max_length)
+            radians = math.radians(360 - angle)
+            hit = int(x + length * math.cos(radians)), int(y + length * math.sin(radians))
+            assert hit == march(bundle.wall_mask, x, y, angle, max_length)
+
+    lengths = table.lookup_many(xs, ys, angles, 120)
+    assert lengths.tolist() == [table.lookup(x, y, angle, 120) for x, y, angle in zip(xs, ys, angles)]
+
+
+def test_uncovered_rays_are_left_to_the_caller(track_png):
+    table = RayTable.build(compile_track(track_png), 5, max_length=120, processes=1)
+
+    assert table.lookup(10, 10, 12, 100) is None
+    assert table.lookup(-1, 10, 5, 100) is None
+    assert table.lookup(10, 10, 5, 200) is None
+    assert table.lookup_many([10, -1, 10], [10, 10, 10], [12, 5, 15], 100)[:2].tolist() == [-1, -1]
+
+
+def test_tables_from_another_builder_version_are_not_loaded(track_png, monkeypatch):
+    bundle = compile_track(track_png)
+    RayTable.build(bundle, 5, max_length=30, processes=1)
+    assert RayTable.load(bundle, 5, max_length=30) is not None
+
+    monkeypatch.setattr(RayTable, 'LAYER_VERSION', RayTable.LAYER_VERSION + 1)
+    assert RayTable.load(bundle, 5, max_length=30) is None
@@ -0,0 +1,81 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from bit_mask import BitMask
+from conftest import walked_distances
+from scaled_mask import ScaledMask
+
+
+def dilate(wall_mask, pixels):
+    """The mask grown by `pixels` in every direction, Chebyshev."""
+    kernel = np.ones((2 * pixels + 1, 2 * pixels + 1), dtype=np.uint8)
+    return cv2.dilate(wall_mask.astype(np.uint8), kernel).astype(bool)
+
+
+def ray_length(stop_x, stop_y, x0, y0):
+    return math.hypot(stop_x - x0, stop_y - y0)
+
+
+@pytest.mark.parametrize('factor', [2, 3, 4])
+def test_coarse_walls_cover_the_walls_within_the_bound(small_bundle, factor):
+    wall_mask = small_bundle.wall_mask
+    height, width = wall_mask.shape
+    scaled = ScaledMask.from_dense(wall_mask, factor)
+    ys, xs = np.mgrid[:height, :width]
+    coarse = scaled[ys, xs]
+
+    assert not (wall_mask & ~coarse).any()
+    assert not (coarse & ~dilate(wall_mask, factor - 1)).any()
+
+
+@pytest.mark.parametrize('factor', [2, 4])
+def test_box_collisions_are_never_missed(small_bundle, factor):
+    wall_mask = small_bundle.wall_mask
+    height, width = wall_mask.shape
+    scaled = ScaledMask.from_dense(wall_mask, factor)
+    grown = dilate(wall_mask, factor - 1)
+    rng = np.random.default_rng(15)
+    x1, y1 = rng.integers(-20, width, 500), rng.integers(-20, height, 500)
+
+    for x, y, hit in zip(x1, y1, scaled.any_in_boxes(x1, y1, 15, 15)):
+        box = (slice(max(0, y), max(0, y + 15)), slice(max(0, x), max(0, x + 15)))
+        assert hit == scaled.any_in_box(x, y, x + 15, y + 15)
+        # Never missed, and only fired by walls within factor - 1 pixels of the box
+        assert hit >= wall_mask[box].any()
+        assert hit <= grown[box].any()
+
+
+@pytest.mark.parametrize('factor', [2, 4])
+def test_readings_never_exceed_full_resolution(small_bundle, free_points, factor):
+    wall_mask = small_bundle.wall_mask
+    scaled = ScaledMask.from_dense(wall_mask, factor)
+    dense = BitMask.from_dense(wall_mask)
+    xs, ys = free_points
+    angles = np.random.default_rng(16).uniform(0, 360, len(xs))
+
+    dense_x, dense_y = dense.cast_rays(xs + 0.5, ys + 0.5, angles, 200)
+    scaled_x, scaled_y = scaled.cast_rays(xs + 0.5, ys + 0.5, angles, 200)
+    for index, (x, y) in enumerate(zip(xs, ys)):
+        assert ray_length(scaled_x[index], scaled_y[index], x, y) <= ray_length(dense_x[index], dense_y[index], x, y)
+        assert (scaled.distances_to_edges(x, y) <= walked_distances(wall_mask, x, y)).all()
+
+
+@pytest.mark.parametrize('factor', [2, 3, 4])
+def test_head_on_readings_are_at_most_factor_minus_one_short(factor):
+    # Vertical walls at every offset within a cell, read head-on from both sides
+    for wall_x in range(40, 40 + factor):
+        wall_mask = np.zeros((60, 120), dtype=bool)
+        wall_mask[:, wall_x] = True
+        scaled = ScaledMask.from_dense(wall_mask, factor)
+        dense = BitMask.from_dense(wall_mask)
+        for x in (5, 17, 80, 101):
+            dense_distances, scaled_distances = walked_distances(wall_mask, x, 30), scaled.distances_to_edges(x, 30)
+            side = 1 if x < wall_x else 0
+            assert 0 <= dense_distances[side] - scaled_distances[side] <= factor - 1
+
+            angle = 0 if x < wall_x else 180
+            dense_stop, scaled_stop = dense.cast_ray(x, 30, angle, 200), scaled.cast_ray(x, 30, angle, 200)
+            assert 0 <= abs(dense_stop[0] - x) - abs(scaled_stop[0] - x) <= factor - 1
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from car2 import Car2
+from conftest import make_car
+from environments.car_env import Track as EnvTrack
+from footprint import Footprint
+
+
+@pytest.mark.parametrize('car_size', [(30, 30), (15, 15)])
+def test_box_poses_are_collision_free(small_bundle, car_size):
+    track = EnvTrack(small_bundle)
+    spawns = track.get_spawn_index(car_size)
+    assert len(spawns) > 0
+
+    top_left = spawns.poses[:, :2].astype(np.int64) - car_size[0] // 2
+    assert not track.check_collisions(top_left, car_size).any()
+
+    xs, ys, _ = spawns.samples(np.random.default_rng(10), 500, 'segment')
+    assert not track.check_collisions(np.stack([xs, ys], axis=1) - car_size[0] // 2, car_size).any()
+
+
+@pytest.mark.parametrize('size_x, size_y', [(15, 15), (30, 20)])
+def test_footprint_poses_are_collision_free(small_track, size_x, size_y):
+    spawns = small_track.spawn_index(size_x, size_y)
+    footprint = Footprint.get(size_x, size_y)
+    assert len(spawns) > 0
+
+    x, y, heading = spawns.poses[:, 0], spawns.poses[:, 1], spawns.poses[:, 2]
+    assert not footprint.collides_many(small_track.wall_mask, x, y, heading).any()
+
+    xs, ys, headings = spawns.samples(np.random.default_rng(11), 500)
+    assert not footprint.collides_many(small_track.wall_mask, xs, ys, headings).any()
+
+
+def test_spawned_cars_start_alive(small_track):
+    spawns = small_track.spawn_index(Car2.CAR_SIZE_X, Car2.CAR_SIZE_Y)
+    rng = np.random.default_rng(12)
+    for _ in range(50):
+        car = make_car(Car2, small_track, *spawns.sample(rng), 5)
+        assert not car.is_collision()
+
+
+def test_segment_samples_stay_in_their_segment(small_track):
+    spawns = small_track.spawn_index(Car2.CAR_SIZE_X, Car2.CAR_SIZE_Y)
+    rng = np.random.default_rng(13)
+    for segment in np.flatnonzero(np.diff(spawns.segment_starts)):
+        xs, ys, _ = spawns.samples(rng, 20, 'segment', segment)
+        distances = small_track.lap_progress.distances(xs, ys)
+        low, high = spawns.lap_length * segment / spawns.segments, spawns.lap_length * (segment + 1) / spawns.segments
+        assert ((distances >= low) & (distances < high)).all()
@@ -0,0 +1,49 @@
+import pygame as pg
+import pytest
+
+from sprite_atlas import SpriteAtlas, get_atlas
+
+
+@pytest.fixture
+def sprite_path(tmp_path, monkeypatch):
+    """A small asymmetric sprite on disk, with a dummy display to convert it against."""
+    monkeypatch.setenv('SDL_VIDEODRIVER', 'dummy')
+    monkeypatch.setattr(SpriteAtlas, 'ATLASES', {})
+    pg.display.init()
+    pg.display.set_mode((1, 1))
+
+    sprite = pg.Surface((12, 6))
+    sprite.fill((200, 30, 30))
+    sprite.fill((20, 20, 220), pg.Rect(8, 0, 4, 3))
+    path = str(tmp_path / 'sprite.png')
+    pg.image.save(sprite, path)
+    yield path
+    pg.display.quit()
+
+
+@pytest.mark.parametrize('angle, heading', [(0, 0), (20, 20), (359.6, 0), (360, 0), (380, 20), (-20, 340),
+                                            (44.4, 44), (44.6, 45), (-720.2, 0)])
+def test_headings_are_rounded_and_wrapped(angle, heading):
+    assert SpriteAtlas.heading(angle) == heading
+
+
+def test_atlases_are_shared_by_key(sprite_path):
+    atlas = get_atlas(sprite_path, (12, 6))
+
+    assert SpriteAtlas.get(sprite_path, [12, 6]) is atlas
+    assert get_atlas(sprite_path, (6, 3)) is not atlas
+    assert get_atlas(sprite_path, (12, 6), alpha=True) is not atlas
+    assert atlas.sprite.get_size() == atlas.size == (12, 6)
+
+
+def test_rotations_are_cached_per_heading(sprite_path):
+    atlas = get_atlas(sprite_path, (12, 6))
+
+    rotated = atlas.rotated(30)
+    assert atlas.rotated(390) is atlas.rotated(29.8) is rotated
+    expected = pg.transform.rotate(atlas.sprite, 30)
+    assert rotated.get_size() == expected.get_size()
+    assert pg.image.tobytes(rotated, 'RGBA') == pg.image.tobytes(expected, 'RGBA')
+
+    atlas.prerotate(30)
+    assert sorted(atlas.rotations) == list(range(10, 360, 20))
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+
+from start_line import StartLine
+
+
+def find_pixel_points(start_line_mask):
+    """The endpoints of the per-pixel `Track.find_pixel` scans `StartLine.from_mask` replaces."""
+    height, width = start_line_mask.shape
+    first = next(((x, y) for x in range(width) for y in range(height) if start_line_mask[y, x]), None)
+    second = next(((x, y) for y in range(height - 1, -1, -1) for x in range(width) if start_line_mask[y, x]), None)
+    return first, second
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_from_mask_finds_the_scanned_endpoints(seed):
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((60, 90), dtype=np.uint8)
+    for _ in range(rng.integers(1, 3)):
+        start = tuple(int(value) for value in rng.integers(0, (90, 60)))
+        end = tuple(int(value) for value in rng.integers(0, (90, 60)))
+        cv2.line(mask, start, end, 1, thickness=int(rng.integers(1, 6)))
+    mask = mask.astype(bool)
+
+    assert StartLine.from_mask(mask).points == find_pixel_points(mask)
+
+
+def test_from_mask_without_a_line():
+    assert StartLine.from_mask(np.zeros((10, 10), dtype=bool)) is None
+
+
+def test_crossing_sign_follows_the_race_direction():
+    line = StartLine((50, 20), (50, 80))
+    normal = line.normal
+    ahead = np.array(line.midpoint) + 5 * normal
+    behind = np.array(line.midpoint) - 5 * normal
+
+    assert line.crossing(behind, ahead) == (1, 0.5)
+    assert line.crossing(ahead, behind) == (-1, 0.5)
+    assert line.crossing(behind, behind + 1e-3 * normal) == (0, None)
+    # Passing beside the segment is not a crossing
+    assert line.crossing(behind + (0, 100), ahead + (0, 100)) == (0, None)
+
+
+def test_crossings_match_crossing():
+    rng = np.random.default_rng(0)
+    line = StartLine((40, 10), (55, 70))
+    previous = rng.uniform(0, 100, (2000, 2))
+    current = previous + rng.normal(0, 20, (2000, 2))
+
+    directions, times = line.crossings(previous, current)
+    for index in range(len(previous)):
+        direction, time = line.crossing(previous[index], current[index])
+        assert directions[index] == direction
+        if time is None:
+            assert np.isnan(times[index])
+        else:
+            assert times[index] == pytest.approx(time)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from car_core import CarCore
+from telemetry import RingBuffer, Telemetry
+
+
+def test_partly_filled_buffer():
+    buffer = RingBuffer(4)
+    for value in (1, 2, 3):
+        buffer.append(value)
+
+    assert len(buffer) == 3
+    assert buffer.view().tolist() == [1, 2, 3]
+
+
+def test_wrapped_buffer_keeps_the_latest_values_oldest_first():
+    buffer = RingBuffer(4)
+    for value in range(1, 11):
+        buffer.append(value)
+
+    values = buffer.view()
+    assert len(buffer) == 4
+    assert values.tolist() == [7, 8, 9, 10]
+    assert not values.flags.writeable
+    with pytest.raises(ValueError):
+        values[0] = 0
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.view().tolist() == []
+    buffer.append(11)
+    assert buffer.view().tolist() == [11]
+
+
+def test_telemetry_aggregates_the_whole_run():
+    telemetry = Telemetry(capacity=3)
+    speeds = [4.0, 9.0, 1.0, 6.0, 5.0]
+    for speed in speeds:
+        telemetry.record_update(speed)
+    for angle in (20, -20):
+        telemetry.record_steering(angle)
+
+    recording = telemetry.read()
+    assert recording['speeds'].tolist() == [1.0, 6.0, 5.0]
+    assert recording['steering'].tolist() == [20, -20]
+    assert (recording['updates'], recording['steering_inputs']) == (5, 2)
+    assert recording['mean_speed'] == pytest.approx(np.mean(speeds))
+    assert recording['top_speed'] == 9.0
+
+    telemetry.clear()
+    recording = telemetry.read()
+    assert recording['speeds'].tolist() == recording['steering'].tolist() == []
+    assert (recording['updates'], recording['steering_inputs']) == (0, 0)
+    assert recording['mean_speed'] == recording['top_speed'] == 0.0
+
+
+def test_cars_record_only_once_enabled():
+    car = CarCore(0, 0, 0, 5, 10, 10)
+    assert car.get_telemetry() is None
+
+    car.enable_telemetry(capacity=8)
+    car.drive(0, 0, 100, 100)
+    assert car.get_telemetry()['speeds'].tolist() == [5]
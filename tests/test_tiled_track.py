@@ -0,0 +1,35 @@
+import numpy as np
+
+from conftest import march, walked_distances
+from tiled_track import TiledMask
+from track_compiler import compile_tiled_track, compile_track
+
+
+def test_tiled_queries_match_the_dense_mask(track_png):
+    wall_mask = compile_track(track_png).wall_mask
+    # Small tiles and a small cache, so queries cross tiles and evict them
+    tiled = TiledMask.from_bundle(compile_tiled_track(track_png, tile_size=64, with_image=False), max_resident=4)
+    height, width = wall_mask.shape
+    rng = np.random.default_rng(17)
+
+    ys, xs = rng.integers(0, height, 500), rng.integers(0, width, 500)
+    np.testing.assert_array_equal(tiled[ys, xs], wall_mask[ys, xs])
+    assert tiled.stats()['resident'] <= 4
+
+    x1, y1 = rng.integers(-20, width, 300), rng.integers(-20, height, 300)
+    expected = [bool(wall_mask[max(0, y):max(0, y + 30), max(0, x):max(0, x + 30)].any()) for x, y in zip(x1, y1)]
+    assert tiled.any_in_boxes(x1, y1, 30, 30).tolist() == expected
+    assert [tiled.any_in_box(x, y, x + 30, y + 30) for x, y in zip(x1, y1)] == expected
+    assert tiled.stats()['resident'] <= 4
+
+    free_y, free_x = np.nonzero(~wall_mask)
+    picks = rng.choice(len(free_x), 100, replace=False)
+    for x, y, angle in zip(free_x[picks], free_y[picks], rng.uniform(0, 360, 100)):
+        assert tiled.cast_ray(x + 0.5, y + 0.5, angle, 200) == march(wall_mask, x + 0.5, y + 0.5, angle, 200)
+        np.testing.assert_array_equal(tiled.distances_to_edges(x, y), walked_distances(wall_mask, x, y))
+        assert tiled.stats()['resident'] <= 4
+
+    # Tiles were loaded and evicted, and every loaded tile is either resident or evicted
+    stats = tiled.stats()
+    assert stats['loads'] > 4 and stats['evictions'] > 0
+    assert stats['loads'] - stats['evictions'] == stats['resident']
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from track_compiler import compile_track
+from track_generator import TrackGenerator
+
+
+def test_layer_is_a_sidecar_and_leaves_the_bundle_untouched(track_png):
+    bundle = compile_track(track_png)
+    with open(bundle.path, 'rb') as f:
+        before = f.read()
+
+    layer = bundle.layer('ones', lambda b: np.ones(b.wall_mask.shape, dtype=np.uint8))
+
+    assert os.path.exists(bundle.layer_path('ones', 1))
+    with open(bundle.path, 'rb') as f:
+        assert f.read() == before
+    assert layer.sum() == bundle.wall_mask.size
+
+
+def test_layer_is_built_once_per_version(track_png):
+    calls = []
+
+    def build(b):
+        calls.append(1)
+        return np.full(3, len(calls))
+
+    assert list(compile_track(track_png).layer('counter', build)) == [1, 1, 1]
+    assert list(compile_track(track_png).layer('counter', build)) == [1, 1, 1]
+    assert list(compile_track(track_png).layer('counter', build, version=2)) == [2, 2, 2]
+    assert len(calls) == 2
+
+
+def test_layers_added_by_separate_loads_are_all_kept(track_png):
+    # Two workers holding their own mapping each add a layer: neither drops the other's.
+    first, second = compile_track(track_png), compile_track(track_png)
+    first.layer('a', lambda b: np.zeros(2))
+    second.layer('b', lambda b: np.ones(2))
+
+    reloaded = compile_track(track_png)
+    assert list(reloaded.layer('a', lambda b: pytest.fail('rebuilt a'))) == [0, 0]
+    assert list(reloaded.layer('b', lambda b: pytest.fail('rebuilt b'))) == [1, 1]
+
+
+def test_native_size_request_shares_the_native_bundle(track_png):
+    native = compile_track(track_png)
+    assert compile_track(track_png, native.size).path == native.path
+
+    resized = compile_track(track_png, (240, 135))
+    assert resized.path != native.path
+    assert resized.size == (240, 135)
+
+
+def test_in_memory_bundle_layers_stay_in_memory():
+    bundle = TrackGenerator(320, 180, road_width=(30, 40), margin=10, start_length=30).generate(0)
+    layer = bundle.layer('twice', lambda b: b.wall_mask * 2)
+    assert bundle.path is None
+    assert bundle.layer('twice', lambda b: pytest.fail('rebuilt')) is layer
@@ -0,0 +1,37 @@
+import numpy as np
+
+from conftest import march
+from track_fields import count_in_boxes, trace_ray, wall_distance_field, wall_integral
+
+
+def test_trace_ray_stops_on_the_marched_pixel(small_bundle, free_points):
+    wall_mask = small_bundle.wall_mask
+    distance_field = wall_distance_field(wall_mask)
+    angles = np.random.default_rng(1).uniform(0, 360, len(free_points[0]))
+
+    for x, y, angle in zip(*free_points, angles):
+        x0, y0 = x + 0.37, y + 0.61
+        for max_length in (5, 40, 300):
+            assert trace_ray(distance_field, x0, y0, angle, max_length) == march(wall_mask, x0, y0, angle, max_length)
+
+
+def test_wall_distance_field_counts_the_map_edge_as_wall():
+    field = wall_distance_field(np.zeros((5, 9), dtype=bool))
+    assert field[0, 4] == 1
+    assert field[2, 4] == 3
+
+
+def test_count_in_boxes_counts_the_sliced_walls(small_bundle):
+    wall_mask = small_bundle.wall_mask
+    height, width = wall_mask.shape
+    table = wall_integral(wall_mask)
+    rng = np.random.default_rng(2)
+    x1, y1 = rng.integers(-70, width + 10, 500), rng.integers(-70, height + 10, 500)
+    x2, y2 = x1 + rng.integers(0, 70, 500), y1 + rng.integers(0, 70, 500)
+
+    counts = count_in_boxes(table, x1, y1, x2, y2)
+    for index in range(500):
+        # The visible part of the box, as the clipped slice of the old collision test
+        box = wall_mask[max(0, y1[index]):max(0, y2[index]), max(0, x1[index]):max(0, x2[index])]
+        assert counts[index] == box.sum()
+        assert count_in_boxes(table, x1[index], y1[index], x2[index], y2[index]) == box.sum()
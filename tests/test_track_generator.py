@@ -0,0 +1,31 @@
+import math
+
+import numpy as np
+import pytest
+
+from conftest import make_generator
+from track_generator import TrackGenerator
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_start_zone_lies_across_the_road(seed):
+    bundle = make_generator().generate(seed)
+    first, second = np.array(bundle.start_line, dtype=np.float64)
+    x, y, angle = bundle.start_pos
+    radians = math.radians(angle)
+    heading = np.array([math.cos(radians), -math.sin(radians)])
+
+    assert not (bundle.wall_mask & bundle.start_line_mask).any()
+    # The start line is perpendicular to the race direction, and the zone lies ahead of it
+    assert abs(np.dot(second - first, heading)) <= 1.5
+    ys, xs = np.nonzero(bundle.start_line_mask)
+    ahead = (xs - x) * heading[0] + (ys - y) * heading[1]
+    assert ahead.min() >= -1.5
+    assert ahead.max() == pytest.approx(make_generator().start_length, abs=2)
+
+
+def test_a_layout_that_never_clears_warns(monkeypatch):
+    monkeypatch.setattr(TrackGenerator, 'is_clear', staticmethod(lambda samples: False))
+    with pytest.warns(RuntimeWarning, match='no clear layout'):
+        bundle = make_generator().generate(0)
+    assert bundle.start_line is not None
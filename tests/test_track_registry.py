@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from track_registry import TrackRegistry
+
+
+def load_counted(track_file, bit_packed=False, resolution=1):
+    load_counted.calls += 1
+    return object()
+
+
+def test_default_options_share_one_track():
+    load_counted.calls = 0
+    registry = TrackRegistry(load=load_counted)
+
+    track = registry.get('track.png')
+    assert registry.get('track.png', bit_packed=False) is track
+    assert registry.get('track.png', resolution=1.0, bit_packed=False) is track
+    assert registry.get('track.png', bit_packed=True) is not track
+    assert load_counted.calls == 2
+
+    registry.evict('track.png', resolution=1)
+    assert registry.get('track.png') is not track
+    assert load_counted.calls == 3
+
+
+def test_the_least_recently_used_track_is_evicted():
+    registry = TrackRegistry(max_tracks=2, load=lambda track_file: object())
+
+    first, second = registry.get('a.png'), registry.get('b.png')
+    assert registry.get('a.png') is first
+    registry.get('c.png')
+
+    # b was used least recently, so it made room for c
+    assert list(registry.tracks) == [('a.png', ()), ('c.png', ())]
+    assert registry.get('a.png') is first
+    assert registry.get('b.png') is not second
+    assert registry.stats() == {'hits': 2, 'loads': 4, 'evictions': 2, 'loaded': 2}
+
+
+def slow_load(track_file):
+    """Counts its calls and takes long enough for concurrent requests to overlap it."""
+    with slow_load.lock:
+        slow_load.calls[track_file] = slow_load.calls.get(track_file, 0) + 1
+    time.sleep(0.05)
+    return object()
+
+
+slow_load.lock = threading.Lock()
+
+
+def test_concurrent_requests_load_a_track_once():
+    slow_load.calls = {}
+    registry = TrackRegistry(load=slow_load)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        tracks = list(pool.map(lambda _: registry.get('track.png'), range(8)))
+    assert all(track is tracks[0] for track in tracks)
+    assert slow_load.calls == {'track.png': 1}
+    assert registry.stats()['loads'] == 1
+
+
+def test_warm_loads_each_track_once():
+    slow_load.calls = {}
+    registry = TrackRegistry(load=slow_load)
+
+    tracks = registry.warm(['a.png', 'b.png', 'a.png', 'c.png'], workers=4)
+    assert tracks[0] is tracks[2] is registry.get('a.png')
+    assert slow_load.calls == {'a.png': 1, 'b.png': 1, 'c.png': 1}
+    # The second a.png waits for the first one's load, so only the last get is a hit
+    assert registry.stats() == {'hits': 1, 'loads': 3, 'evictions': 0, 'loaded': 3}
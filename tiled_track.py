@@ -0,0 +1,207 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from bit_mask import BitMask
+
+
+class TileCache:
+    """A least-recently-used set of resident tiles over a memory-mapped tile array.
+
+    Only resident tiles are read by queries. A tile is copied out of the mapping the first
+    time it is touched and dropped when more than `max_resident` tiles are held, so the
+    memory a track costs follows the area the cars cover, not the size of the map.
+
+    Attributes:
+        tiles (ndarray): The memory-mapped tile array, indexed as [row, column, ...].
+        tile_size (int): The tile side in pixels.
+        shape (tuple): The (height, width) of the map in pixels.
+        max_resident (int): The most tiles kept in memory at once.
+        loads (int): How many tiles were read from the mapping.
+        evictions (int): How many tiles were dropped to make room.
+    """
+
+    MAX_RESIDENT = 64
+
+    def __init__(self, tiles, tile_size, shape, max_resident=MAX_RESIDENT):
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.shape = tuple(shape)
+        self.max_resident = max_resident
+        self.resident = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def grid(self):
+        """tuple: The (rows, columns) of tiles covering the map."""
+        return self.tiles.shape[0], self.tiles.shape[1]
+
+    def load_tile(self, row, column):
+        """Reads a tile from the mapping into the form queries use."""
+        return np.array(self.tiles[row, column])
+
+    def tile(self, row, column):
+        """Returns a resident tile, loading it and evicting the least recently used one if needed."""
+        key = (row, column)
+        tile = self.resident.get(key)
+        if tile is not None:
+            self.resident.move_to_end(key)
+            return tile
+
+        tile = self.load_tile(row, column)
+        self.loads += 1
+        self.resident[key] = tile
+        if len(self.resident) > self.max_resident:
+            self.resident.popitem(last=False)
+            self.evictions += 1
+        return tile
+
+    def stats(self):
+        """Returns the tile counters, e.g. for logging how much of a large map a run touched.
+
+        Returns:
+            dict: The `loads`, `evictions` and currently `resident` tile counts.
+        """
+        return {'loads': self.loads, 'evictions': self.evictions, 'resident': len(self.resident)}
+
+
+class TiledMask(TileCache):
+    """A wall mask stored as bit-packed tiles, for maps too large to hold in memory.
+
+    A TiledMask is indexed like the dense mask, `mask[y, x]` with ints or integer arrays,
+    and answers the box, edge-distance and radar queries of `BitMask`, so it drops into
+    every place that takes a `wall_mask`. Each resident tile is a `BitMask` of
+    `tile_size` x `tile_size` pixels (8 KB for the default 256).
+    """
+
+    @staticmethod
+    def from_bundle(bundle, max_resident=TileCache.MAX_RESIDENT):
+        """Wraps the wall tiles of a bundle compiled by `TrackCompiler.compile_tiled`."""
+        width, height = bundle.size
+        return TiledMask(bundle.arrays['wall_tiles'], bundle.meta['tile_size'], (height, width), max_resident)
+
+    def load_tile(self, row, column):
+        return BitMask(np.array(self.tiles[row, column]), self.tile_size)
+
+    def __getitem__(self, key):
+        y, x = key
+        size = self.tile_size
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            return self.tile(y // size, x // size)[y % size, x % size]
+
+        y, x = np.broadcast_arrays(np.asarray(y, dtype=np.int64), np.asarray(x, dtype=np.int64))
+        walls = np.empty(x.shape, dtype=bool)
+        tile_ids = (y // size) * self.grid[1] + x // size
+        for tile_id in np.unique(tile_ids):
+            selected = tile_ids == tile_id
+            tile = self.tile(*divmod(int(tile_id), self.grid[1]))
+            walls[selected] = tile[y[selected] % size, x[selected] % size]
+        return walls
+
+    def any_in_box(self, x1, y1, x2, y2):
+        """Checks whether any wall pixel lies in the box [x1, x2) x [y1, y2), clipped to the map."""
+        height, width = self.shape
+        x1, x2 = min(max(0, x1), width), min(max(0, x2), width)
+        y1, y2 = min(max(0, y1), height), min(max(0, y2), height)
+        size = self.tile_size
+
+        for row in range(y1 // size, -(-y2 // size)):
+            for column in range(x1 // size, -(-x2 // size)):
+                origin_x, origin_y = column * size, row * size
+                if self.tile(row, column).any_in_box(x1 - origin_x, y1 - origin_y, x2 - origin_x, y2 - origin_y):
+                    return True
+        return False
+
+    def any_in_boxes(self, x1, y1, box_width, box_height):
+        """Batched `any_in_box` for equally sized boxes.
+
+        Returns:
+            ndarray: Boolean array, True where the box contains a wall pixel.
+        """
+        return np.array([self.any_in_box(int(x), int(y), int(x) + box_width, int(y) + box_height)
+                         for x, y in zip(np.ravel(x1), np.ravel(y1))], dtype=bool)
+
+    def distances_to_edges(self, x, y):
+        """Returns the pixel steps from (x, y) to the nearest wall left, right, up and down.
+
+        Each direction walks tile by tile and stops at the first tile holding a wall on the
+        line, so only the tiles between the point and the walls are touched. Directions
+        without a wall before the map edge are reported as inf, like `BitMask` does.
+
+        Returns:
+            ndarray: A float32 array of the left, right, up and down distances.
+        """
+        size = self.tile_size
+        row, column = y // size, x // size
+        local_y, local_x = y % size, x % size
+        rows, columns = self.grid
+
+        def tile_row(tile_column):
+            return np.unpackbits(self.tile(row, tile_column).packed[local_y]).astype(bool)
+
+        def tile_column(tile_row_index):
+            packed = self.tile(tile_row_index, column).packed
+            return ((packed[:, local_x >> 3] >> (7 - (local_x & 7))) & 1).astype(bool)
+
+        directions = (
+            ((tile_row(c)[:local_x + 1] if c == column else tile_row(c))[::-1] for c in range(column, -1, -1)),
+            ((tile_row(c)[local_x:] if c == column else tile_row(c)) for c in range(column, columns)),
+            ((tile_column(r)[:local_y + 1] if r == row else tile_column(r))[::-1] for r in range(row, -1, -1)),
+            ((tile_column(r)[local_y:] if r == row else tile_column(r)) for r in range(row, rows)),
+        )
+
+        distances = np.full(4, np.inf, dtype=np.float32)
+        for index, segments in enumerate(directions):
+            steps = 0
+            for segment in segments:
+                first = int(segment.argmax())
+                if segment[first]:
+                    distances[index] = steps + first
+                    break
+                steps += len(segment)
+        return distances
+
+    # The radar march only needs `shape` and [y, x] indexing, which a TiledMask provides.
+    cast_rays = BitMask.cast_rays
+    cast_ray = BitMask.cast_ray
+
+    def __repr__(self):
+        return f'TiledMask(shape={self.shape}, tile_size={self.tile_size}, {self.stats()})'
+
+
+class TiledImage(TileCache):
+    """The RGB image of a tiled track, assembled on demand for the visible area only."""
+
+    @staticmethod
+    def from_bundle(bundle, max_resident=TileCache.MAX_RESIDENT):
+        """Wraps the image tiles of a bundle compiled by `TrackCompiler.compile_tiled`.
+
+        Returns:
+            TiledImage: The image, or None if the bundle was compiled without it.
+        """
+        if 'image_tiles' not in bundle.arrays:
+            return None
+        width, height = bundle.size
+        return TiledImage(bundle.arrays['image_tiles'], bundle.meta['tile_size'], (height, width), max_resident)
+
+    def viewport(self, x, y, width, height):
+        """Returns the pixels of the map area [x, x + width) x [y, y + height).
+
+        Returns:
+            ndarray: A uint8 RGB array of shape (height, width, 3); black outside the map.
+        """
+        view = np.zeros((height, width, 3), dtype=np.uint8)
+        map_height, map_width = self.shape
+        x1, x2 = max(0, x), min(map_width, x + width)
+        y1, y2 = max(0, y), min(map_height, y + height)
+        size = self.tile_size
+
+        for row in range(y1 // size, -(-y2 // size)):
+            for column in range(x1 // size, -(-x2 // size)):
+                tile = self.tile(row, column)
+                left, top = max(x1, column * size), max(y1, row * size)
+                right, bottom = min(x2, (column + 1) * size), min(y2, (row + 1) * size)
+                view[top - y:bottom - y, left - x:right - x] = \
+                    tile[top - row * size:bottom - row * size, left - column * size:right - column * size]
+        return view
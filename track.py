@@ -1,5 +1,16 @@
 import pygame as pg
-import math
+import numpy as np
+
+from bit_mask import BitMask
+from cspace import ConfigurationSpace
+from lap_progress import LapProgress
+from ray_table import RayTable
+from scaled_mask import ScaledMask
+from spawn_index import SpawnIndex
+from start_line import StartLine
+from tiled_track import TiledImage, TiledMask
+from track_compiler import TrackBundle, compile_tiled_track, compile_track
+from track_fields import WALL_DISTANCE_VERSION, wall_distance_field
 
 
 class Track:
@@ -7,97 +18,254 @@ class Track:
 
     This class is responsible for loading the game track, identifying starting
     positions based on specific criteria, and determining if a point is out of bounds.
+    Collision masks and the start line come from the compiled track bundle (see
+    `track_compiler`), so they are only computed the first time a track image is used.
+    A headless track skips the image altogether: it creates no Surface and needs no display.
 
     Attributes:
         start_pos (tuple): The starting position on the track, including the angle (x, y, angle).
+        track_file (str or TrackBundle): The filepath to the track image, or a compiled bundle
+            such as one from `track_generator`.
+        bundle (TrackBundle): The compiled track the masks and start line are read from.
+        start_line (StartLine): The start/finish line, with its endpoints, segment and normal.
         width (int): The width of the track.
         height (int): The height of the track.
-        game_map (Surface): A Pygame Surface object representing the game track.
+        game_map (Surface): A Pygame Surface object representing the game track, or None when headless.
+        game_map_converted (bool): Whether `game_map` is in the display's pixel format yet.
+        wall_mask (ndarray, BitMask, ScaledMask or TiledMask): Border mask indexed as [y, x], True where the track has a border pixel.
+        start_line_mask (ndarray): Boolean array indexed as [y, x], True where the start line is drawn.
+        distance_field (ndarray): Euclidean distance from each pixel to the nearest border pixel.
+        ray_table (RayTable): Precomputed radar lengths, or None if none was generated for the track.
+        lap_progress (LapProgress): Driving distance from the start line to each pixel, or None without a start line.
         border_color (tuple): The RGBA color of the track's border.
         map_width (int): The width of the map area.
         map_height (int): The height of the map area.
+        bit_packed (bool): Whether the wall mask is kept as a one-bit-per-pixel `BitMask`.
+        tiled (bool): Whether the track is loaded from memory-mapped tiles (see `tiled_track`).
+        tiled_image (TiledImage): The image tiles drawn by `draw` for tiled tracks.
+        resolution_factor (int): The map pixels per wall cell side; 1 at full resolution.
+        headless (bool): Whether the track is loaded without its image, for simulation only.
     """
     
     START_LINE_COLOR = (0, 255, 0, 255)
 
-    def __init__(self, track_file, border_color=(255, 255, 255, 255), map_width=1920, map_height=1080):
+    def __init__(self, track_file, border_color=(255, 255, 255, 255), map_width=1920, map_height=1080,
+                 bit_packed=False, tiled=False, resolution=1, headless=False):
         """Initializes the Track with the given parameters.
 
         Args:
-            track_file (str): The filepath to the track image.
+            track_file (str or TrackBundle): The filepath to the track image, or an already
+                compiled bundle (e.g. `TrackGenerator.generate(seed)`), drawn from its masks.
             border_color (tuple): The color of the border of the track (default is white).
             map_width (int): The width of the game map.
             map_height (int): The height of the game map.
+            bit_packed (bool): Keep the wall mask bit-packed (~260 KB for 1080p) so it stays
+                cache-resident; cars and radars query it through the same [y, x] indexing.
+            tiled (bool): Load the track as memory-mapped tiles, for maps much larger than the
+                screen. The wall mask becomes a `TiledMask` that only reads the tiles cars touch,
+                and the full-map fields (distance field, ray table, progress) are not built.
+            resolution (float): The wall resolution, 1, 1/2 or 1/4 (any 1 / n). Below 1 the wall
+                mask is a max-pooled `ScaledMask` (see there for how far readings can drift);
+                cars keep map-pixel positions, radars march over the coarse cells instead of the
+                full-resolution distance field and ray table, and `bit_packed` is ignored.
+            headless (bool): Load the masks and fields only. No image is decoded and no Surface
+                is created, so no display is needed; `draw` does nothing.
         """
         self.start_pos = None
         self.width = None
         self.height = None
         self.game_map = track_file
+        self.track_file = track_file
+        self.bundle = None
+        self.wall_mask = None
+        self.start_line_mask = None
+        self.distance_field = None
+        self.ray_table = None
+        self.lap_progress = None
+        self.start_line = None
         self.border_color = border_color
         self.map_width = map_width
         self.map_height = map_height
+        self.bit_packed = bit_packed
+        self.tiled = tiled
+        self.tiled_image = None
+        self.game_map_converted = False
+        self.resolution_factor = ScaledMask.factor_for(resolution)
+        self.headless = headless
 
     def load_game_map(self):
-        """Loads the game map from the track file and sets the starting position."""
-        self.game_map = pg.image.load(self.game_map).convert()
-        self.width = self.game_map.get_width()
-        self.height = self.game_map.get_height()
+        """Loads the game map and the compiled collision masks, and sets the starting position.
+
+        The Surface is kept for drawing only; every collision query goes through the masks,
+        which are memory-mapped from the compiled track bundle.
+        """
+        if self.tiled:
+            self.load_tiled_map()
+            return
+
+        if isinstance(self.track_file, TrackBundle):
+            self.bundle = self.track_file
+        else:
+            self.bundle = compile_track(self.track_file, wall_color=self.border_color)
+        if self.headless:
+            self.game_map = None
+        elif isinstance(self.track_file, TrackBundle):
+            # Surfaces are indexed [x, y] and RGB; the bundle image is [y, x] and BGR.
+            self.game_map = pg.surfarray.make_surface(self.bundle.image()[:, :, ::-1].transpose(1, 0, 2))
+        else:
+            self.game_map = pg.image.load(self.track_file)
+        self.game_map_converted = False
+        self.convert_game_map()
+        self.width, self.height = self.bundle.size
+        if self.resolution_factor > 1:
+            factor = self.resolution_factor
+            cells = self.bundle.layer(f'wall_cells_{factor}', lambda bundle: ScaledMask.downsample(bundle.wall_mask, factor),
+                                     ScaledMask.LAYER_VERSION)
+            self.wall_mask = ScaledMask(cells, factor, (self.height, self.width))
+        elif self.bit_packed:
+            self.wall_mask = BitMask(self.bundle.layer('wall_bits', lambda bundle: np.packbits(bundle.wall_mask, axis=1),
+                                                       BitMask.LAYER_VERSION), self.width)
+        else:
+            self.wall_mask = self.bundle.wall_mask
+        self.start_line_mask = self.bundle.start_line_mask
+        first_point, second_point = self.bundle.start_line
+        if first_point is not None:
+            self.start_line = StartLine(first_point, second_point)
+        self.set_starting_position()
+        if self.resolution_factor == 1:
+            # Full-resolution radar accelerators; coarse masks answer radars themselves.
+            self.distance_field = self.bundle.layer('wall_distance', lambda bundle: wall_distance_field(bundle.wall_mask),
+                                                    WALL_DISTANCE_VERSION)
+            self.ray_table = RayTable.load(self.bundle, self.start_pos[2])
+        self.lap_progress = LapProgress.load(self.bundle)
+
+    def convert_game_map(self):
+        """Converts the map Surface to the display's pixel format for fast blits.
+
+        Until a display mode is set (e.g. when the track is loaded in a worker thread by
+        `TrackRegistry.warm`) the Surface is kept as loaded and converted on the next draw.
+        """
+        if self.game_map_converted or self.game_map is None or pg.display.get_surface() is None:
+            return
+        self.game_map = self.game_map.convert()
+        self.game_map_converted = True
+
+    def load_tiled_map(self):
+        """Loads a tiled track: tile accessors for the walls and the image, and the start line."""
+        self.bundle = compile_tiled_track(self.track_file, wall_color=self.border_color)
+        self.game_map = None
+        self.width, self.height = self.bundle.size
+        self.wall_mask = TiledMask.from_bundle(self.bundle)
+        if not self.headless:
+            self.tiled_image = TiledImage.from_bundle(self.bundle)
+        first_point, second_point = self.bundle.start_line
+        if first_point is not None:
+            self.start_line = StartLine(first_point, second_point)
         self.set_starting_position()
 
-    def find_pixel(self, start, end, step, condition, first_axis = 1):
-        """Finds a pixel that meets a given condition.
+    def draw(self, screen, offset=(0, 0)):
+        """Draws the part of the track under the screen.
+
+        Tiled tracks only assemble the tiles in view, so drawing cost does not grow with the map.
 
         Args:
-            start (int): The starting index to begin the search.
-            end (int): The ending index to stop the search.
-            step (int): The step size for the search.
-            condition (function): A function that returns True if the pixel meets the desired condition.
+            screen (Surface): The Pygame surface to draw on.
+            offset (tuple): The map (x, y) shown at the top-left corner of the screen.
+        """
+        if self.headless:
+            return
+
+        if self.tiled_image is None:
+            self.convert_game_map()
+            screen.blit(self.game_map, (-offset[0], -offset[1]))
+            return
+
+        view = self.tiled_image.viewport(int(offset[0]), int(offset[1]), screen.get_width(), screen.get_height())
+        screen.blit(pg.surfarray.make_surface(view.transpose(1, 0, 2)), (0, 0))
+
+    def configuration_space(self, size_x, size_y):
+        """Returns the per-heading obstacle maps for a car footprint on this track.
+
+        The headings start at the track's start angle. The maps are cached with the compiled
+        track, so only the first call for a car size builds them.
+
+        Args:
+            size_x (int): The car length along its heading.
+            size_y (int): The car width across its heading.
 
         Returns:
-            tuple: The coordinates of the found pixel, or None if no pixel meets the condition.
+            ConfigurationSpace: The maps, to pass to the car classes as `cspace`.
         """
-        if first_axis == 1:
-            for x in range(start, end, step):
-                for y in range(self.height):
-                    if condition(self.game_map.get_at((x, y))):
-                        return x, y
-        else:
-            for y in range(start, end, step):
-                for x in range(self.width):
-                    if condition(self.game_map.get_at((x, y))):
-                        return x, y
-        return None
-    
+        return ConfigurationSpace.load(self.bundle, size_x, size_y, self.start_pos[2],
+                                       factor=self.resolution_factor)
+
+    def spawn_index(self, size_x, size_y):
+        """Returns every collision-free starting pose of a car footprint on this track.
+
+        Poses are car centers with the race heading snapped to the car's turning grid, sorted
+        by lap progress and cached with the compiled track, so drawing one is constant time.
+
+        Args:
+            size_x (int): The car length along its heading.
+            size_y (int): The car width across its heading.
+
+        Returns:
+            SpawnIndex: The poses, to draw from with `SpawnIndex.sample`.
+        """
+        return SpawnIndex.for_cspace(self.bundle, self.lap_progress, self.configuration_space(size_x, size_y),
+                                     size_x, size_y)
+
+    @staticmethod
+    def color_mask(surface, color):
+        """Builds a boolean mask of the pixels of a surface that have the given color.
+
+        Only the RGB channels are compared, which matches what `Surface.get_at` reports
+        for the opaque surfaces returned by `convert()`.
+
+        Args:
+            surface (Surface): The Pygame surface to scan.
+            color (tuple): The RGB or RGBA color to look for.
+
+        Returns:
+            ndarray: A contiguous boolean array of shape (height, width), indexed as [y, x].
+        """
+        pixels = pg.surfarray.array3d(surface)
+        return np.ascontiguousarray(np.all(pixels == np.asarray(color[:3], dtype=pixels.dtype), axis=2).T)
+
     def get_start_line_points(self):
-        bottom_left_green = self.find_pixel(0, self.width, 1, lambda color: color == Track.START_LINE_COLOR, 1)
-        top_left_green = self.find_pixel(self.height - 1, -1, -1, lambda color: color == Track.START_LINE_COLOR, 0)
-        
-        return bottom_left_green, top_left_green
-    
+        """Returns the two endpoints of the start line.
+
+        The endpoints come from the compiled bundle when available and are otherwise found
+        in one vectorized pass over the start-line mask.
+
+        Returns:
+            tuple: The two (x, y) endpoints, or (None, None) if the track has no start line.
+        """
+        if self.start_line is None and self.start_line_mask is not None:
+            self.start_line = StartLine.from_mask(self.start_line_mask)
+
+        return self.start_line.points if self.start_line is not None else (None, None)
+
     def is_start_line_touch(self, x, y):
-        return not self.out_of_bounds(x, y) and self.game_map.get_at((x, y)) == Track.START_LINE_COLOR
+        if self.start_line_mask is None:
+            return False
+        return not self.out_of_bounds(x, y) and bool(self.start_line_mask[y, x])
 
     def set_starting_position(self):
         """Determines the starting position on the track based on specific criteria.
 
-        The starting position is identified by finding specific pixels on the track and
-        calculating the midpoint and angle between them.
+        The starting position is the midpoint of the start line, facing along its normal.
 
         Returns:
             tuple: The x and y coordinates and angle of the starting position.
         """
-        bottom_left_green, top_left_green = self.get_start_line_points()
-
-        if bottom_left_green and top_left_green:
-            angle = math.atan2(top_left_green[0] - bottom_left_green[0],
-                               top_left_green[1] - bottom_left_green[1]) * 180 / math.pi
-            midpoint = ((top_left_green[0] + bottom_left_green[0]) // 2,
-                        (top_left_green[1] + bottom_left_green[1]) // 2)
-            self.start_pos = (midpoint[0], midpoint[1], angle)
-            return midpoint[0], midpoint[1], angle
+        self.get_start_line_points()
+
+        if self.start_line is not None:
+            self.start_pos = self.start_line.start_pos
         else:
             self.start_pos = (0, 0, 0)
-            return 0, 0, 0
+        return self.start_pos
 
     def out_of_bounds(self, x, y):
         """Checks if the given coordinates are out of the bounds of the track.
@@ -0,0 +1,494 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from start_line import StartLine
+
+
+class TrackBundle:
+    """A compiled track: named read-only arrays plus a small JSON metadata block.
+
+    A bundle is stored as one file made of a magic string, a JSON header and the raw
+    array data, each array aligned to `TrackBundle.ALIGNMENT` bytes. Loading maps the
+    file read-only, so arrays are views into the page cache: construction costs a header
+    parse, and forked workers share the same physical pages instead of holding copies.
+    Derived layers are kept in sidecar files next to it, see `layer`.
+
+    Attributes:
+        arrays (dict): Mapping of array name to ndarray (read-only when loaded from disk).
+        meta (dict): JSON-serializable metadata (size, start rectangle, start line, ...).
+        path (str): The file the bundle was loaded from or saved to, if any.
+        layers (dict): The derived layers loaded so far, by (name, version); see `layer`.
+    """
+
+    MAGIC = b'F1TRACK\x00'
+    ALIGNMENT = 64
+
+    def __init__(self, arrays, meta, path=None):
+        self.arrays = arrays
+        self.meta = meta
+        self.path = path
+        self.layers = {}
+
+    @property
+    def size(self):
+        """tuple: The (width, height) of the compiled track."""
+        return tuple(self.meta['size'])
+
+    @property
+    def wall_mask(self):
+        """ndarray: Boolean array indexed as [y, x], True on border pixels."""
+        return self.arrays['wall_mask']
+
+    @property
+    def start_line_mask(self):
+        """ndarray: Boolean array indexed as [y, x], True on start-line pixels."""
+        return self.arrays['start_line_mask']
+
+    @property
+    def start_rect(self):
+        """tuple: The (x, y, w, h) bounding box of the largest start-line region, or None."""
+        rect = self.meta.get('start_rect')
+        return tuple(rect) if rect is not None else None
+
+    @property
+    def start_line(self):
+        """tuple: The two start-line endpoints, as found by `StartLine.from_mask`."""
+        points = self.meta.get('start_line')
+        if points is None:
+            return None, None
+        return tuple(tuple(point) for point in points)
+
+    @property
+    def start_pos(self):
+        """tuple: The (x, y, angle) starting pose, (0, 0, 0) when the track has no start line."""
+        return tuple(self.meta.get('start_pos') or (0, 0, 0))
+
+    def image(self, wall_color=(255, 255, 255)):
+        """Draws the track from its masks: walls in `wall_color`, the start line green, the rest black.
+
+        Returns:
+            ndarray: A uint8 BGR image of shape (height, width, 3), as `cv2.imwrite` expects.
+        """
+        width, height = self.size
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        image[self.wall_mask] = wall_color[2::-1]
+        image[self.start_line_mask] = TrackCompiler.START_LINE_COLOR[::-1]
+        return image
+
+    def layer_path(self, name, version):
+        """Returns the sidecar file of a derived layer, next to the bundle file.
+
+        Args:
+            version (int or tuple): The builder version, or the versions of the builders
+                the layer depends on.
+        """
+        stem = os.path.splitext(self.path)[0]
+        tag = '.'.join(str(part) for part in version) if isinstance(version, tuple) else version
+        return f'{stem}.{name}.v{tag}.npy'
+
+    def layer(self, name, build, version=1):
+        """Returns a derived array of the bundle, building and persisting it on first use.
+
+        Derived layers (integral images, distance maps, ...) are stored as sidecar `.npy`
+        files next to the bundle, one per layer name and builder `version`, so only the first
+        load of a track pays for them and the bundle file itself is never rewritten. Bump the
+        version when a builder changes what it computes: older files are then ignored.
+
+        A layer is written to a temporary file and moved into place, so processes building
+        the same layer at once each publish a complete file and the last one wins.
+
+        Args:
+            name (str): The layer name.
+            build (callable): Called with the bundle to compute the layer when it is missing.
+            version (int or tuple): The version of `build`, see `layer_path`.
+
+        Returns:
+            ndarray: The layer, memory-mapped when the bundle is backed by a file.
+        """
+        key = (name, version)
+        if key in self.layers:
+            return self.layers[key]
+
+        if self.path is None:
+            self.layers[key] = build(self)
+            return self.layers[key]
+
+        path = self.layer_path(name, version)
+        if not os.path.exists(path):
+            tmp_path = f'{path[:-len(".npy")]}.{os.getpid()}.{threading.get_ident()}.tmp.npy'
+            np.save(tmp_path, build(self))
+            TrackBundle.publish(tmp_path, path)
+        self.layers[key] = np.load(path, mmap_mode='r').view(np.ndarray)
+        return self.layers[key]
+
+    @staticmethod
+    def publish(tmp_path, path):
+        """Moves a finished temporary file over `path`.
+
+        If `path` cannot be replaced (on Windows, while another process has it mapped), the
+        file already there is kept: it holds the same content, written by another process.
+        """
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            if not os.path.exists(path):
+                raise
+            os.remove(tmp_path)
+
+    def save(self, path):
+        """Writes the bundle to `path` atomically and returns the bundle memory-mapped from it.
+
+        Args:
+            path (str): Destination file.
+
+        Returns:
+            TrackBundle: The saved bundle, loaded back with memory mapping.
+        """
+        specs = {}
+        offset = 0
+        for name, array in self.arrays.items():
+            offset = -(-offset // TrackBundle.ALIGNMENT) * TrackBundle.ALIGNMENT
+            specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+
+        header = {'meta': self.meta, 'arrays': specs}
+        # Array offsets are relative to the data section, which starts at an aligned position.
+        header_bytes = json.dumps(header).encode('utf-8')
+        data_start = len(TrackBundle.MAGIC) + 8 + len(header_bytes)
+        data_start = -(-data_start // TrackBundle.ALIGNMENT) * TrackBundle.ALIGNMENT
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(TrackBundle.MAGIC)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for name, array in self.arrays.items():
+                f.seek(data_start + specs[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        TrackBundle.publish(tmp_path, path)
+
+        return TrackBundle.load(path)
+
+    @staticmethod
+    def load(path):
+        """Memory-maps a bundle file.
+
+        Args:
+            path (str): The bundle file.
+
+        Returns:
+            TrackBundle: The bundle, whose arrays are read-only views into the mapping.
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic_size = len(TrackBundle.MAGIC)
+        if buffer[:magic_size] != TrackBundle.MAGIC:
+            raise ValueError(f"Not a compiled track bundle: {path}")
+
+        header_size = int.from_bytes(buffer[magic_size:magic_size + 8], 'little')
+        header = json.loads(buffer[magic_size + 8:magic_size + 8 + header_size].decode('utf-8'))
+        data_start = magic_size + 8 + header_size
+        data_start = -(-data_start // TrackBundle.ALIGNMENT) * TrackBundle.ALIGNMENT
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            arrays[name] = np.frombuffer(buffer, dtype=np.dtype(spec['dtype']), count=int(np.prod(shape)),
+                                         offset=data_start + spec['offset']).reshape(shape)
+
+        return TrackBundle(arrays, header['meta'], path)
+
+
+class TrackCompiler:
+    """Turns track images into `TrackBundle` files cached by content hash.
+
+    The cache key covers the source image bytes, the target size, the wall color and
+    `TrackCompiler.VERSION`, so editing a track or changing what gets compiled produces
+    a new bundle while unchanged tracks are loaded straight from disk.
+    """
+
+    VERSION = 1
+    EXTENSION = '.f1track'
+    CACHE_DIR = '.compiled'
+    WALL_COLOR = (255, 255, 255)
+    START_LINE_COLOR = (0, 255, 0)
+    TILE_SIZE = 256
+
+    @staticmethod
+    def source_key(source_path, size, wall_color, variant=None):
+        """Hashes a track image together with the parameters it is compiled with.
+
+        Args:
+            source_path (str): The track image file.
+            size (tuple): The (width, height) target size, or None for the native size.
+            wall_color (tuple): The RGB color of the border.
+            variant (str, optional): Tag of an alternative layout, such as a tiled one.
+
+        Returns:
+            str: A hex digest identifying the compiled output.
+        """
+        digest = hashlib.sha256()
+        key_params = [TrackCompiler.VERSION, size, list(wall_color[:3])] + ([variant] if variant is not None else [])
+        digest.update(json.dumps(key_params).encode('utf-8'))
+        with open(source_path, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    @staticmethod
+    def bundle_path(source_path, size, key, cache_dir=None, variant=None):
+        """Returns the cache file a track compiles to."""
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(source_path), TrackCompiler.CACHE_DIR)
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        size_tag = f'{size[0]}x{size[1]}' if size is not None else 'native'
+        if variant is not None:
+            size_tag = f'{size_tag}_{variant}'
+        return os.path.join(cache_dir, f'{stem}_{size_tag}_{key[:16]}{TrackCompiler.EXTENSION}')
+
+    @staticmethod
+    def compile(source_path, size=None, wall_color=WALL_COLOR, cache_dir=None, force=False):
+        """Returns the compiled bundle for a track image, compiling it on a cache miss.
+
+        Args:
+            source_path (str): The track image file.
+            size (tuple, optional): The (width, height) to resize the track to. Defaults to the native size.
+            wall_color (tuple): The RGB(A) color of the border.
+            cache_dir (str, optional): Where bundles are stored. Defaults to a `.compiled`
+                directory next to the source image.
+            force (bool): Recompile even if a cached bundle exists.
+
+        Returns:
+            TrackBundle: The memory-mapped bundle.
+        """
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"Track image not found: {source_path}")
+
+        # A track asked for at its own size is the native bundle: `track.Track` (native) and
+        # `F1_Env` (1920x1080) share one bundle, and its layers, for a 1920x1080 image.
+        size = tuple(size) if size is not None else None
+        key = TrackCompiler.source_key(source_path, None, wall_color)
+        path = TrackCompiler.bundle_path(source_path, None, key, cache_dir)
+        if os.path.exists(path) and not force:
+            bundle = TrackBundle.load(path)
+            if size is None or bundle.size == size:
+                return bundle
+
+        if size is not None:
+            sized_key = TrackCompiler.source_key(source_path, size, wall_color)
+            sized_path = TrackCompiler.bundle_path(source_path, size, sized_key, cache_dir)
+            if os.path.exists(sized_path) and not force:
+                return TrackBundle.load(sized_path)
+
+        image = cv2.imread(source_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode track image: {source_path}")
+        if size is not None and (image.shape[1], image.shape[0]) != size:
+            image = cv2.resize(image, size)
+            key, path = sized_key, sized_path
+
+        bundle = TrackCompiler.build(image, wall_color)
+        bundle.meta['source'] = os.path.basename(source_path)
+        bundle.meta['key'] = key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return bundle.save(path)
+
+    @staticmethod
+    def build(image, wall_color=WALL_COLOR):
+        """Builds an in-memory bundle from a decoded BGR track image.
+
+        Args:
+            image (ndarray): The track image as returned by `cv2.imread`.
+            wall_color (tuple): The RGB(A) color of the border.
+
+        Returns:
+            TrackBundle: A bundle that is not yet backed by a file.
+        """
+        wall_mask = np.all(image == np.array(wall_color[2::-1], dtype=image.dtype), axis=2)
+        start_line_mask = np.all(image == np.array(TrackCompiler.START_LINE_COLOR[::-1], dtype=image.dtype), axis=2)
+        return TrackCompiler.from_masks(wall_mask, start_line_mask)
+
+    @staticmethod
+    def from_masks(wall_mask, start_line_mask, start_line=None):
+        """Builds an in-memory bundle straight from the wall and start-line masks.
+
+        This is what `build` does after decoding, so tracks produced without an image (see
+        `track_generator`) get the same layers and metadata as compiled images.
+
+        Args:
+            wall_mask (ndarray): Boolean array indexed as [y, x], True on border pixels.
+            start_line_mask (ndarray): Boolean array indexed as [y, x], True on start-line pixels.
+            start_line (StartLine, optional): The start line, when the caller knows it. Defaults
+                to `StartLine.from_mask`, which expects an axis-aligned zone as drawn by hand.
+
+        Returns:
+            TrackBundle: A bundle that is not yet backed by a file.
+        """
+        if start_line is None:
+            start_line = StartLine.from_mask(start_line_mask)
+        meta = {
+            'version': TrackCompiler.VERSION,
+            'size': [wall_mask.shape[1], wall_mask.shape[0]],
+            'start_rect': TrackCompiler.start_rect(start_line_mask),
+            'start_line': [list(point) for point in start_line.points] if start_line is not None else None,
+            'start_pos': list(start_line.start_pos) if start_line is not None else None,
+        }
+        return TrackBundle({'wall_mask': wall_mask, 'start_line_mask': start_line_mask}, meta)
+
+    @staticmethod
+    def compile_tiled(source_path, tile_size=TILE_SIZE, wall_color=WALL_COLOR, cache_dir=None, force=False,
+                      with_image=True):
+        """Returns the tiled bundle for a track image, compiling it on a cache miss.
+
+        Tiled bundles are meant for maps far larger than the screen: instead of full-size
+        masks they hold the wall mask as bit-packed square tiles, and optionally the image
+        as RGB tiles for drawing, each tile contiguous in the file. A `tiled_track.TiledMask`
+        then only pages in the tiles cars actually query.
+
+        Args:
+            source_path (str): The track image file.
+            tile_size (int): The tile side in pixels; a multiple of 8.
+            wall_color (tuple): The RGB(A) color of the border.
+            cache_dir (str, optional): Where bundles are stored. Defaults to a `.compiled`
+                directory next to the source image.
+            force (bool): Recompile even if a cached bundle exists.
+            with_image (bool): Also store the image tiles, for rendering.
+
+        Returns:
+            TrackBundle: The memory-mapped bundle.
+        """
+        if tile_size % 8:
+            raise ValueError(f"The tile size must be a multiple of 8, got {tile_size}")
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"Track image not found: {source_path}")
+
+        variant = f'tiles{tile_size}' + ('' if with_image else '_walls')
+        key = TrackCompiler.source_key(source_path, None, wall_color, variant)
+        path = TrackCompiler.bundle_path(source_path, None, key, cache_dir, variant)
+        if os.path.exists(path) and not force:
+            return TrackBundle.load(path)
+
+        image = cv2.imread(source_path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode track image: {source_path}")
+
+        bundle = TrackCompiler.build_tiled(image, tile_size, wall_color, with_image)
+        bundle.meta['source'] = os.path.basename(source_path)
+        bundle.meta['key'] = key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return bundle.save(path)
+
+    @staticmethod
+    def build_tiled(image, tile_size=TILE_SIZE, wall_color=WALL_COLOR, with_image=True):
+        """Builds an in-memory tiled bundle from a decoded BGR track image.
+
+        The image is processed one row of tiles at a time, so apart from the decoded image
+        no full-size mask is ever allocated. Tiles overhanging the map are padded with
+        free, black pixels.
+
+        Returns:
+            TrackBundle: A bundle with a `wall_tiles` array of shape (rows, columns,
+            tile_size, tile_size / 8) and, with `with_image`, an `image_tiles` array of
+            shape (rows, columns, tile_size, tile_size, 3) in RGB order.
+        """
+        height, width = image.shape[:2]
+        rows, columns = -(-height // tile_size), -(-width // tile_size)
+        wall_bgr = np.array(wall_color[2::-1], dtype=image.dtype)
+        start_bgr = np.array(TrackCompiler.START_LINE_COLOR[::-1], dtype=image.dtype)
+
+        wall_tiles = np.zeros((rows, columns, tile_size, tile_size // 8), dtype=np.uint8)
+        image_tiles = np.zeros((rows, columns, tile_size, tile_size, 3), dtype=np.uint8) if with_image else None
+        start_columns = np.zeros(width, dtype=bool)
+        start_rows = np.zeros(height, dtype=bool)
+
+        for row in range(rows):
+            strip = image[row * tile_size:(row + 1) * tile_size]
+            strip_height = strip.shape[0]
+
+            walls = np.zeros((tile_size, columns * tile_size), dtype=bool)
+            walls[:strip_height, :width] = np.all(strip == wall_bgr, axis=2)
+            wall_tiles[row] = np.packbits(walls, axis=1).reshape(tile_size, columns, -1).transpose(1, 0, 2)
+
+            start_line = np.all(strip == start_bgr, axis=2)
+            start_columns |= start_line.any(axis=0)
+            start_rows[row * tile_size:row * tile_size + strip_height] = start_line.any(axis=1)
+
+            if with_image:
+                pixels = np.zeros((tile_size, columns * tile_size, 3), dtype=np.uint8)
+                pixels[:strip_height, :width] = strip[:, :, ::-1]
+                image_tiles[row] = pixels.reshape(tile_size, columns, tile_size, 3).transpose(1, 0, 2, 3)
+
+        # The start line is found like `StartLine.from_mask`, reading only the rows and
+        # columns it needs, and its rectangle from the crop around the green pixels.
+        start_line = None
+        start_rect = None
+        if start_columns.any():
+            left_x = int(start_columns.argmax())
+            top_y = int(np.all(image[:, left_x] == start_bgr, axis=1).argmax())
+            bottom_y = height - 1 - int(start_rows[::-1].argmax())
+            bottom_x = int(np.all(image[bottom_y] == start_bgr, axis=1).argmax())
+            start_line = StartLine((left_x, top_y), (bottom_x, bottom_y))
+
+            right_x = width - 1 - int(start_columns[::-1].argmax())
+            first_y = int(start_rows.argmax())
+            crop = np.all(image[first_y:bottom_y + 1, left_x:right_x + 1] == start_bgr, axis=2)
+            start_rect = TrackCompiler.start_rect(crop)
+            if start_rect is not None:
+                start_rect = [start_rect[0] + left_x, start_rect[1] + first_y, start_rect[2], start_rect[3]]
+
+        meta = {
+            'version': TrackCompiler.VERSION,
+            'size': [width, height],
+            'tile_size': tile_size,
+            'start_rect': start_rect,
+            'start_line': [list(point) for point in start_line.points] if start_line is not None else None,
+            'start_pos': list(start_line.start_pos) if start_line is not None else None,
+        }
+        arrays = {'wall_tiles': wall_tiles}
+        if with_image:
+            arrays['image_tiles'] = image_tiles
+        return TrackBundle(arrays, meta)
+
+    @staticmethod
+    def start_rect(start_line_mask):
+        """Returns the bounding box of the largest start-line region, as `TrackUtils.get_start_rect_coords` does."""
+        contours, _ = cv2.findContours(start_line_mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        largest_area = 0
+        largest_rectangle = None
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h > largest_area:
+                largest_area = w * h
+                largest_rectangle = [x, y, w, h]
+
+        return largest_rectangle
+
+
+def compile_track(source_path, size=None, wall_color=TrackCompiler.WALL_COLOR, cache_dir=None, force=False):
+    """Shortcut for `TrackCompiler.compile`."""
+    return TrackCompiler.compile(source_path, size, wall_color, cache_dir, force)
+
+
+def compile_tiled_track(source_path, tile_size=TrackCompiler.TILE_SIZE, wall_color=TrackCompiler.WALL_COLOR,
+                        cache_dir=None, force=False, with_image=True):
+    """Shortcut for `TrackCompiler.compile_tiled`."""
+    return TrackCompiler.compile_tiled(source_path, tile_size, wall_color, cache_dir, force, with_image)
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+
+    for track_file in sys.argv[1:] or sorted(glob.glob('tracks/*.png')):
+        bundle = compile_track(track_file)
+        print(f"{track_file} -> {bundle.path}")
@@ -0,0 +1,248 @@
+import math
+
+import cv2
+import numpy as np
+
+# Versions of the layer builders below, for `TrackBundle.layer`: bump one when its output changes.
+WALL_INTEGRAL_VERSION = 1
+DIRECTIONAL_DISTANCES_VERSION = 1
+WALL_DISTANCE_VERSION = 1
+GEODESIC_DISTANCE_VERSION = 1
+
+
+def wall_integral(wall_mask):
+    """Builds the summed-area table of a wall mask.
+
+    `table[y, x]` is the number of wall pixels in `wall_mask[:y, :x]`, so the walls inside
+    any axis-aligned box come from four lookups.
+
+    Args:
+        wall_mask (ndarray): Boolean array indexed as [y, x].
+
+    Returns:
+        ndarray: An int32 array of shape (height + 1, width + 1).
+    """
+    height, width = wall_mask.shape
+    table = np.zeros((height + 1, width + 1), dtype=np.int32)
+    np.cumsum(wall_mask, axis=0, dtype=np.int32, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+def count_in_boxes(table, x1, y1, x2, y2):
+    """Counts wall pixels in the boxes [x1, x2) x [y1, y2) using a summed-area table.
+
+    Coordinates are clipped to the table, so boxes that stick out of the map only count
+    their visible part. Scalars and arrays of boxes are both accepted.
+
+    Args:
+        table (ndarray): A table built by `wall_integral`.
+        x1, y1, x2, y2 (int or ndarray): Box corners, with x2 >= x1 and y2 >= y1.
+
+    Returns:
+        int or ndarray: The number of wall pixels in each box.
+    """
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    x1, x2 = np.clip(x1, 0, width), np.clip(x2, 0, width)
+    y1, y2 = np.clip(y1, 0, height), np.clip(y2, 0, height)
+    return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+
+
+NO_WALL = np.iinfo(np.uint16).max
+
+
+def directional_distances(wall_mask):
+    """Builds the distance from every pixel to the nearest wall to its left, right, up and down.
+
+    Each direction is one running maximum/minimum over wall indices along a row or column,
+    so the whole map is computed with four vectorized scans. The distance counts the pixel
+    steps to the first wall, 0 on a wall pixel, as `F1_Env` sensors report it.
+
+    Args:
+        wall_mask (ndarray): Boolean array indexed as [y, x].
+
+    Returns:
+        ndarray: A uint16 array of shape (height, width, 4) holding the left, right, up and
+        down distances, with `NO_WALL` where the ray leaves the map without hitting a wall.
+    """
+    height, width = wall_mask.shape
+    distances = np.empty((height, width, 4), dtype=np.uint16)
+
+    xs = np.arange(width, dtype=np.int32)[np.newaxis, :]
+    ys = np.arange(height, dtype=np.int32)[:, np.newaxis]
+
+    last_wall = np.maximum.accumulate(np.where(wall_mask, xs, -1), axis=1)
+    distances[:, :, 0] = np.where(last_wall >= 0, xs - last_wall, NO_WALL)
+
+    next_wall = np.minimum.accumulate(np.where(wall_mask, xs, width)[:, ::-1], axis=1)[:, ::-1]
+    distances[:, :, 1] = np.where(next_wall < width, next_wall - xs, NO_WALL)
+
+    last_wall = np.maximum.accumulate(np.where(wall_mask, ys, -1), axis=0)
+    distances[:, :, 2] = np.where(last_wall >= 0, ys - last_wall, NO_WALL)
+
+    next_wall = np.minimum.accumulate(np.where(wall_mask, ys, height)[::-1, :], axis=0)[::-1, :]
+    distances[:, :, 3] = np.where(next_wall < height, next_wall - ys, NO_WALL)
+
+    return distances
+
+
+def wall_distance_field(wall_mask):
+    """Builds the Euclidean distance from every pixel to the nearest wall pixel.
+
+    Everything outside the map counts as wall, like `Car.is_collision_points` treats it, so
+    the field also bounds the distance to the map edge. Wall pixels have distance 0.
+
+    Args:
+        wall_mask (ndarray): Boolean array indexed as [y, x].
+
+    Returns:
+        ndarray: A float32 array of shape (height, width).
+    """
+    height, width = wall_mask.shape
+    free = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    free[1:-1, 1:-1] = ~wall_mask
+    distances = cv2.distanceTransform(free, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    return np.ascontiguousarray(distances[1:-1, 1:-1])
+
+
+def trace_ray(distance_field, x0, y0, angle, max_length):
+    """Sphere-traces a radar ray through a distance field.
+
+    The ray visits the same points as the per-pixel radar march,
+    `(int(x0 + length * cos), int(y0 + length * sin))`, but jumps ahead by the field's
+    clearance at each point. The jump leaves a margin for the integer truncation of both
+    points, so no wall can be skipped and the result is the same pixel the march stops on.
+
+    Args:
+        distance_field (ndarray): A field built by `wall_distance_field`.
+        x0, y0 (float): The origin of the ray.
+        angle (float): The ray heading in degrees, in the cars' convention.
+        max_length (int): The longest ray length.
+
+    Returns:
+        tuple: The (x, y) pixel of the first wall hit, or of the ray end at `max_length`.
+    """
+    height, width = distance_field.shape
+    radians = math.radians(360 - angle)
+    dx, dy = math.cos(radians), math.sin(radians)
+
+    length = 0
+    x, y = int(x0), int(y0)
+    while length < max_length:
+        if x < 0 or x >= width or y < 0 or y >= height:
+            break
+        clearance = int(distance_field[y, x])
+        if clearance == 0:
+            break
+        length = min(length + max(1, clearance - 2), max_length)
+        x = int(x0 + length * dx)
+        y = int(y0 + length * dy)
+
+    return x, y
+
+
+# Chamfer step costs of the 8-neighbourhood: 5 per straight step and 7 per diagonal step
+# approximate Euclidean lengths within about 2%.
+CHAMFER_STRAIGHT = 5
+CHAMFER_DIAGONAL = 7
+
+
+def start_line_barrier(wall_mask, start_line_mask, direction):
+    """Finds the strip of free pixels right behind the start line, extended sideways to the walls.
+
+    The strip is two pixels thick along `direction`, more than any 8-neighbour step can
+    cross, so a wave front leaving the start line cannot slip back around it even where
+    the drawn line stops short of the walls.
+
+    Returns:
+        ndarray: Boolean array indexed as [y, x], True on barrier pixels.
+    """
+    height, width = wall_mask.shape
+    ys, xs = np.mgrid[0:height, 0:width]
+    along = xs * direction[0] + ys * direction[1]
+    across = ys * direction[0] - xs * direction[1]
+
+    line_along = along[start_line_mask]
+    line_across = across[start_line_mask]
+    strip = (along >= line_along.min() - 2) & (along < line_along.min()) & ~wall_mask & ~start_line_mask
+
+    # Keep the pieces of the strip that run behind the line, up to the first wall on each side.
+    _, labels = cv2.connectedComponents(strip.astype(np.uint8), connectivity=8)
+    behind = strip & (across >= line_across.min()) & (across <= line_across.max())
+    return strip & np.isin(labels, np.unique(labels[behind]))
+
+
+def geodesic_distance_field(wall_mask, start_line_mask, direction):
+    """Builds the driving distance from the start line to every free pixel, around the lap.
+
+    Distances are measured through free space only, with a Dial-style bucketed Dijkstra
+    over the 8-neighbourhood and chamfer step costs. Every tentative distance within one
+    straight step of the current minimum is already final, so each iteration settles a
+    whole band of the wave front with a few array operations.
+
+    The wave leaves the start line in the race direction only (`start_line_barrier` blocks
+    it behind the line), so the field grows around the lap and peaks just behind the line,
+    at the lap length.
+
+    Args:
+        wall_mask (ndarray): Boolean array indexed as [y, x].
+        start_line_mask (ndarray): Boolean array indexed as [y, x], the wave front sources.
+        direction (ndarray): The (x, y) unit race direction at the start line, e.g. `StartLine.normal`.
+
+    Returns:
+        ndarray: A float32 array of shape (height, width) with the distance in pixels, and
+        inf on walls and on pixels that cannot be reached from the start line.
+    """
+    height, width = wall_mask.shape
+    step_y, step_x = [offsets.ravel() for offsets in np.mgrid[-1:2, -1:2]]
+    step_x, step_y = step_x[(step_x != 0) | (step_y != 0)], step_y[(step_x != 0) | (step_y != 0)]
+    steps = step_y * width + step_x
+    costs = np.where((step_x != 0) & (step_y != 0), CHAMFER_DIAGONAL, CHAMFER_STRAIGHT)
+
+    unreached = np.iinfo(np.int32).max
+    distances = np.full(height * width, unreached, dtype=np.int32)
+    barrier = np.ravel(start_line_barrier(wall_mask, start_line_mask, direction))
+    settled = np.ravel(wall_mask) | barrier
+
+    def neighbours_of(pixels):
+        x, y = pixels % width, pixels // width
+        neighbour_x, neighbour_y = x[:, np.newaxis] + step_x, y[:, np.newaxis] + step_y
+        inside = (neighbour_x >= 0) & (neighbour_x < width) & (neighbour_y >= 0) & (neighbour_y < height)
+        return pixels[:, np.newaxis] + steps, inside
+
+    pending = np.flatnonzero(np.ravel(start_line_mask) & ~settled)
+    distances[pending] = 0
+    while len(pending):
+        pending = np.unique(pending)
+        pending = pending[~settled[pending]]
+        if not len(pending):
+            break
+
+        band_end = distances[pending].min() + CHAMFER_STRAIGHT
+        in_band = distances[pending] < band_end
+        band, pending = pending[in_band], pending[~in_band]
+        settled[band] = True
+
+        neighbours, inside = neighbours_of(band)
+        candidates = (distances[band][:, np.newaxis] + costs)[inside]
+        neighbours = neighbours[inside]
+        open_neighbours = ~settled[neighbours]
+        neighbours, candidates = neighbours[open_neighbours], candidates[open_neighbours]
+
+        improved = candidates < distances[neighbours]
+        neighbours, candidates = neighbours[improved], candidates[improved]
+        np.minimum.at(distances, neighbours, candidates)
+        pending = np.concatenate([pending, neighbours])
+
+    # The barrier is reached last, from the end of the lap; two relaxations fill its two pixel rows.
+    barrier_pixels = np.flatnonzero(barrier)
+    neighbours, inside = neighbours_of(barrier_pixels)
+    neighbours = np.where(inside, neighbours, 0)
+    usable = inside & ~np.ravel(start_line_mask)[neighbours] & ~np.ravel(wall_mask)[neighbours]
+    for _ in range(2):
+        reachable = usable & (distances[neighbours] != unreached)
+        candidates = np.where(reachable, distances[neighbours] + costs, unreached).min(axis=1)
+        distances[barrier_pixels] = np.minimum(distances[barrier_pixels], candidates)
+
+    field = np.where(distances == unreached, np.inf, distances / CHAMFER_STRAIGHT).astype(np.float32)
+    return field.reshape(height, width)
@@ -0,0 +1,207 @@
+import math
+import warnings
+
+import cv2
+import numpy as np
+
+from start_line import StartLine
+from track_compiler import TrackCompiler
+
+
+class TrackGenerator:
+    """Seeded procedural circuits, built straight into compiled track bundles.
+
+    A circuit is a closed Catmull-Rom spline through control points placed around the map
+    center at jittered angles and random radii, so the centerline never crosses itself.
+    The road width is interpolated along the loop from random per-point widths, and the
+    road is rasterized with OpenCV into the wall mask directly: no image is encoded or
+    decoded. A rectangular start zone is laid across the road, along its heading and the
+    start-line normal, where the centerline heads closest to right, so the start line,
+    start rectangle and starting pose follow the same conventions as the hand-drawn tracks.
+
+    The same seed and parameters always give the same track. Bundles are in memory; save
+    one with `TrackBundle.save` to reuse it, or `export_png` to look at it.
+
+    Attributes:
+        width (int): The map width in pixels.
+        height (int): The map height in pixels.
+        control_points (tuple): The (min, max) number of spline control points.
+        road_width (tuple): The (min, max) road width in pixels.
+        margin (int): The minimum free space between the road and the map border.
+        start_length (int): The length of the start zone along the race direction.
+    """
+
+    SAMPLE_SPACING = 4
+    WALL_GAP = 30
+    MAX_ATTEMPTS = 20
+
+    def __init__(self, width=1920, height=1080, control_points=(8, 14), road_width=(100, 160), margin=40,
+                 start_length=100):
+        self.width = width
+        self.height = height
+        self.control_points = control_points
+        self.road_width = road_width
+        self.margin = margin
+        self.start_length = start_length
+
+    @staticmethod
+    def catmull_rom(points, samples_per_segment):
+        """Samples a closed Catmull-Rom spline through the given points.
+
+        Args:
+            points (ndarray): The (N, D) control points, in loop order.
+            samples_per_segment (int): Samples between consecutive control points.
+
+        Returns:
+            ndarray: The (N * samples_per_segment, D) samples, in loop order.
+        """
+        t = np.linspace(0, 1, samples_per_segment, endpoint=False)[:, np.newaxis]
+        before, start = np.roll(points, 1, axis=0), points
+        end, after = np.roll(points, -1, axis=0), np.roll(points, -2, axis=0)
+
+        segments = [0.5 * (2 * start[i] + (end[i] - before[i]) * t
+                           + (2 * before[i] - 5 * start[i] + 4 * end[i] - after[i]) * t ** 2
+                           + (3 * start[i] - before[i] - 3 * end[i] + after[i]) * t ** 3)
+                    for i in range(len(points))]
+        return np.concatenate(segments)
+
+    @staticmethod
+    def resample(samples, spacing):
+        """Resamples a closed polyline (with extra value columns) to points `spacing` pixels apart."""
+        closed = np.vstack([samples, samples[:1]])
+        steps = np.hypot(*np.diff(closed[:, :2], axis=0).T)
+        arc = np.concatenate([[0], np.cumsum(steps)])
+        positions = np.arange(0, arc[-1], spacing)
+        return np.stack([np.interp(positions, arc, closed[:, column]) for column in range(closed.shape[1])], axis=1)
+
+    def centerline(self, rng):
+        """Draws a random closed centerline with a road width at every point.
+
+        Returns:
+            ndarray: An (N, 3) array of x, y and road width, about `SAMPLE_SPACING` px apart.
+        """
+        count = int(rng.integers(self.control_points[0], self.control_points[1] + 1))
+        angles = (np.arange(count) + rng.uniform(-0.35, 0.35, count)) * 2 * math.pi / count
+        radii = rng.uniform(0.45, 1.0, count)
+        widths = rng.uniform(self.road_width[0], self.road_width[1], count)
+
+        reach = self.margin + self.road_width[1] / 2
+        radius_x, radius_y = self.width / 2 - reach, self.height / 2 - reach
+        points = np.stack([self.width / 2 + radius_x * radii * np.cos(angles),
+                           self.height / 2 + radius_y * radii * np.sin(angles), widths], axis=1)
+
+        samples = TrackGenerator.resample(TrackGenerator.catmull_rom(points, 64), TrackGenerator.SAMPLE_SPACING)
+        samples[:, 2] = np.clip(samples[:, 2], self.road_width[0], self.road_width[1])
+        return samples
+
+    @staticmethod
+    def is_clear(samples, wall_gap=WALL_GAP):
+        """Checks that separate stretches of road stay at least `wall_gap` pixels apart.
+
+        Pairs of samples closer along the loop than both their road widths are neighbours on
+        the same stretch and are skipped.
+        """
+        spacing = TrackGenerator.SAMPLE_SPACING
+        count = len(samples)
+        index = np.arange(count)
+        separation = np.abs(index[:, np.newaxis] - index[np.newaxis, :])
+        separation = np.minimum(separation, count - separation) * spacing
+
+        distances = np.hypot(samples[:, np.newaxis, 0] - samples[np.newaxis, :, 0],
+                             samples[:, np.newaxis, 1] - samples[np.newaxis, :, 1])
+        required = (samples[:, np.newaxis, 2] + samples[np.newaxis, :, 2]) / 2 + wall_gap
+        far_apart = separation > 2 * required
+        return not np.any(far_apart & (distances < required))
+
+    def rasterize(self, samples):
+        """Draws the road and the start zone into the wall and start-line masks.
+
+        The start zone is a `start_length` x road-width rectangle centered on the sample
+        whose surroundings head closest to +x, i.e. a race direction near 0 degrees. Its
+        sides run along the road's heading there and across it, so the zone fills the road
+        however the stretch is tilted; the start line is its back side.
+
+        Returns:
+            tuple: The wall mask and the start-line mask, boolean arrays indexed as [y, x],
+            and the `StartLine`.
+        """
+        road = np.zeros((self.height, self.width), dtype=np.uint8)
+        shift = 4
+        points = np.round(samples[:, :2] * (1 << shift)).astype(np.int64)
+        for i in range(len(samples)):
+            start, end = points[i], points[(i + 1) % len(samples)]
+            cv2.line(road, (int(start[0]), int(start[1])), (int(end[0]), int(end[1])), 1,
+                     thickness=max(1, int(round(samples[i, 2]))), lineType=cv2.LINE_8, shift=shift)
+
+        # Average the unit headings over the start zone's length, so the zone lands on a
+        # straight stretch heading right rather than on the apex of a bend.
+        headings = np.roll(samples[:, :2], -1, axis=0) - np.roll(samples[:, :2], 1, axis=0)
+        headings /= np.hypot(headings[:, 0], headings[:, 1])[:, np.newaxis]
+        reach = int(self.start_length / TrackGenerator.SAMPLE_SPACING)
+        straightness = sum(np.roll(headings[:, 0], offset) for offset in range(-reach, reach + 1))
+        start = int(np.argmax(straightness))
+        start_x, start_y, start_width = samples[start]
+
+        # Half sides of the zone: along the heading, and across it along the start-line normal
+        heading_x, heading_y = headings[start]
+        along = np.array([heading_x, heading_y]) * self.start_length / 2
+        across = np.array([-heading_y, heading_x]) * start_width / 2
+        center = np.array([start_x, start_y])
+        # Back left, back right, front right, front left, relative to the race direction
+        corners = np.array([center - along - across, center - along + across,
+                            center + along + across, center + along - across])
+
+        zone = np.zeros_like(road)
+        cv2.fillPoly(zone, [np.round(corners * (1 << shift)).astype(np.int32)], 1, lineType=cv2.LINE_8, shift=shift)
+        start_line_mask = zone.astype(bool)
+        road[start_line_mask] = 1
+        start_line = StartLine(tuple(int(round(value)) for value in corners[0]),
+                               tuple(int(round(value)) for value in corners[1]))
+
+        return road == 0, start_line_mask, start_line
+
+    def generate(self, seed):
+        """Generates the track of a seed.
+
+        Args:
+            seed (int): The random seed; the same seed always gives the same track.
+
+        Returns:
+            TrackBundle: An in-memory bundle, ready for `Track` and `F1_Env`.
+        """
+        rng = np.random.default_rng(seed)
+        for _ in range(TrackGenerator.MAX_ATTEMPTS):
+            samples = self.centerline(rng)
+            if TrackGenerator.is_clear(samples):
+                break
+        else:
+            warnings.warn(f"Track seed {seed}: no clear layout in {TrackGenerator.MAX_ATTEMPTS} attempts, "
+                          f"keeping the last one.", RuntimeWarning, stacklevel=2)
+
+        wall_mask, start_line_mask, start_line = self.rasterize(samples)
+        bundle = TrackCompiler.from_masks(wall_mask, start_line_mask, start_line)
+        bundle.meta['source'] = f'generated:{seed}'
+        bundle.meta['generator'] = {
+            'seed': seed, 'size': [self.width, self.height], 'control_points': list(self.control_points),
+            'road_width': list(self.road_width), 'margin': self.margin, 'start_length': self.start_length,
+        }
+        return bundle
+
+    @staticmethod
+    def export_png(bundle, path):
+        """Writes a generated track as a PNG in the hand-drawn tracks' colors, for viewing only."""
+        cv2.imwrite(path, bundle.image())
+
+
+def generate_track(seed, width=1920, height=1080):
+    """Shortcut for `TrackGenerator(width, height).generate(seed)`."""
+    return TrackGenerator(width, height).generate(seed)
+
+
+if __name__ == "__main__":
+    import sys
+
+    for track_seed in (int(arg) for arg in sys.argv[1:] or ['0']):
+        png_path = f'tracks/generated_{track_seed}.png'
+        TrackGenerator.export_png(generate_track(track_seed), png_path)
+        print(f"seed {track_seed} -> {png_path}")
@@ -0,0 +1,157 @@
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from track import Track
+
+
+class TrackRegistry:
+    """An in-process cache of loaded tracks, shared by every run, generation and env.
+
+    A track is loaded the first time it is asked for and handed out as the same object
+    afterwards, so switching tracks between episodes or generations (e.g. a curriculum)
+    only pays for the first load. At most `max_tracks` tracks are kept; the least recently
+    used one is dropped to make room. Tracks are shared: treat them as read-only.
+
+    Loading is thread-safe: a track asked for while another thread is loading it is waited
+    for instead of loaded twice. `warm` loads several tracks at once in a thread pool, which
+    overlaps decoding and memory-mapping compiled bundles; building a track's fields for the
+    first time (mostly the geodesic progress field) holds the GIL and gains little.
+
+    Options left at their default value are not part of the cache key, so `get(path)` and
+    `get(path, headless=False)` share one loaded track.
+
+    Attributes:
+        max_tracks (int): The most tracks kept loaded at once.
+        load (callable): Builds a loaded track from `(track_file, **options)`.
+        defaults (dict): The default value of each option `load` takes.
+        tracks (OrderedDict): The loaded tracks by key, least recently used first.
+        hits (int): How many requests were served from the cache.
+        loads (int): How many tracks were loaded.
+        evictions (int): How many tracks were dropped to make room.
+    """
+
+    MAX_TRACKS = 8
+    WORKERS = 4
+
+    def __init__(self, max_tracks=MAX_TRACKS, load=None):
+        self.max_tracks = max_tracks
+        self.load = load if load is not None else TrackRegistry.load_track
+        self.defaults = TrackRegistry.option_defaults(self.load)
+        self.tracks = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def load_track(track_file, **options):
+        """Loads a `track.Track` with its masks, fields and starting position."""
+        track = Track(track_file, **options)
+        track.load_game_map()
+        return track
+
+    @staticmethod
+    def option_defaults(load):
+        """Returns the keyword defaults of a loader, those of `track.Track` for `load_track`."""
+        target = Track if load is TrackRegistry.load_track else load
+        return {name: parameter.default for name, parameter in inspect.signature(target).parameters.items()
+                if parameter.default is not inspect.Parameter.empty}
+
+    def key(self, track_file, options):
+        """Returns the cache key of a track file (or bundle) loaded with the given options.
+
+        Options passed with their default value are left out, so they do not split the cache.
+        """
+        missing = object()
+        return track_file, tuple(sorted((name, value) for name, value in options.items()
+                                        if self.defaults.get(name, missing) != value))
+
+    def get(self, track_file, **options):
+        """Returns the loaded track, loading it on first use.
+
+        Args:
+            track_file (str or TrackBundle): The track image path, or a compiled bundle.
+            **options: Passed on to the track's constructor (e.g. `bit_packed`, `resolution`);
+                each combination is cached separately.
+
+        Returns:
+            The shared, loaded track.
+        """
+        key = self.key(track_file, options)
+        with self.lock:
+            track = self.tracks.get(key)
+            if track is not None:
+                self.tracks.move_to_end(key)
+                self.hits += 1
+                return track
+
+            pending = self.pending.get(key)
+            loading = pending is None
+            if loading:
+                pending = self.pending[key] = Future()
+
+        if not loading:
+            return pending.result()
+
+        try:
+            track = self.load(track_file, **options)
+        except Exception as error:
+            with self.lock:
+                del self.pending[key]
+            pending.set_exception(error)
+            raise
+
+        with self.lock:
+            del self.pending[key]
+            self.tracks[key] = track
+            self.loads += 1
+            while len(self.tracks) > self.max_tracks:
+                self.tracks.popitem(last=False)
+                self.evictions += 1
+        pending.set_result(track)
+        return track
+
+    def warm(self, track_files, workers=WORKERS, **options):
+        """Loads several tracks at once in a thread pool.
+
+        Only the `max_tracks` most recently warmed tracks stay loaded.
+
+        Returns:
+            list: The loaded tracks, in the order of `track_files`.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda track_file: self.get(track_file, **options), track_files))
+
+    def evict(self, track_file, **options):
+        """Drops a track from the cache, e.g. a generated track that will not be used again."""
+        with self.lock:
+            self.tracks.pop(self.key(track_file, options), None)
+
+    def clear(self):
+        """Drops every loaded track."""
+        with self.lock:
+            self.tracks.clear()
+
+    def stats(self):
+        """Returns the cache counters.
+
+        Returns:
+            dict: The `hits`, `loads`, `evictions` and currently `loaded` track counts.
+        """
+        return {'hits': self.hits, 'loads': self.loads, 'evictions': self.evictions, 'loaded': len(self.tracks)}
+
+
+registry = TrackRegistry()
+
+
+def get_track(track_file, **options):
+    """Shortcut for `registry.get`, the process-wide registry of `track.Track`s."""
+    return registry.get(track_file, **options)
+
+
+def warm_tracks(track_files, workers=TrackRegistry.WORKERS, **options):
+    """Shortcut for `registry.warm`."""
+    return registry.warm(track_files, workers, **options)